@@ -0,0 +1,92 @@
+"""add data_watermark table and ingest triggers
+
+Revision ID: d2e3f4a5b6c7
+Revises: c1a2b3d4e5f6
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e3f4a5b6c7'
+down_revision: Union[str, None] = 'c1a2b3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables whose changes invalidate cached reports
+WATCHED_TABLES = ('sonus_aggregation_new', 'metrics')
+
+
+def upgrade() -> None:
+    # One row per watched table: latest data time + statement-level ingest counter
+    op.create_table(
+        'data_watermark',
+        sa.Column('table_name', sa.Text(), nullable=False),
+        sa.Column('max_time', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('ingest_count', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('table_name'),
+        schema='public'
+    )
+
+    # Statement-level trigger: one cheap upsert per INSERT/UPDATE/DELETE statement.
+    # new_rows (transition table) only exists for the INSERT trigger.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION public.bump_data_watermark() RETURNS trigger AS $$
+        DECLARE
+            batch_max timestamptz;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT max(n.time) INTO batch_max FROM new_rows n;
+            END IF;
+            INSERT INTO public.data_watermark AS w (table_name, max_time, ingest_count, updated_at)
+            VALUES (TG_TABLE_NAME, batch_max, 1, now())
+            ON CONFLICT (table_name) DO UPDATE
+                SET max_time = GREATEST(w.max_time, EXCLUDED.max_time),
+                    ingest_count = w.ingest_count + 1,
+                    updated_at = now();
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+    """)
+
+    for table in WATCHED_TABLES:
+        # sonus_aggregation_new is owned by the ingest system; skip if absent
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF to_regclass('public.{table}') IS NOT NULL THEN
+                    INSERT INTO public.data_watermark (table_name, max_time, ingest_count, updated_at)
+                    SELECT '{table}', max(time), 0, now() FROM public.{table}
+                    ON CONFLICT (table_name) DO NOTHING;
+
+                    CREATE TRIGGER trg_{table}_watermark_ins
+                        AFTER INSERT ON public.{table}
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION public.bump_data_watermark();
+                    CREATE TRIGGER trg_{table}_watermark_mod
+                        AFTER UPDATE OR DELETE ON public.{table}
+                        FOR EACH STATEMENT EXECUTE FUNCTION public.bump_data_watermark();
+                END IF;
+            END
+            $$;
+        """)
+
+
+def downgrade() -> None:
+    for table in WATCHED_TABLES:
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF to_regclass('public.{table}') IS NOT NULL THEN
+                    DROP TRIGGER IF EXISTS trg_{table}_watermark_ins ON public.{table};
+                    DROP TRIGGER IF EXISTS trg_{table}_watermark_mod ON public.{table};
+                END IF;
+            END
+            $$;
+        """)
+    op.execute("DROP FUNCTION IF EXISTS public.bump_data_watermark()")
+    op.drop_table('data_watermark', schema='public')
@@ -57,7 +57,291 @@ class Settings(BaseSettings):
         default="INFO",
         description="Logging level (DEBUG, INFO, WARNING, ERROR)"
     )
+
+    # --- Conditional GET (ETag) ---
+    WATERMARK_REFRESH_SECONDS: float = Field(
+        default=5.0,
+        description="Max age of the in-process data watermark before a background refresh"
+    )
+    CODE_VERSION: Optional[str] = Field(
+        default=None,
+        description="Code version mixed into ETags (default: fingerprint of app sources)"
+    )
+
+    # --- Sharded aggregation (large time ranges) ---
+    SHARD_WORKERS: int = Field(
+        default=0,
+        ge=0,
+        description="Worker processes that fetch and aggregate time shards of large reports (0 disables sharding)"
+    )
+    SHARD_SECONDS: int = Field(
+        default=6 * 3600,
+        ge=300,
+        description="Length of one time shard in seconds (rounded down to whole 5-minute buckets)"
+    )
+    SHARD_MIN_RANGE_SECONDS: int = Field(
+        default=2 * 86400,
+        ge=0,
+        description="Reports over ranges shorter than this are aggregated in-process"
+    )
+
+    # --- Range-split fetching (concurrent time slices on pooled connections) ---
+    FETCH_SLICES: int = Field(
+        default=1,
+        ge=1,
+        description="Maximum time slices a period is split into and fetched concurrently (1 disables splitting)"
+    )
+    FETCH_SLICE_MIN_SECONDS: int = Field(
+        default=6 * 3600,
+        ge=300,
+        description="Shortest time slice worth its own query and connection"
+    )
+    FETCH_POOL_RESERVE: int = Field(
+        default=4,
+        ge=0,
+        description="Pooled connections left free for other requests when choosing the slice count"
+    )
+
+    # --- Fetch strategy planner (UNION ALL vs parallel queries) ---
+    QUERY_PLANNER_EPSILON: float = Field(
+        default=0.05,
+        ge=0.0,
+        le=1.0,
+        description="Probability of exploring a fetch strategy other than the fastest one"
+    )
+    QUERY_PLANNER_ALPHA: float = Field(
+        default=0.2,
+        gt=0.0,
+        le=1.0,
+        description="EWMA weight of the latest observed fetch latency"
+    )
+
+    # --- Report cost guard (pre-flight row estimate) ---
+    COST_DOWNGRADE_ROWS: int = Field(
+        default=0,
+        ge=0,
+        description="Estimated rows from which 5-minute reports are served hourly only (0 disables)"
+    )
+    COST_JOB_ROWS: int = Field(
+        default=0,
+        ge=0,
+        description="Estimated rows from which reports are computed by a background job, answered with 202 (0 disables)"
+    )
+
+    # --- Background report jobs (arq worker) ---
+    REPORT_JOB_CHUNK_SECONDS: int = Field(
+        default=86400,
+        ge=300,
+        description="Report jobs fetch and aggregate longer ranges in time chunks of this length"
+    )
+    REPORT_JOB_PAGE_ROWS: int = Field(
+        default=5000,
+        ge=1,
+        description="Rows per stored result page of a report job"
+    )
+    REPORT_JOB_RESULT_TTL: int = Field(
+        default=3600,
+        ge=60,
+        description="Seconds report job results (pages, progress) are kept in Redis"
+    )
+    REPORT_JOB_TIMEOUT_SECONDS: int = Field(
+        default=1800,
+        ge=60,
+        description="Report jobs running longer than this are cancelled by the worker"
+    )
+    REPORT_JOB_REUSE_SECONDS: int = Field(
+        default=600,
+        ge=0,
+        description="Identical report submissions reuse a finished job this young (0 = only in-flight jobs)"
+    )
+
+    # --- Report computation executor ---
+    REPORT_EXECUTOR: str = Field(
+        default="thread",
+        description="Where CPU-bound report stages run: thread, process or inline (on the event loop)"
+    )
+    REPORT_EXECUTOR_WORKERS: int = Field(
+        default=4,
+        ge=1,
+        description="Threads/processes of the report executor"
+    )
+    REPORT_EXECUTOR_QUEUE: int = Field(
+        default=16,
+        ge=0,
+        description="Report stages that may wait for a worker before requests get 503"
+    )
+
+    # --- Adaptive concurrency limit of report computation (AIMD load shedding) ---
+    REPORT_CONCURRENCY_MAX: int = Field(
+        default=0,
+        ge=0,
+        description="Upper bound (and start) of concurrently computed reports per process (0 = off)"
+    )
+    REPORT_CONCURRENCY_MIN: int = Field(
+        default=2,
+        ge=1,
+        description="The adaptive limit never drops below this"
+    )
+    REPORT_LATENCY_TARGET_MS: int = Field(
+        default=2000,
+        ge=1,
+        description="Report DB queries slower than this shrink the concurrency limit"
+    )
+    REPORT_POOL_WAIT_TARGET_MS: int = Field(
+        default=100,
+        ge=1,
+        description="Waiting longer than this for pooled DB connections shrinks the concurrency limit"
+    )
+    REPORT_CONCURRENCY_BACKOFF: float = Field(
+        default=0.75,
+        gt=0,
+        lt=1,
+        description="Multiplicative decrease of the concurrency limit on slowness"
+    )
+
+    # --- DB session scheduling (weighted fair queuing by priority class) ---
+    DB_SCHEDULER_SLOTS: int = Field(
+        default=0,
+        ge=0,
+        description="Concurrent DB sessions per process, scheduled by priority class; set to pool size + overflow (0 = off)"
+    )
+    DB_SCHEDULER_WEIGHTS: str = Field(
+        default="typeahead=8,interactive=4,crawl=1,background=1",
+        description="Share of contended slots per priority class (interactive, typeahead, crawl, background)"
+    )
+    DB_SCHEDULER_RESERVED: str = Field(
+        default="typeahead=1,interactive=2",
+        description="Slots only the given priority class may use"
+    )
+
+    # --- Resilience (circuit breakers, request deadlines) ---
+    REQUEST_DEADLINE_MS: int = Field(
+        default=0,
+        ge=0,
+        description="Time budget of an API request; bounds DB statement_timeout and Redis calls (0 = off)"
+    )
+    DB_BREAKER_FAILURES: int = Field(
+        default=5,
+        ge=1,
+        description="Consecutive failed or slow DB sessions that open the Postgres circuit breaker"
+    )
+    DB_BREAKER_RECOVERY_SECONDS: float = Field(
+        default=10.0,
+        gt=0,
+        description="Seconds the Postgres circuit stays open before a trial session"
+    )
+    DB_BREAKER_SLOW_MS: int = Field(
+        default=0,
+        ge=0,
+        description="DB sessions slower than this count as failures (0 = failures only)"
+    )
+    REDIS_TIMEOUT_MS: int = Field(
+        default=250,
+        ge=0,
+        description="Socket timeout and per-call limit of cache calls to Redis (0 = none)"
+    )
+    REDIS_BULK_TIMEOUT_MS: int = Field(
+        default=5000,
+        ge=0,
+        description="Socket timeout and per-call limit of bulk cache calls (report bodies, partials) "
+                    "and cache invalidation (0 = none)"
+    )
+    REDIS_BREAKER_FAILURES: int = Field(
+        default=3,
+        ge=1,
+        description="Consecutive failed or slow cache calls that open the Redis circuit breaker"
+    )
+    REDIS_BREAKER_RECOVERY_SECONDS: float = Field(
+        default=5.0,
+        gt=0,
+        description="Seconds the cache is bypassed after the Redis circuit opens"
+    )
+    REDIS_BREAKER_SLOW_MS: int = Field(
+        default=100,
+        ge=0,
+        description="Cache calls slower than this count as failures (0 = failures only)"
+    )
+
+    # --- Redis maintenance (job key cleanup, cache invalidation) ---
+    REDIS_MAINTENANCE_BATCH: int = Field(
+        default=1000,
+        ge=10,
+        description="Keys per SCAN page and per pipelined delete of maintenance runs"
+    )
+    REDIS_MAINTENANCE_BUDGET: float = Field(
+        default=0.25,
+        gt=0,
+        le=1,
+        description="Share of wall time maintenance runs may keep Redis busy (1 = no pacing)"
+    )
+
+    # --- Rate limiting ---
+    RATE_LIMIT_BACKEND: str = Field(
+        default="memory",
+        description="Rate limit counters: memory (per process) or redis (shared by all workers)"
+    )
+    RATE_LIMIT_PREFETCH: int = Field(
+        default=5,
+        ge=1,
+        description="Permits a process reserves from Redis per round trip and hands out locally"
+    )
+    RATE_LIMIT_REDIS_TIMEOUT_MS: int = Field(
+        default=20,
+        ge=1,
+        description="Redis rate limit calls slower than this fall back to the in-memory limiter"
+    )
+    RATE_LIMIT_FAILOVER_SECONDS: float = Field(
+        default=5.0,
+        ge=0,
+        description="Seconds the in-memory limiter is used after a slow or failed Redis call"
+    )
+    RATE_LIMIT_COST_CAPACITY: float = Field(
+        default=0,
+        ge=0,
+        description="Token bucket size of cost-based API limits per client (0 = off); a 1-day 5m report costs 1-4"
+    )
+    RATE_LIMIT_COST_REFILL: float = Field(
+        default=1.0,
+        gt=0,
+        description="Tokens per second refilled into each client's cost bucket"
+    )
     
+    @field_validator("REPORT_EXECUTOR")
+    @classmethod
+    def validate_report_executor(cls, v: str) -> str:
+        allowed = {"thread", "process", "inline"}
+        v_lower = v.lower()
+        if v_lower not in allowed:
+            raise ValueError(f"REPORT_EXECUTOR must be one of {allowed}")
+        return v_lower
+
+    @field_validator("RATE_LIMIT_BACKEND")
+    @classmethod
+    def validate_rate_limit_backend(cls, v: str) -> str:
+        allowed = {"memory", "redis"}
+        v_lower = v.lower()
+        if v_lower not in allowed:
+            raise ValueError(f"RATE_LIMIT_BACKEND must be one of {allowed}")
+        return v_lower
+
+    @field_validator("DB_SCHEDULER_WEIGHTS", "DB_SCHEDULER_RESERVED")
+    @classmethod
+    def validate_priority_classes(cls, v: str) -> str:
+        allowed = {"interactive", "typeahead", "crawl", "background"}
+        pairs = []
+        for part in filter(None, (p.strip() for p in v.lower().split(","))):
+            name, _, value = part.partition("=")
+            if name.strip() not in allowed:
+                raise ValueError(f"Priority classes must be among {allowed}")
+            try:
+                number = float(value)
+            except ValueError:
+                raise ValueError(f"Invalid value for priority class {name.strip()}: {value!r}")
+            if number < 0:
+                raise ValueError(f"Value for priority class {name.strip()} must not be negative")
+            pairs.append(f"{name.strip()}={value.strip()}")
+        return ",".join(pairs)
+
     @field_validator("LOG_LEVEL")
     @classmethod
     def validate_log_level(cls, v: str) -> str:
@@ -1,6 +1,9 @@
 # app/constants.py
 # Compact format headers for metrics API responses
 
+# Repeated string columns; dictionary-encoded in compact v2 and Arrow output
+DIMENSION_FIELDS: frozenset[str] = frozenset({"main", "peer", "destination", "time", "slot"})
+
 MAIN_HEADERS: list[str] = [
     "main", "destination",
     "Min", "YMin", "Min_delta",
@@ -1,13 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 import re
-from contextlib import asynccontextmanager
-from typing import AsyncIterator
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, List, Optional
 
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, text
+from sqlalchemy.exc import DBAPIError, InterfaceError, InternalError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import QueuePool
 
 from app import config
+from app.db.scheduler import db_scheduler
+from app.middleware.circuit_breaker import DeadlineExceeded, get_circuit_breaker, time_left
 
 
 def _to_asyncpg_url(sync_or_async_url: str) -> str:
@@ -58,8 +65,86 @@ AsyncSessionFactory = async_sessionmaker(
     autoflush=False,
 )
 
+# Seconds spent waiting for pooled connections, collected per request by whoever
+# sets a list here (the report concurrency limiter); tasks spawned by the
+# request share it
+pool_waits: ContextVar[Optional[List[float]]] = ContextVar("pool_waits", default=None)
+# Seconds each session was held once connected (its queries), collected the same way
+query_times: ContextVar[Optional[List[float]]] = ContextVar("query_times", default=None)
+
+# Opens after DB_BREAKER_FAILURES consecutive failed (or, with DB_BREAKER_SLOW_MS,
+# slow) sessions; sessions then fail fast with CircuitBreakerError. Only errors
+# of the server or connection count, not those of the statement (constraint
+# violations, bad SQL), nor a request running out of its deadline. Slowness is
+# timed from the connection checkout: waiting for a scheduler slot or a pooled
+# connection is load, not an unhealthy server
+db_breaker = get_circuit_breaker(
+    "postgres",
+    failure_threshold=config.settings.DB_BREAKER_FAILURES,
+    recovery_timeout=config.settings.DB_BREAKER_RECOVERY_SECONDS,
+    slow_call_threshold=config.settings.DB_BREAKER_SLOW_MS / 1000 or None,
+    exceptions=(OperationalError, InterfaceError, InternalError, OSError, asyncio.TimeoutError),
+    ignored=(DeadlineExceeded,),
+)
+
+# SQLSTATE of a statement cancelled by statement_timeout
+_QUERY_CANCELED = "57014"
+
+
 @asynccontextmanager
 async def get_session() -> AsyncIterator[AsyncSession]:
-    """Yield a SQLAlchemy AsyncSession bound to the async engine."""
-    async with AsyncSessionFactory() as session:
-        yield session
+    """
+    Yield a SQLAlchemy AsyncSession bound to the async engine, after taking a
+    slot of the current priority class from db_scheduler (when enabled), through
+    the Postgres circuit breaker. Under a request deadline, waiting for the slot
+    and connection is bounded by the time left, and so is the transaction's
+    statement_timeout; running out raises DeadlineExceeded.
+    """
+    waits = pool_waits.get()
+    times = query_times.get()
+    budget = time_left()
+    async with db_breaker.guard() as call, AsyncExitStack() as stack:
+        start = time.perf_counter()
+        within_budget = asyncio.timeout(budget)
+        try:
+            async with within_budget:
+                await stack.enter_async_context(db_scheduler.slot())
+                session = await stack.enter_async_context(AsyncSessionFactory())
+                # Check the connection out now to time the scheduler and pool wait
+                await session.connection()
+                call.restart()
+                if waits is not None:
+                    waits.append(time.perf_counter() - start)
+                if budget is not None:
+                    # SET LOCAL: lasts until the session's transaction ends
+                    await session.execute(
+                        text("SELECT set_config('statement_timeout', :ms, true)"),
+                        {"ms": str(max(1, int(time_left() * 1000)))},
+                    )
+        except asyncio.TimeoutError as e:
+            # Only the request budget running out is a deadline; a connect
+            # timeout of the driver is a Postgres failure and counts as one
+            if within_budget.expired() and not isinstance(e, DeadlineExceeded):
+                raise DeadlineExceeded("database connection") from e
+            raise
+        connected = time.perf_counter()
+        try:
+            yield session
+        except DBAPIError as e:
+            if budget is not None and getattr(e.orig, "sqlstate", None) == _QUERY_CANCELED:
+                raise DeadlineExceeded("database query") from e
+            raise
+        finally:
+            if times is not None:
+                times.append(time.perf_counter() - connected)
+
+
+def pool_headroom() -> int:
+    """
+    Connections the engine pool can hand out right now without waiting
+    (idle ones plus unused overflow). Unbounded pools report a large number.
+    """
+    pool = async_engine.pool
+    if not isinstance(pool, QueuePool) or pool._max_overflow < 0:
+        return 1 << 16
+    return max(0, pool.size() + pool._max_overflow - pool.checkedout())
@@ -0,0 +1,191 @@
+# app/db/scheduler.py
+# Weighted fair queuing of database sessions by priority class.
+#
+# Dashboard reports, suggest typeahead, paginated crawls and background jobs
+# share one engine pool. With DB_SCHEDULER_SLOTS set (to the pool's size plus
+# overflow), get_session first takes a slot here, in the class of the current
+# request (db_priority, "interactive" unless the caller says otherwise):
+#   - each class keeps DB_SCHEDULER_RESERVED slots no other class may take, so
+#     typeahead always finds a connection while a crawl holds all the others;
+#   - the remaining slots go, when contended, in start-time fair queuing order:
+#     a session's virtual finish tag is max(now, class's previous tag) +
+#     1/weight, and the smallest tag goes first. A class with weight 8 is
+#     served about 8 times as often as one with weight 1 while both queue.
+# Queue depth and wait times per class are exposed at /health/load.
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, Optional
+
+from app.config import settings
+
+INTERACTIVE = "interactive"
+TYPEAHEAD = "typeahead"
+CRAWL = "crawl"
+BACKGROUND = "background"
+PRIORITY_CLASSES = (INTERACTIVE, TYPEAHEAD, CRAWL, BACKGROUND)
+
+# Priority class of the DB sessions opened by the current request or job
+db_priority: ContextVar[str] = ContextVar("db_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority_class(name: str) -> Iterator[None]:
+    """Open the DB sessions of the block in the given priority class."""
+    if name not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {name}")
+    token = db_priority.set(name)
+    try:
+        yield
+    finally:
+        db_priority.reset(token)
+
+
+def parse_classes(spec: str) -> Dict[str, float]:
+    """Parse 'typeahead=8,interactive=4' into {class: value}."""
+    values: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip().lower()
+        if name not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {name}")
+        values[name] = float(value)
+    return values
+
+
+class _ClassState:
+    def __init__(self, weight: float, reserved: int):
+        self.weight = weight
+        self.reserved = reserved
+        self.in_use = 0
+        self.queue: Deque[tuple] = deque()  # (start tag, finish tag, future, enqueued at)
+        self.last_finish = 0.0
+        self.granted = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_ewma: Optional[float] = None
+
+
+class FairScheduler:
+    """Weighted fair queuing of DB sessions with reserved slots per priority class."""
+
+    def __init__(
+        self,
+        slots: int = 0,
+        weights: Optional[Dict[str, float]] = None,
+        reserved: Optional[Dict[str, int]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.slots = slots
+        self._clock = clock
+        weights = weights or {}
+        reserved = reserved or {}
+        self._classes: Dict[str, _ClassState] = {}
+        budget = slots
+        for name in PRIORITY_CLASSES:
+            # Reservations beyond the slot count are cut, in class order
+            keep = max(0, min(int(reserved.get(name, 0)), budget))
+            budget -= keep
+            self._classes[name] = _ClassState(max(float(weights.get(name, 1.0)), 1e-3), keep)
+        self._virtual_time = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "FairScheduler":
+        return cls(
+            settings.DB_SCHEDULER_SLOTS,
+            parse_classes(settings.DB_SCHEDULER_WEIGHTS),
+            {k: int(v) for k, v in parse_classes(settings.DB_SCHEDULER_RESERVED).items()},
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.slots > 0
+
+    @property
+    def in_use(self) -> int:
+        return sum(c.in_use for c in self._classes.values())
+
+    def _eligible(self, state: _ClassState) -> bool:
+        if state.in_use < state.reserved:
+            return True
+        # Slots not held back for other classes' unused reservations
+        unused_reserved = sum(max(0, c.reserved - c.in_use) for c in self._classes.values())
+        return self.slots - self.in_use - unused_reserved >= 1
+
+    def _dispatch(self) -> None:
+        while True:
+            best: Optional[_ClassState] = None
+            for state in self._classes.values():
+                while state.queue and state.queue[0][2].done():
+                    state.queue.popleft()  # cancelled while waiting
+                if state.queue and self._eligible(state) and (best is None or state.queue[0][1] < best.queue[0][1]):
+                    best = state
+            if best is None:
+                return
+            start, _finish, future, enqueued = best.queue.popleft()
+            self._virtual_time = max(self._virtual_time, start)
+            best.in_use += 1
+            self._record_wait(best, self._clock() - enqueued)
+            future.set_result(None)
+
+    def _record_wait(self, state: _ClassState, wait: float) -> None:
+        state.granted += 1
+        state.wait_total += wait
+        state.wait_max = max(state.wait_max, wait)
+        state.wait_ewma = wait if state.wait_ewma is None else 0.2 * wait + 0.8 * state.wait_ewma
+
+    def _release(self, state: _ClassState) -> None:
+        state.in_use -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, name: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold a DB slot in the given (default: the current) priority class."""
+        if not self.enabled:
+            yield
+            return
+        state = self._classes[name or db_priority.get()]
+        start = max(self._virtual_time, state.last_finish)
+        state.last_finish = start + 1 / state.weight
+        future = asyncio.get_running_loop().create_future()
+        state.queue.append((start, state.last_finish, future, self._clock()))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(state)
+            else:
+                self._dispatch()  # drop the cancelled entry
+            raise
+        try:
+            yield
+        finally:
+            self._release(state)
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        classes = {}
+        for name, state in self._classes.items():
+            classes[name] = {
+                "weight": state.weight,
+                "reserved": state.reserved,
+                "in_use": state.in_use,
+                "queued": sum(not entry[2].done() for entry in state.queue),
+                "granted": state.granted,
+                "wait_avg_ms": ms(state.wait_total / state.granted) if state.granted else None,
+                "wait_ewma_ms": ms(state.wait_ewma),
+                "wait_max_ms": ms(state.wait_max),
+            }
+        return {"enabled": self.enabled, "slots": self.slots, "in_use": self.in_use, "classes": classes}
+
+
+# Process-wide scheduler in front of the engine pool
+db_scheduler = FairScheduler.from_settings()
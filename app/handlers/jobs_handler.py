@@ -0,0 +1,68 @@
+# app/handlers/jobs_handler.py
+from __future__ import annotations
+
+import tornado.web
+from pydantic import ValidationError
+
+from app.jobs.queue import enqueue_report, get_arq, jobs_stats, report_job_params_from
+from app.jobs.results import job_status, load_page
+from app.models.query_params import ReportJobParams
+from app.utils import json_codec
+from app.utils.logger import log_exception, encoded_response, json_error, json_response
+
+
+class JobReportHandler(tornado.web.RequestHandler):
+    """POST /api/jobs/report — compute a report in the background worker (202 + job id)."""
+
+    async def post(self):
+        try:
+            try:
+                params = ReportJobParams.model_validate(json_codec.loads(self.request.body or b"{}"))
+            except ValidationError as e:
+                return json_error(self, e.errors()[0]["msg"], status=400)
+            except ValueError:
+                return json_error(self, "Request body must be a JSON object", status=400)
+
+            task_id = await enqueue_report(report_job_params_from(params))
+            status_url = f"/api/jobs/{task_id}"
+            self.set_header("Location", status_url)
+            return json_response(self, {"task_id": task_id, "status_url": status_url}, status=202)
+        except Exception as e:
+            log_exception(e, f"Error in {self.__class__.__name__}")
+            return json_error(self, "An internal server error occurred.", status=500)
+
+
+class JobsMetricsHandler(tornado.web.RequestHandler):
+    """Counters of jobs activity in Redis (queued, started, finished, failed, deduplicated)."""
+
+    async def get(self):
+        try:
+            return json_response(self, await jobs_stats(await get_arq()))
+        except Exception as e:
+            log_exception(e, f"Error in {self.__class__.__name__}")
+            return json_error(self, "An internal server error occurred.", status=500)
+
+
+class JobStatusHandler(tornado.web.RequestHandler):
+    """Status, progress and (once complete) result or result page links of a background job."""
+
+    async def get(self, task_id: str):
+        try:
+            return json_response(self, await job_status(await get_arq(), task_id))
+        except Exception as e:
+            log_exception(e, f"Error in {self.__class__.__name__}")
+            return json_error(self, "An internal server error occurred.", status=500)
+
+
+class JobResultPageHandler(tornado.web.RequestHandler):
+    """One NDJSON line of a finished report job, stored gzip-compressed."""
+
+    async def get(self, task_id: str, page: str):
+        try:
+            encoded = await load_page(await get_arq(), task_id, int(page))
+            if encoded is None:
+                return json_error(self, "Result page not found or expired", status=404)
+            return encoded_response(self, encoded)
+        except Exception as e:
+            log_exception(e, f"Error in {self.__class__.__name__}")
+            return json_error(self, "An internal server error occurred.", status=500)
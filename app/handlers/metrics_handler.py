@@ -1,11 +1,36 @@
+import calendar
+import math
+import time
+
 import tornado.web
 from pydantic import ValidationError
 
-from app.constants import MAIN_HEADERS, PEER_HEADERS, HOURLY_HEADERS, FIVE_MIN_HEADERS
-from app.models.query_params import MetricsQueryParams
+from app.constants import DIMENSION_FIELDS, MAIN_HEADERS, PEER_HEADERS, HOURLY_HEADERS, FIVE_MIN_HEADERS
+from app.models.query_params import MetricsQueryParams, MetricsSeriesParams, MetricsZoomParams
 from app.repositories.metrics_repository import MetricsRepository
+from app.config import settings
+from app.jobs.queue import enqueue_report, report_job_params_from
+from app.middleware.circuit_breaker import CircuitBreakerError, DeadlineExceeded, start_deadline
+from app.middleware.concurrency_limiter import Overloaded, report_limiter
+from app.services.cost_guard import ACTION_DOWNGRADE, ACTION_JOB, GRANULARITY_HEADER, CostDecision
 from app.services.metrics_service import MetricsService
-from app.utils.logger import log_info, log_exception, json_response, json_error
+from app.services.query_planner import query_planner
+from app.services.watermark_service import data_watermark
+from app.utils.baselines import parse_baselines
+from app.utils.arrow_format import ARROW_STREAM_MEDIA_TYPE, HAVE_ARROW, report_to_arrow_ipc, wants_arrow
+from app.utils import json_codec
+from app.utils.cache import Cache
+from app.utils.etag import build_etag
+from app.utils.executor import ExecutorBusy, cpu_executor
+from app.utils.logger import log_info, log_exception, json_response, json_stream_response, encoded_response, json_error
+from app.utils.response_cache import ResponseCache
+
+
+# Encoded report bodies (+ gzip/br variants), shared by all handler instances
+_response_cache = ResponseCache()
+
+# Values of ?format= (arrow only with pyarrow installed: 406 otherwise)
+OUTPUT_FORMATS = ("json", "ndjson", "arrow", "compact", "compact_v2")
 
 
 class BaseMetricsHandler(tornado.web.RequestHandler):
@@ -17,49 +42,188 @@ class BaseMetricsHandler(tornado.web.RequestHandler):
     def initialize(self, metrics_service: MetricsService | None = None):
         self.metrics_service = metrics_service or MetricsService(MetricsRepository())
 
+    def prepare(self):
+        # Each request runs in its own task, so the deadline covers this request only
+        start_deadline(settings.REQUEST_DEADLINE_MS / 1000)
+        return super().prepare()
+
+    def dependency_error(self, e: Exception):
+        """503 + Retry-After while a dependency's circuit is open, 504 past the request deadline."""
+        self.clear_header("Etag")
+        if isinstance(e, CircuitBreakerError):
+            self.set_header("Retry-After", str(max(1, math.ceil(e.recovery_time))))
+            return json_error(self, f"{e.service_name} is unavailable, retry later", status=503)
+        return json_error(self, str(e), status=504)
+
     def get_granularity(self) -> str | None:
         """Override in subclass to force specific granularity, or return None for query param."""
         return None
 
+    def get_output_format(self) -> str:
+        """Explicit ?format= wins; otherwise an Arrow Accept header selects arrow when available."""
+        fmt = self.get_argument("format", default="").lower()
+        if fmt:
+            return fmt
+        if HAVE_ARROW and wants_arrow(self.request.headers.get("Accept")):
+            return "arrow"
+        return "json"
+
     async def get(self):
         """Unified GET handler for all metrics endpoints."""
         try:
             log_info(f"GET {self.request.path} - Received request")
 
-            try:
-                query_args = {key: self.get_argument(key) for key in self.request.arguments}
-                params = MetricsQueryParams.model_validate(query_args)
-                log_info(f"Query params validated: {params.model_dump()}")
-            except ValidationError as e:
-                log_info(f"Validation failed: {e.errors()}")
-                error_details = e.errors()[0]
-                error_msg = f"Parameter '{error_details['loc'][0]}': {error_details['msg']}"
-                return json_error(self, error_msg, status=400)
+            params = self.parse_params(MetricsQueryParams)
+            if params is None:
+                return
+
+            fmt = self.get_output_format()
+            if fmt not in OUTPUT_FORMATS:
+                return json_error(
+                    self, f"Parameter 'format': must be one of {', '.join(OUTPUT_FORMATS)}", status=400,
+                )
+            if fmt == "arrow" and not HAVE_ARROW:
+                return json_error(self, "Arrow output is not available on this server.", status=406)
 
             # Use forced granularity from subclass or query param
             granularity = self.get_granularity() or params.granularity
 
-            report_data = await self.metrics_service.get_full_metrics_report(
-                customer=params.customer,
-                supplier=params.supplier,
-                destination=params.destination,
-                time_from=params.time_from,
-                time_to=params.time_to,
-                reverse=params.reverse,
-                granularity=granularity,
-            )
+            # Conditional GET: answer 304 from the cached watermark, before any DB work
+            normalized = self._normalized_params(params, granularity, fmt)
+            watermark = data_watermark.token()
+            if self.not_modified(build_etag(normalized, watermark)):
+                return
+
+            # Final bytes are cached per format (keyed with the watermark, like the ETag);
+            # ndjson is streamed and never cached
+            cache_key = None
+            if fmt != "ndjson":
+                cache_key = Cache.build_key("report:body", {**normalized, "watermark": watermark})
+                cached = await _response_cache.get(cache_key)
+                if cached is not None:
+                    return encoded_response(self, cached)
+
+            # Computation holds a slot of the adaptive concurrency limit (503 when none is free)
+            async with report_limiter.admit():
+                # Pre-flight cost check: expensive reports are downgraded or become background jobs
+                baselines = parse_baselines(params.baselines)
+                decision = await self.metrics_service.check_cost(
+                    params.customer, params.supplier, params.destination,
+                    params.time_from, params.time_to, granularity, baselines,
+                )
+                if decision.action == ACTION_JOB:
+                    return await self._accept_job(params, granularity, decision)
+                # A downgraded granularity is stored with the body and sent on hits too
+                stored = None
+                if decision.action == ACTION_DOWNGRADE:
+                    stored = {GRANULARITY_HEADER: decision.granularity}
+                    self.set_header(GRANULARITY_HEADER, decision.granularity)
+                granularity = decision.granularity
 
-            fmt = self.get_argument("format", default="json").lower()
-            if fmt == "compact":
-                compact = self._to_compact_format(report_data)
-                return json_response(self, compact)
+                report_data = await self.metrics_service.get_full_metrics_report(
+                    customer=params.customer,
+                    supplier=params.supplier,
+                    destination=params.destination,
+                    time_from=params.time_from,
+                    time_to=params.time_to,
+                    reverse=params.reverse,
+                    granularity=granularity,
+                    sort=params.sort,
+                    limit=params.limit,
+                    min_share=params.min_share,
+                    lazy=params.lazy,
+                    baselines=baselines,
+                )
 
-            return json_response(self, report_data)
+            if fmt == "ndjson":
+                # Stream totals first, then row sections in flushed chunks
+                return await json_stream_response(self, report_data)
 
+            delta_time = self.get_argument("delta_time", default="false").lower() in ("1", "true")
+            # Serialization is CPU-bound too; orjson/arrow output is bytes, so threads suffice
+            body, content_type = await cpu_executor.run(
+                self._encode_report, report_data, fmt, delta_time, threaded=True
+            )
+            encoded = await _response_cache.put(cache_key, body, content_type, stored)
+            return encoded_response(self, encoded)
+
+        except (ExecutorBusy, Overloaded) as e:
+            # Report executor queue is full or DB-bound work is saturated: shed load
+            # instead of queueing without bound
+            self.clear_header("Etag")
+            self.set_header("Retry-After", str(e.retry_after))
+            return json_error(self, str(e), status=503)
+        except (CircuitBreakerError, DeadlineExceeded) as e:
+            return self.dependency_error(e)
         except Exception as e:
             log_exception(e, f"Error in {self.__class__.__name__}")
+            self.clear_header("Etag")
             return json_error(self, "An internal server error occurred.", status=500)
 
+    async def _accept_job(self, params, granularity: str, decision: CostDecision):
+        """Answer 202 with the id of a background job computing the report."""
+        task_id = await enqueue_report(report_job_params_from(params, granularity))
+        status_url = f"/api/jobs/{task_id}"
+        self.clear_header("Etag")
+        self.set_header("Location", status_url)
+        return json_response(
+            self,
+            {"task_id": task_id, "status_url": status_url, "estimated_rows": decision.estimated_rows},
+            status=202,
+        )
+
+    def parse_params(self, model: type[MetricsQueryParams]) -> MetricsQueryParams | None:
+        """Validate query arguments into model; writes a 400 and returns None on failure."""
+        try:
+            query_args = {key: self.get_argument(key) for key in self.request.arguments}
+            params = model.model_validate(query_args)
+            log_info(f"Query params validated: {params.model_dump()}")
+            return params
+        except ValidationError as e:
+            log_info(f"Validation failed: {e.errors()}")
+            error_details = e.errors()[0]
+            # Cross-field (model) validators report an empty loc
+            if error_details['loc']:
+                error_msg = f"Parameter '{error_details['loc'][0]}': {error_details['msg']}"
+            else:
+                error_msg = error_details['msg']
+            json_error(self, error_msg, status=400)
+            return None
+
+    def not_modified(self, etag: str | None) -> bool:
+        """Set ETag headers; answer 304 and return True when If-None-Match matches."""
+        if not etag:
+            return False
+        self.set_header("Etag", etag)
+        self.set_header("Cache-Control", "no-cache")
+        if self.check_etag_header():
+            log_info(f"GET {self.request.path} → 304")
+            self.set_status(304)
+            return True
+        return False
+
+    def _normalized_params(self, params: MetricsQueryParams, granularity: str, fmt: str) -> dict:
+        """Everything that determines the response body; input for the ETag and the body cache key."""
+        return {
+            **params.model_dump(),
+            "path": self.request.path,
+            "granularity": granularity,
+            "format": fmt,
+            "delta_time": self.get_argument("delta_time", default=""),
+        }
+
+    @classmethod
+    def _encode_report(cls, data: dict, fmt: str, delta_time: bool = False) -> tuple[bytes, str]:
+        """Encode a report in the requested format: (body, content type)."""
+        if fmt == "compact":
+            return json_codec.dumps_chunked(cls._to_compact_format(data)), "application/json"
+        if fmt == "compact_v2":
+            return json_codec.dumps_chunked(cls._to_compact_v2_format(data, delta_time=delta_time)), "application/json"
+        if fmt == "arrow":
+            # One typed record batch per section
+            return report_to_arrow_ipc(data), ARROW_STREAM_MEDIA_TYPE
+        return json_codec.dumps_chunked(data), "application/json"
+
     @staticmethod
     def _to_compact_format(data: dict) -> dict:
         """
@@ -83,6 +247,77 @@ class BaseMetricsHandler(tornado.web.RequestHandler):
             out["five_min"] = compact_rows(data.get("five_min_rows", []), FIVE_MIN_HEADERS)
         return out
 
+    @staticmethod
+    def _to_compact_v2_format(data: dict, delta_time: bool = False) -> dict:
+        """
+        Compact v2: like compact, but dimension strings (main, peer, destination,
+        time, slot) are replaced by integer codes into one shared `dict` list.
+        With delta_time, `time` instead holds UTC epoch seconds delta-encoded
+        per section (first row absolute, then difference to the previous row).
+        Each section lists its per-column `encodings`.
+        """
+        strings: list[str] = []
+        codes: dict[str, int] = {}
+        epochs: dict[str, int] = {}
+
+        def encode(value):
+            if value is None:
+                return None
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(strings)
+                strings.append(value)
+            return code
+
+        def to_epoch(value) -> int | None:
+            if value is None:
+                return None
+            epoch = epochs.get(value)
+            if epoch is None:
+                # "YYYY-MM-DD HH:MM" in UTC; parsed once per distinct bucket
+                epoch = epochs[value] = calendar.timegm(time.strptime(value, "%Y-%m-%d %H:%M"))
+            return epoch
+
+        def compact_rows(rows: list[dict], header_fields: list[str]):
+            delta_cols = {"time"} if delta_time else set()
+            encodings = {
+                k: ("delta" if k in delta_cols else "dict")
+                for k in header_fields if k in DIMENSION_FIELDS
+            }
+            rows_compact = []
+            prev_epoch = 0
+            for row in rows:
+                out_row = []
+                for k in header_fields:
+                    enc = encodings.get(k)
+                    if enc == "dict":
+                        out_row.append(encode(row.get(k)))
+                    elif enc == "delta":
+                        epoch = to_epoch(row.get(k))
+                        if epoch is None:
+                            out_row.append(None)
+                        else:
+                            out_row.append(epoch - prev_epoch)
+                            prev_epoch = epoch
+                    else:
+                        out_row.append(row.get(k))
+                rows_compact.append(out_row)
+            return {"headers": header_fields, "encodings": encodings, "rows": rows_compact}
+
+        out = {
+            "version": 2,
+            "today_metrics": data.get("today_metrics", {}),
+            "yesterday_metrics": data.get("yesterday_metrics", {}),
+            "main": compact_rows(data.get("main_rows", []), MAIN_HEADERS),
+            "peer": compact_rows(data.get("peer_rows", []), PEER_HEADERS),
+            "hourly": compact_rows(data.get("hourly_rows", []), HOURLY_HEADERS),
+        }
+        if isinstance(data.get("five_min_rows"), list) and data.get("five_min_rows"):
+            out["five_min"] = compact_rows(data.get("five_min_rows", []), FIVE_MIN_HEADERS)
+        # Filled while encoding rows; shared by all sections
+        out["dict"] = strings
+        return out
+
 # Backward-compatible alias
 MetricsHandler = BaseMetricsHandler
 
@@ -98,4 +333,93 @@ class Metrics1hHandler(BaseMetricsHandler):
     """Handler for /api/metrics/1h — forces 1-hour granularity."""
     
     def get_granularity(self) -> str:
-        return "1h"
\ No newline at end of file
+        return "1h"
+
+
+class MetricsSeriesHandler(BaseMetricsHandler):
+    """Handler for /api/metrics/series — hourly/5m rows of one group, fetched on expand."""
+
+    async def get(self):
+        try:
+            log_info(f"GET {self.request.path} - Received request")
+
+            params = self.parse_params(MetricsSeriesParams)
+            if params is None:
+                return
+
+            if self.not_modified(build_etag(
+                self._normalized_params(params, params.granularity, "json"), data_watermark.token()
+            )):
+                return
+
+            series = await self.metrics_service.get_series(
+                customer=params.customer,
+                supplier=params.supplier,
+                destination=params.destination,
+                time_from=params.time_from,
+                time_to=params.time_to,
+                main=params.main,
+                peer=params.peer,
+                dest=params.dest,
+                reverse=params.reverse,
+                granularity=params.granularity,
+                sort=params.sort,
+                limit=params.limit,
+                min_share=params.min_share,
+                baselines=parse_baselines(params.baselines),
+            )
+            return json_response(self, series)
+
+        except (CircuitBreakerError, DeadlineExceeded) as e:
+            return self.dependency_error(e)
+        except Exception as e:
+            log_exception(e, f"Error in {self.__class__.__name__}")
+            self.clear_header("Etag")
+            return json_error(self, "An internal server error occurred.", status=500)
+
+
+class MetricsZoomHandler(BaseMetricsHandler):
+    """Handler for /api/metrics/zoom — main/peer rows re-aggregated over a chart zoom window."""
+
+    async def get(self):
+        try:
+            log_info(f"GET {self.request.path} - Received request")
+
+            params = self.parse_params(MetricsZoomParams)
+            if params is None:
+                return
+
+            if self.not_modified(build_etag(
+                self._normalized_params(params, params.granularity, "json"), data_watermark.token()
+            )):
+                return
+
+            zoom = await self.metrics_service.get_zoom(
+                customer=params.customer,
+                supplier=params.supplier,
+                destination=params.destination,
+                time_from=params.time_from,
+                time_to=params.time_to,
+                zoom_from=params.zoom_from,
+                zoom_to=params.zoom_to,
+                reverse=params.reverse,
+                sort=params.sort,
+                limit=params.limit,
+                min_share=params.min_share,
+                baselines=parse_baselines(params.baselines),
+            )
+            return json_response(self, zoom)
+
+        except (CircuitBreakerError, DeadlineExceeded) as e:
+            return self.dependency_error(e)
+        except Exception as e:
+            log_exception(e, f"Error in {self.__class__.__name__}")
+            self.clear_header("Etag")
+            return json_error(self, "An internal server error occurred.", status=500)
+
+
+class MetricsPlannerHandler(tornado.web.RequestHandler):
+    """Handler for /api/metrics/planner — fetch strategy latencies and recent decisions."""
+
+    def get(self):
+        return json_response(self, query_planner.snapshot())
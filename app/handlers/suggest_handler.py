@@ -1,10 +1,15 @@
 # app/handlers/suggest_handler.py
 from __future__ import annotations
 
+import math
+
 import tornado.web
 from sqlalchemy import select, func
 
+from app.config import settings
 from app.db.base import get_session
+from app.db.scheduler import TYPEAHEAD, priority_class
+from app.middleware.circuit_breaker import CircuitBreakerError, DeadlineExceeded, start_deadline
 from app.models.aggregation_table import sonus_aggregation_new
 from app.utils.logger import log_info, json_error, json_response
 
@@ -12,6 +17,11 @@ from app.utils.logger import log_info, json_error, json_response
 class SuggestHandler(tornado.web.RequestHandler):
     """Return unique values for customer/supplier/destination with optional prefix filter."""
 
+    def prepare(self):
+        # Typeahead answers are only useful quickly: bound the DB call by the request deadline
+        start_deadline(settings.REQUEST_DEADLINE_MS / 1000)
+        return super().prepare()
+
     async def get(self, kind: str):
         # Validate kind and map to column
         kind = (kind or "").lower()
@@ -34,10 +44,18 @@ class SuggestHandler(tornado.web.RequestHandler):
             # Prefix search, case-insensitive
             stmt = stmt.where(col.ilike(f"{q}%"))
 
-        async with get_session() as session:
-            res = await session.execute(stmt)
-            # Use scalars() to get first column values
-            values = [v for v in res.scalars().all() if v is not None]
+        # Typeahead keeps its reserved DB slot even while crawls and reports queue
+        try:
+            with priority_class(TYPEAHEAD):
+                async with get_session() as session:
+                    res = await session.execute(stmt)
+                    # Use scalars() to get first column values
+                    values = [v for v in res.scalars().all() if v is not None]
+        except CircuitBreakerError as e:
+            self.set_header("Retry-After", str(max(1, math.ceil(e.recovery_time))))
+            return json_error(self, f"{e.service_name} is unavailable, retry later", status=503)
+        except DeadlineExceeded as e:
+            return json_error(self, str(e), status=504)
 
         # Return as an object to satisfy json_response(dict)
         return json_response(self, {"items": values})
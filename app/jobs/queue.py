@@ -0,0 +1,129 @@
+# app/jobs/queue.py
+# Shared arq connection for enqueueing background jobs from both servers
+# (FastAPI routers and Tornado handlers).
+#
+# Report jobs are idempotent: the job id is derived from the normalized
+# params, so an identical submission gets the queued/running job, or a
+# finished one younger than REPORT_JOB_REUSE_SECONDS, instead of a new run.
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from arq.connections import ArqRedis, RedisSettings, create_pool
+from arq.constants import default_queue_name
+
+from app.config import settings
+from app.jobs.results import discard, reusable
+from app.utils.baselines import format_baselines, parse_baselines
+
+REPORT_JOB_FUNCTION = "generate_metrics_report"
+DEDUPLICATED_COUNTER = "jobs:deduplicated"
+
+# Module-level connection pool (lazy init)
+_arq_pool: Optional[ArqRedis] = None
+
+
+async def get_arq() -> ArqRedis:
+    """Get or create shared ArqRedis connection pool."""
+    global _arq_pool
+    if _arq_pool is None:
+        _arq_pool = await create_pool(RedisSettings.from_dsn(settings.REDIS_URL))
+    return _arq_pool
+
+
+async def jobs_stats(arq: ArqRedis) -> Dict[str, int]:
+    """Queue length and the worker/enqueue counters kept in Redis."""
+
+    async def _get_int(key: str) -> int:
+        v = await arq.get(key)
+        try:
+            return int(v) if v is not None else 0
+        except Exception:
+            return 0
+
+    # arq's queue is a sorted set of job ids scored by run time
+    queued = await arq.zcard(default_queue_name)
+    return {
+        "queued": queued or 0,
+        "started": await _get_int("jobs:started"),
+        "finished": await _get_int("jobs:finished"),
+        "failed": await _get_int("jobs:failed"),
+        "deduplicated": await _get_int(DEDUPLICATED_COUNTER),
+    }
+
+
+def report_job_params(
+    customer: Optional[str],
+    supplier: Optional[str],
+    destination: Optional[str],
+    time_from: datetime,
+    time_to: datetime,
+    reverse: bool = False,
+    granularity: str = "both",
+    sort: Optional[str] = None,
+    limit: Optional[int] = None,
+    min_share: Optional[float] = None,
+    lazy: bool = False,
+    baselines: str = "",
+) -> Dict[str, Any]:
+    """
+    JSON-friendly arguments of a report job, normalized so that equivalent
+    requests are equal: times as UTC ISO 8601 (naive taken as UTC), baselines
+    as their canonical spec string.
+    """
+    return {
+        "customer": customer,
+        "supplier": supplier,
+        "destination": destination,
+        "time_from": _utc_iso(time_from),
+        "time_to": _utc_iso(time_to),
+        "reverse": reverse,
+        "granularity": granularity,
+        "sort": sort,
+        "limit": limit,
+        "min_share": min_share,
+        "lazy": lazy,
+        "baselines": format_baselines(parse_baselines(baselines)),
+    }
+
+
+def _utc_iso(dt: datetime) -> str:
+    dt = dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+    return dt.isoformat()
+
+
+def report_job_params_from(params, granularity: Optional[str] = None) -> Dict[str, Any]:
+    """report_job_params of validated report query params (MetricsQueryParams or a subclass)."""
+    return report_job_params(
+        params.customer, params.supplier, params.destination, params.time_from, params.time_to,
+        params.reverse, granularity or params.granularity, params.sort, params.limit, params.min_share,
+        params.lazy, params.baselines or "",
+    )
+
+
+def report_job_id(params: Dict[str, Any]) -> str:
+    """Deterministic job id of report_job_params (equal params -> equal id)."""
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return "report:" + hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+async def enqueue_report(params: Dict[str, Any]) -> str:
+    """
+    Enqueue generate_metrics_report with report_job_params; returns the job id.
+    An identical in-flight or fresh finished job is returned instead (counted in
+    jobs:deduplicated); a stale or failed one is discarded and run again.
+    """
+    arq = await get_arq()
+    job_id = report_job_id(params)
+    if await arq.enqueue_job(REPORT_JOB_FUNCTION, params, _job_id=job_id) is not None:
+        return job_id
+
+    if not await reusable(arq, job_id, settings.REPORT_JOB_REUSE_SECONDS):
+        await discard(arq, job_id)
+        if await arq.enqueue_job(REPORT_JOB_FUNCTION, params, _job_id=job_id) is not None:
+            return job_id
+    # Otherwise a concurrent identical submission enqueued it first
+    await arq.incr(DEDUPLICATED_COUNTER)
+    return job_id
@@ -0,0 +1,118 @@
+# app/jobs/results.py
+# Progress and paged results of background report jobs in Redis.
+#
+# A finished report is stored as its NDJSON lines (app.utils.report_stream:
+# totals, row chunks, end), one gzip-compressed page per line, so large
+# results are fetched page by page (GET /api/jobs/{id}/result/{page}) instead
+# of as one response held open. The arq job result itself is only a small
+# manifest (page count, row counts); progress is a JSON record updated as
+# the worker moves through time chunks.
+
+import gzip
+import time
+from typing import Any, Dict, List, Optional
+
+from arq.constants import result_key_prefix
+from arq.jobs import Job, JobStatus
+
+from app.utils import json_codec
+from app.utils.report_stream import NDJSON_MEDIA_TYPE, REPORT_SECTIONS, iter_report_ndjson
+from app.utils.response_cache import EncodedBody
+
+PAGE_MEDIA_TYPE = NDJSON_MEDIA_TYPE
+PAGE_ENCODING = "gzip"
+
+
+def progress_key(job_id: str) -> str:
+    return f"jobs:progress:{job_id}"
+
+
+def page_key(job_id: str, page: int) -> str:
+    return f"jobs:result:{job_id}:{page}"
+
+
+def page_urls(job_id: str, pages: int) -> List[str]:
+    return [f"/api/jobs/{job_id}/result/{n}" for n in range(pages)]
+
+
+async def set_progress(redis, job_id: str, percent: int, stage: str, ttl: int, **extra: Any) -> None:
+    record = {"percent": percent, "stage": stage, "updated_at": time.time(), **extra}
+    await redis.set(progress_key(job_id), json_codec.dumps(record), ex=ttl)
+
+
+async def get_progress(redis, job_id: str) -> Optional[Dict[str, Any]]:
+    raw = await redis.get(progress_key(job_id))
+    return json_codec.loads(raw) if raw else None
+
+
+async def store_pages(redis, job_id: str, report: Dict[str, Any], page_rows: int, ttl: int) -> Dict[str, Any]:
+    """Store report as gzip NDJSON pages with a TTL; returns the manifest (the job result)."""
+    pages = 0
+    size = 0
+    for line in iter_report_ndjson(report, chunk_rows=page_rows):
+        # mtime=0 keeps pages deterministic for identical reports
+        body = gzip.compress(line, mtime=0)
+        await redis.set(page_key(job_id, pages), body, ex=ttl)
+        pages += 1
+        size += len(body)
+    return {
+        "pages": pages,
+        "counts": {section: len(report.get(key) or []) for key, section in REPORT_SECTIONS},
+        "compressed_bytes": size,
+        "media_type": PAGE_MEDIA_TYPE,
+        "encoding": PAGE_ENCODING,
+    }
+
+
+async def load_page(redis, job_id: str, page: int) -> Optional[EncodedBody]:
+    """A result page (gzip as stored, plus identity), or None when missing/expired."""
+    body = await redis.get(page_key(job_id, page))
+    if body is None:
+        return None
+    return EncodedBody(PAGE_MEDIA_TYPE, {"gzip": body, "identity": gzip.decompress(body)})
+
+
+async def job_status(redis, job_id: str) -> Dict[str, Any]:
+    """
+    Status of a job: arq status, progress record and, once complete, the result.
+    Report jobs return a page manifest; its page URLs are listed in "pages".
+    """
+    job = Job(job_id, redis)
+    status = await job.status()
+    out: Dict[str, Any] = {
+        "task_id": job_id,
+        "status": status.value,
+        "progress": await get_progress(redis, job_id),
+        "result": None,
+        "pages": None,
+        "error": None,
+    }
+    if status == JobStatus.complete:
+        info = await job.result_info()
+        if info is not None and not info.success:
+            out["status"] = "failed"
+            out["error"] = str(info.result)
+        elif info is not None:
+            out["result"] = info.result
+            if isinstance(info.result, dict) and info.result.get("media_type") == PAGE_MEDIA_TYPE:
+                out["pages"] = page_urls(job_id, info.result["pages"])
+    return out
+
+
+async def reusable(redis, job_id: str, max_age: float) -> bool:
+    """
+    Whether an existing job may answer an identical submission: it is still
+    queued or running, or it succeeded at most max_age seconds ago and its
+    first result page has not expired.
+    """
+    info = await Job(job_id, redis).result_info()
+    if info is None:
+        return True
+    if not info.success or time.time() - info.finish_time.timestamp() > max_age:
+        return False
+    return bool(await redis.exists(page_key(job_id, 0)))
+
+
+async def discard(redis, job_id: str) -> None:
+    """Forget a finished job's result and progress so its id can be enqueued again."""
+    await redis.delete(result_key_prefix + job_id, progress_key(job_id))
@@ -1,56 +1,87 @@
-from arq import cron
+from datetime import datetime
+
+from arq import cron, func
 from arq.connections import RedisSettings
+from arq.constants import job_key_prefix
 from opentelemetry import trace
 from app.utils.telemetry import init_otel
 from app.config import settings
+from app.db.scheduler import BACKGROUND, priority_class
+from app.jobs.results import set_progress, store_pages
+from app.repositories.metrics_repository import MetricsRepository
+from app.services.metrics_service import MetricsService
+from app.utils.baselines import parse_baselines
+from app.utils.redis_maintenance import unlink_matching
 
 
-async def generate_report(ctx, customer: str, supplier: str, hours: int) -> dict:
-    """Example long-running report generation with simple counters."""
+async def generate_metrics_report(ctx, params: dict) -> dict:
+    """
+    Full metrics report for app.jobs.queue.report_job_params, computed through
+    the regular MetricsService pipeline. Long ranges are aggregated in
+    REPORT_JOB_CHUNK_SECONDS time chunks with progress published to Redis; the
+    report is stored as compressed result pages and the job returns their manifest.
+    """
     r = ctx["redis"]
+    job_id = ctx["job_id"]
+    ttl = settings.REPORT_JOB_RESULT_TTL
     tracer = trace.get_tracer("worker")
     await r.incr("jobs:started")
     try:
-        with tracer.start_as_current_span("generate_report"):
-            # Placeholder work
-            result = {
-                "customer": customer,
-                "supplier": supplier,
-                "hours": hours,
-                "status": "completed",
-            }
+        with tracer.start_as_current_span("generate_metrics_report"), priority_class(BACKGROUND):
+            await set_progress(r, job_id, 0, "aggregate", ttl)
+
+            async def progress(done: int, total: int) -> None:
+                # Fetching and aggregating is most of the work; assembling and storing the rest
+                await set_progress(r, job_id, 90 * done // total, "aggregate", ttl, chunks_done=done, chunks_total=total)
+
+            service = MetricsService(MetricsRepository())
+            report = await service.get_full_metrics_report(
+                customer=params["customer"],
+                supplier=params["supplier"],
+                destination=params["destination"],
+                time_from=datetime.fromisoformat(params["time_from"]),
+                time_to=datetime.fromisoformat(params["time_to"]),
+                reverse=params["reverse"],
+                granularity=params["granularity"],
+                sort=params["sort"],
+                limit=params["limit"],
+                min_share=params["min_share"],
+                lazy=params["lazy"],
+                baselines=parse_baselines(params["baselines"]),
+                chunk_seconds=settings.REPORT_JOB_CHUNK_SECONDS,
+                progress=progress,
+            )
+
+            await set_progress(r, job_id, 95, "store", ttl)
+            manifest = await store_pages(r, job_id, report, settings.REPORT_JOB_PAGE_ROWS, ttl)
+            await set_progress(r, job_id, 100, "complete", ttl)
             await r.incr("jobs:finished")
-            return result
+            return manifest
     except Exception:
         await r.incr("jobs:failed")
         raise
 
 
-generate_report.job_keep_result = 3600  # keep result for 1 hour
-
-
 async def cleanup_jobs(ctx) -> dict:
-    """Periodic cleanup: remove non-expiring ARQ job keys to prevent growth."""
-    r = ctx["redis"]
-    removed = 0
-    cursor = 0
-    pattern = "arq:job:*"
-    while True:
-        cursor, keys = await r.scan(cursor=cursor, match=pattern, count=500)
-        if keys:
-            # delete keys that have no TTL (ttl == -1)
-            for k in keys:
-                ttl = await r.ttl(k)
-                if ttl == -1:
-                    await r.delete(k)
-                    removed += 1
-        if cursor == 0:
-            break
-    return {"removed": removed}
+    """
+    Periodic cleanup: remove non-expiring ARQ job keys to prevent growth.
+    Keys are checked and unlinked server-side a SCAN page at a time, paced by
+    REDIS_MAINTENANCE_BUDGET; the run's counts and duration are the job result.
+    """
+    run = await unlink_matching(ctx["redis"], job_key_prefix + "*", persistent_only=True)
+    return {"removed": run["deleted"], **run}
 
 
 class WorkerSettings:
-    functions = [generate_report, cleanup_jobs]
+    # The job's status/manifest lives as long as its pages; long ranges may exceed arq's 300s default
+    functions = [
+        func(
+            generate_metrics_report,
+            keep_result=settings.REPORT_JOB_RESULT_TTL,
+            timeout=settings.REPORT_JOB_TIMEOUT_SECONDS,
+        ),
+        cleanup_jobs,
+    ]
     redis_settings = RedisSettings.from_dsn(settings.REDIS_URL)
     cron_jobs = [
         cron(cleanup_jobs, minute={0, 15, 30, 45}),
@@ -13,6 +13,8 @@ from app.observability.logger import configure_logging
 from app.observability.tracing import init_tracing
 
 from app.db.db import init_db_pool, get_db_pool
+from app.services.shard_service import shard_aggregator
+from app.utils.executor import cpu_executor
 
 # A global list to hold shutdown tasks
 shutdown_tasks = []
@@ -67,6 +69,12 @@ async def main():
     # Add the DB closing task to our list of shutdown tasks.
     shutdown_tasks.append(close_db_pool)
 
+    # Stop sharded-aggregation and report executor workers (started on first use)
+    async def stop_report_workers():
+        shard_aggregator.shutdown()
+        cpu_executor.shutdown()
+    shutdown_tasks.append(stop_report_workers)
+
     # 3. Create and start the Tornado application.
     app = make_app()
     app.listen(config.PORT, address=config.HOST)
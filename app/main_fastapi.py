@@ -12,13 +12,16 @@ from app.routers.state import router as state_router
 from app.utils.telemetry import init_otel
 from app.db.base import async_engine
 from app.middleware.rate_limiter import RateLimitMiddleware
+from app.middleware.circuit_breaker import DeadlineMiddleware
 from app.middleware.error_handler import ErrorHandlerMiddleware, setup_exception_handlers
+from app.utils.json_codec import FastJSONResponse
 from app import config
 
 app = FastAPI(
     title="Metrics API",
     description="Async API for fetching and managing call metrics",
     version="1.0.0",
+    default_response_class=FastJSONResponse,
 )
 
 # Add middleware (order matters: first added = outermost)
@@ -26,6 +29,8 @@ app = FastAPI(
 app.add_middleware(ErrorHandlerMiddleware, debug=config.DEBUG)
 # Rate limiter protects from DDoS
 app.add_middleware(RateLimitMiddleware, api_limit=60, general_limit=200)
+# Time budget of /api requests; DB and Redis calls are bounded by what is left
+app.add_middleware(DeadlineMiddleware, seconds=config.settings.REQUEST_DEADLINE_MS / 1000)
 
 # Register exception handlers
 setup_exception_handlers(app)
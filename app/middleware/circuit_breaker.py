@@ -1,12 +1,16 @@
 # app/middleware/circuit_breaker.py
 # Circuit breaker pattern implementation
 # Prevents cascade failures by temporarily disabling failing services
+# (on errors or slow calls), and request deadlines that bound how long
+# DB and Redis calls may take
 
 import time
 import asyncio
 import logging
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from enum import Enum
-from typing import Callable, Any, Optional
+from typing import AsyncIterator, Callable, Any, Iterator, Optional
 from functools import wraps
 
 logger = logging.getLogger(__name__)
@@ -30,6 +34,22 @@ class CircuitBreakerError(Exception):
         )
 
 
+class _CallTimer:
+    """Start of the call guarded by CircuitBreaker.guard(), for its slow-call check."""
+    __slots__ = ("_clock", "start")
+
+    def __init__(self, clock: Callable[[], float]):
+        self._clock = clock
+        self.start = clock()
+
+    def restart(self) -> None:
+        """Time the call from now on (e.g. once a queued resource is acquired)."""
+        self.start = self._clock()
+
+    def elapsed(self) -> float:
+        return self._clock() - self.start
+
+
 class CircuitBreaker:
     """
     Circuit breaker implementation.
@@ -43,6 +63,11 @@ class CircuitBreaker:
     - failure_threshold: Number of failures before opening circuit
     - recovery_timeout: Seconds to wait before trying again (OPEN -> HALF_OPEN)
     - success_threshold: Successes in HALF_OPEN to close circuit
+    - slow_call_threshold: Calls slower than this (seconds) count as failures
+      even when they succeed, so a service that hangs opens the circuit too
+    - exceptions: Errors that count as failures; others pass through untracked
+    - ignored: Errors that never count, even when they subclass one of
+      `exceptions` (e.g. DeadlineExceeded: the caller ran out of time)
     """
     
     def __init__(
@@ -50,18 +75,30 @@ class CircuitBreaker:
         name: str,
         failure_threshold: int = 5,
         recovery_timeout: float = 30.0,
-        success_threshold: int = 2
+        success_threshold: int = 2,
+        slow_call_threshold: Optional[float] = None,
+        exceptions: tuple = (Exception,),
+        ignored: tuple = (),
+        clock: Callable[[], float] = time.monotonic,
     ):
         self.name = name
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
         self.success_threshold = success_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.exceptions = exceptions
+        self.ignored = ignored
+        self._clock = clock
         
         self._state = CircuitState.CLOSED
         self._failure_count = 0
         self._success_count = 0
         self._last_failure_time: Optional[float] = None
         self._lock = asyncio.Lock()
+        # Totals for snapshot()
+        self._rejected = 0
+        self._slow_calls = 0
+        self._opened = 0
     
     @property
     def state(self) -> CircuitState:
@@ -79,7 +116,7 @@ class CircuitBreaker:
         """Check if enough time has passed to try recovery."""
         if self._last_failure_time is None:
             return True
-        return time.time() - self._last_failure_time >= self.recovery_timeout
+        return self._clock() - self._last_failure_time >= self.recovery_timeout
     
     def _transition_to(self, new_state: CircuitState):
         """Transition to a new state with logging."""
@@ -88,6 +125,8 @@ class CircuitBreaker:
                 f"Circuit breaker '{self.name}': {self._state.value} -> {new_state.value}"
             )
             self._state = new_state
+            if new_state == CircuitState.OPEN:
+                self._opened += 1
     
     async def _handle_success(self):
         """Handle successful call."""
@@ -106,7 +145,7 @@ class CircuitBreaker:
         """Handle failed call."""
         async with self._lock:
             self._failure_count += 1
-            self._last_failure_time = time.time()
+            self._last_failure_time = self._clock()
             
             if self._state == CircuitState.HALF_OPEN:
                 # Any failure in half-open returns to open
@@ -116,36 +155,56 @@ class CircuitBreaker:
                 if self._failure_count >= self.failure_threshold:
                     self._transition_to(CircuitState.OPEN)
     
-    async def call(self, func: Callable, *args, **kwargs) -> Any:
-        """
-        Execute function through circuit breaker.
-        Raises CircuitBreakerError if circuit is open.
-        """
+    async def _before_call(self):
+        """Raise CircuitBreakerError while open; move to HALF_OPEN once the recovery timeout passed."""
         async with self._lock:
-            # Check if we should transition from OPEN to HALF_OPEN
             if self._state == CircuitState.OPEN:
                 if self._should_attempt_reset():
                     self._transition_to(CircuitState.HALF_OPEN)
                     self._success_count = 0
                 else:
-                    remaining = self.recovery_timeout - (time.time() - (self._last_failure_time or 0))
+                    self._rejected += 1
+                    remaining = self.recovery_timeout - (self._clock() - (self._last_failure_time or 0))
                     raise CircuitBreakerError(self.name, max(0, remaining))
-        
+    
+    @asynccontextmanager
+    async def guard(self, timed: bool = True) -> AsyncIterator[_CallTimer]:
+        """
+        Run the block through the circuit breaker (like call(), for code that
+        holds a resource such as a DB session across several awaits).
+        Yields the call's timer; restart() it to leave queueing out of the
+        slow-call check, or pass timed=False for calls expected to be slow
+        (bulk transfers): only their errors count. Raises CircuitBreakerError
+        if circuit is open.
+        """
+        await self._before_call()
+        timer = _CallTimer(self._clock)
         try:
-            # Execute the function
-            if asyncio.iscoroutinefunction(func):
-                result = await func(*args, **kwargs)
-            else:
-                result = func(*args, **kwargs)
-            
-            await self._handle_success()
-            return result
-            
+            yield timer
         except CircuitBreakerError:
             raise
-        except Exception as e:
+        except self.ignored:
+            raise
+        except self.exceptions:
             await self._handle_failure()
             raise
+        else:
+            if timed and self.slow_call_threshold and timer.elapsed() > self.slow_call_threshold:
+                self._slow_calls += 1
+                await self._handle_failure()
+            else:
+                await self._handle_success()
+    
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Execute function through circuit breaker.
+        Raises CircuitBreakerError if circuit is open.
+        """
+        async with self.guard():
+            # Execute the function
+            if asyncio.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            return func(*args, **kwargs)
     
     def reset(self):
         """Manually reset the circuit breaker."""
@@ -154,6 +213,18 @@ class CircuitBreaker:
         self._success_count = 0
         self._last_failure_time = None
         logger.info(f"Circuit breaker '{self.name}' manually reset")
+    
+    def snapshot(self) -> dict:
+        return {
+            "state": self._state.value,
+            "failures": self._failure_count,
+            "opened": self._opened,
+            "rejected": self._rejected,
+            "slow_calls": self._slow_calls,
+            "slow_call_threshold_ms": (
+                None if not self.slow_call_threshold else round(self.slow_call_threshold * 1000, 1)
+            ),
+        }
 
 
 # Global circuit breaker registry
@@ -164,7 +235,10 @@ def get_circuit_breaker(
     name: str,
     failure_threshold: int = 5,
     recovery_timeout: float = 30.0,
-    success_threshold: int = 2
+    success_threshold: int = 2,
+    slow_call_threshold: Optional[float] = None,
+    exceptions: tuple = (Exception,),
+    ignored: tuple = ()
 ) -> CircuitBreaker:
     """Get or create a circuit breaker by name."""
     if name not in _circuit_breakers:
@@ -172,11 +246,19 @@ def get_circuit_breaker(
             name=name,
             failure_threshold=failure_threshold,
             recovery_timeout=recovery_timeout,
-            success_threshold=success_threshold
+            success_threshold=success_threshold,
+            slow_call_threshold=slow_call_threshold,
+            exceptions=exceptions,
+            ignored=ignored
         )
     return _circuit_breakers[name]
 
 
+def breakers_snapshot() -> dict:
+    """State and counters of every registered circuit breaker."""
+    return {name: cb.snapshot() for name, cb in _circuit_breakers.items()}
+
+
 def circuit_breaker(
     name: str,
     failure_threshold: int = 5,
@@ -273,3 +355,72 @@ def with_timeout(seconds: float):
         
         return wrapper
     return decorator
+
+
+# Request deadlines: set once per request (DeadlineMiddleware, or
+# start_deadline() in Tornado handlers); DB and Redis calls size their
+# timeouts from what is left instead of each waiting its own full timeout
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request deadline passed before or while calling a dependency."""
+    def __init__(self, what: str = "request"):
+        super().__init__(f"Deadline exceeded ({what})")
+
+
+# Monotonic time by which the current request must be answered
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def start_deadline(seconds: float) -> None:
+    """
+    Give the rest of the current request (task) `seconds`; a nearer deadline
+    already set is kept. No-op for seconds <= 0.
+    """
+    if seconds <= 0:
+        return
+    at = time.monotonic() + seconds
+    current = request_deadline.get()
+    if current is None or at < current:
+        request_deadline.set(at)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """start_deadline() for the block only."""
+    token = request_deadline.set(request_deadline.get())
+    try:
+        start_deadline(seconds)
+        yield
+    finally:
+        request_deadline.reset(token)
+
+
+def time_left(cap: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds until the request deadline, at most `cap` (None when there is
+    neither). Raises DeadlineExceeded once the deadline passed.
+    """
+    at = request_deadline.get()
+    if at is None:
+        return cap
+    left = at - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded()
+    return left if cap is None else min(left, cap)
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware giving every HTTP request under `prefix` a deadline of
+    `seconds` (0 = off).
+    """
+
+    def __init__(self, app, seconds: float = 0.0, prefix: str = "/api"):
+        self.app = app
+        self.seconds = seconds
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.seconds <= 0 or not scope["path"].startswith(self.prefix):
+            return await self.app(scope, receive, send)
+        with deadline(self.seconds):
+            return await self.app(scope, receive, send)
@@ -0,0 +1,138 @@
+# app/middleware/concurrency_limiter.py
+# Adaptive (AIMD) concurrency limit of report computation.
+#
+# CircuitBreaker trips on failures; this sheds load on slowness. Every report
+# computation holds a slot; the longest wait for a pooled DB connection it saw
+# (app.db.base.pool_waits) and its slowest DB session (app.db.base.query_times)
+# are compared to targets. The total duration is not: it grows with the report's
+# size (grouping, serialization) whether or not the database is overloaded.
+#   - slower than a target: the limit shrinks multiplicatively (at most once
+#     per latency target, so one slow burst does not collapse it);
+#   - otherwise, if at least half the slots were in use, it grows by 1/limit
+#     (about +1 per limit's worth of completions).
+# When all slots are taken, further reports fail fast with Overloaded
+# (served as 503 + Retry-After) instead of queueing for pool connections.
+# Health checks and cached responses never reach the limiter.
+
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.db.base import pool_waits, query_times
+
+
+class Overloaded(RuntimeError):
+    """The concurrency limit is reached; the request should be retried later."""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__("Server is overloaded, retry later")
+        self.retry_after = retry_after
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on concurrent report computations, driven by DB query latency and pool wait."""
+
+    def __init__(
+        self,
+        max_limit: int = 0,
+        min_limit: int = 2,
+        latency_target: float = 2.0,
+        pool_wait_target: float = 0.1,
+        backoff: float = 0.75,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit) if max_limit else min_limit
+        self.latency_target = latency_target
+        self.pool_wait_target = pool_wait_target
+        self.backoff = backoff
+        self._clock = clock
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._last_decrease = -math.inf
+        self._latency_ewma: Optional[float] = None
+        self._admitted = 0
+        self._shed = 0
+        self._decreases = 0
+
+    @classmethod
+    def from_settings(cls) -> "AdaptiveConcurrencyLimiter":
+        return cls(
+            settings.REPORT_CONCURRENCY_MAX,
+            settings.REPORT_CONCURRENCY_MIN,
+            settings.REPORT_LATENCY_TARGET_MS / 1000,
+            settings.REPORT_POOL_WAIT_TARGET_MS / 1000,
+            settings.REPORT_CONCURRENCY_BACKOFF,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_limit > 0
+
+    def retry_after(self) -> int:
+        # About when a slot frees up: the typical computation time
+        return max(1, math.ceil(self._latency_ewma or 1.0))
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Hold a slot for one report computation; raises Overloaded when none is free."""
+        if not self.enabled:
+            yield
+            return
+        if self.in_flight >= int(self.limit):
+            self._shed += 1
+            raise Overloaded(self.retry_after())
+
+        busy = self.in_flight + 1
+        self.in_flight = busy
+        self._admitted += 1
+        waits: List[float] = []
+        times: List[float] = []
+        wait_token = pool_waits.set(waits)
+        times_token = query_times.set(times)
+        start = self._clock()
+        try:
+            yield
+        finally:
+            query_times.reset(times_token)
+            pool_waits.reset(wait_token)
+            self.in_flight -= 1
+            self.record(self._clock() - start, max(waits, default=0.0), max(times, default=0.0), busy)
+
+    def record(self, latency: float, pool_wait: float, query_latency: float, busy: int) -> None:
+        """
+        Adjust the limit after a computation that ran with `busy` slots in use.
+        latency (the total duration) only feeds Retry-After; the limit follows
+        pool_wait and query_latency (the slowest DB session).
+        """
+        alpha = 0.2
+        self._latency_ewma = latency if self._latency_ewma is None else (
+            alpha * latency + (1 - alpha) * self._latency_ewma
+        )
+        now = self._clock()
+        if query_latency > self.latency_target or pool_wait > self.pool_wait_target:
+            if now - self._last_decrease >= self.latency_target:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+                self._decreases += 1
+        elif busy * 2 >= self.limit:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "latency_ewma_ms": None if self._latency_ewma is None else round(self._latency_ewma * 1000, 1),
+            "admitted": self._admitted,
+            "shed": self._shed,
+            "decreases": self._decreases,
+        }
+
+
+# Process-wide limiter (services are created per request)
+report_limiter = AdaptiveConcurrencyLimiter.from_settings()
@@ -2,6 +2,7 @@
 # Structured error handling middleware
 # Catches unhandled exceptions and returns consistent JSON responses
 
+import math
 import traceback
 import logging
 from typing import Callable
@@ -9,6 +10,9 @@ from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from app.middleware.circuit_breaker import CircuitBreakerError, DeadlineExceeded
+from app.middleware.concurrency_limiter import Overloaded
+from app.utils.executor import ExecutorBusy
 from app.utils.logger import log_exception
 
 logger = logging.getLogger(__name__)
@@ -182,6 +186,48 @@ def setup_exception_handlers(app):
             details=exc.details
         )
     
+    @app.exception_handler(ExecutorBusy)
+    async def executor_busy_handler(request: Request, exc: ExecutorBusy):
+        response = create_error_response(
+            error_code="SERVER_BUSY",
+            message=str(exc),
+            status_code=503,
+            details={"retry_after": exc.retry_after}
+        )
+        response.headers["Retry-After"] = str(exc.retry_after)
+        return response
+    
+    @app.exception_handler(Overloaded)
+    async def overloaded_handler(request: Request, exc: Overloaded):
+        response = create_error_response(
+            error_code="SERVER_OVERLOADED",
+            message=str(exc),
+            status_code=503,
+            details={"retry_after": exc.retry_after}
+        )
+        response.headers["Retry-After"] = str(exc.retry_after)
+        return response
+    
+    @app.exception_handler(CircuitBreakerError)
+    async def circuit_open_handler(request: Request, exc: CircuitBreakerError):
+        retry_after = max(1, math.ceil(exc.recovery_time))
+        response = create_error_response(
+            error_code="SERVICE_UNAVAILABLE",
+            message=f"{exc.service_name} is unavailable, retry later",
+            status_code=503,
+            details={"retry_after": retry_after}
+        )
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+    
+    @app.exception_handler(DeadlineExceeded)
+    async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+        return create_error_response(
+            error_code="DEADLINE_EXCEEDED",
+            message=str(exc),
+            status_code=504
+        )
+    
     @app.exception_handler(Exception)
     async def general_exception_handler(request: Request, exc: Exception):
         log_exception(exc, context=f"Unhandled error on {request.url.path}")
@@ -1,16 +1,27 @@
 # app/middleware/rate_limiter.py
 # Rate limiting middleware to protect against DDoS attacks
-# Uses in-memory sliding window counter (can be upgraded to Redis for distributed)
+# Uses in-memory sliding window counter, or (RATE_LIMIT_BACKEND=redis) a
+# Redis-backed one shared by all worker processes
 
+import asyncio
+import math
 import time
 from collections import defaultdict
-from typing import Dict, Tuple
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
 from fastapi import Request, HTTPException, status
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
 import logging
 
+from app.config import settings
+
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except ImportError:
+    aioredis = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
 
@@ -86,6 +97,250 @@ class SlidingWindowCounter:
         for key in keys_to_remove:
             del self._counters[key]
 
+    async def acquire(self, key: str) -> Tuple[bool, int]:
+        """is_allowed with the awaitable interface of RedisSlidingWindow."""
+        return self.is_allowed(key)
+
+
+# Reserves up to ARGV[3] permits in the sliding window of KEYS[1] (current
+# window counter) and KEYS[2] (previous one), atomically for all processes.
+# ARGV: limit, weight of the previous window, wanted permits, counter TTL (s).
+# Returns {granted, remaining after the grant}.
+_RESERVE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local curr = tonumber(redis.call('GET', KEYS[1]) or '0')
+local prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+local used = prev * tonumber(ARGV[2]) + curr
+local granted = math.min(tonumber(ARGV[3]), math.floor(limit - used))
+if granted < 0 then granted = 0 end
+if granted > 0 then
+    redis.call('INCRBY', KEYS[1], granted)
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+return {granted, math.max(0, math.floor(limit - used - granted))}
+"""
+
+
+class RedisSlidingWindow:
+    """
+    Sliding window counter shared by all processes through Redis.
+
+    Same approximation as SlidingWindowCounter (previous window weighted by
+    the part of it still inside the window), kept in per-window Redis
+    counters and updated by one atomic Lua script. Each process reserves up
+    to `prefetch` permits per round trip and hands them out locally until
+    they run out or the window ends, so most requests skip Redis; permits are
+    counted before they are used, so the shared limit is never exceeded.
+    A denial is remembered briefly for the same reason.
+
+    Redis calls slower than `timeout` (or failing) switch this process to the
+    in-memory limiter for `failover_seconds`.
+    """
+
+    def __init__(
+        self,
+        window_size: int = 60,
+        max_requests: int = 100,
+        prefix: str = "ratelimit",
+        prefetch: Optional[int] = None,
+        timeout: Optional[float] = None,
+        failover_seconds: Optional[float] = None,
+        client: Any = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.window_size = window_size
+        self.max_requests = max_requests
+        self.prefix = prefix
+        self.prefetch = prefetch or settings.RATE_LIMIT_PREFETCH
+        self.timeout = timeout if timeout is not None else settings.RATE_LIMIT_REDIS_TIMEOUT_MS / 1000
+        self.failover_seconds = (
+            failover_seconds if failover_seconds is not None else settings.RATE_LIMIT_FAILOVER_SECONDS
+        )
+        self.fallback = SlidingWindowCounter(window_size, max_requests)
+        self._client = client
+        self._script = None
+        self._clock = clock
+        # key -> (local permits, window index, remaining in Redis at reservation)
+        self._leases: Dict[str, Tuple[int, int, int]] = {}
+        # key -> time until which requests are denied without asking Redis
+        self._denied: Dict[str, float] = {}
+        self._redis_down_until = 0.0
+        self.stats = {"local": 0, "redis": 0, "fallback": 0}
+
+    def _get_script(self) -> Any:
+        if self._script is None:
+            if self._client is None:
+                if aioredis is None:
+                    raise RuntimeError("redis package is not installed")
+                self._client = aioredis.from_url(
+                    settings.REDIS_URL, socket_timeout=self.timeout, socket_connect_timeout=self.timeout
+                )
+            self._script = self._client.register_script(_RESERVE_SCRIPT)
+        return self._script
+
+    async def _reserve(self, key: str, now: float, window: int) -> Tuple[int, int]:
+        weight = 1 - (now % self.window_size) / self.window_size
+        granted, remaining = await self._get_script()(
+            keys=[f"{self.prefix}:{key}:{window}", f"{self.prefix}:{key}:{window - 1}"],
+            args=[self.max_requests, weight, self.prefetch, 2 * self.window_size],
+        )
+        return int(granted), int(remaining)
+
+    async def acquire(self, key: str) -> Tuple[bool, int]:
+        """Returns (is_allowed, remaining_requests) like SlidingWindowCounter.is_allowed."""
+        now = self._clock()
+        window = int(now // self.window_size)
+
+        permits, lease_window, remaining = self._leases.get(key, (0, -1, 0))
+        if permits > 0 and lease_window == window:
+            self._leases[key] = (permits - 1, window, remaining)
+            self.stats["local"] += 1
+            return True, remaining + permits - 1
+        if self._denied.get(key, 0.0) > now:
+            self.stats["local"] += 1
+            return False, 0
+
+        if now < self._redis_down_until:
+            self.stats["fallback"] += 1
+            return self.fallback.is_allowed(key)
+        try:
+            granted, remaining = await asyncio.wait_for(self._reserve(key, now, window), self.timeout)
+        except Exception as e:
+            self._redis_down_until = now + self.failover_seconds
+            logger.warning(
+                f"Redis rate limiter unavailable ({type(e).__name__}); "
+                f"using in-memory limits for {self.failover_seconds:.0f}s"
+            )
+            self.stats["fallback"] += 1
+            return self.fallback.is_allowed(key)
+
+        self.stats["redis"] += 1
+        if granted == 0:
+            # About when the weighted count frees the next permit
+            self._denied[key] = now + min(1.0, self.window_size / self.max_requests)
+            return False, 0
+        self._leases[key] = (granted - 1, window, remaining)
+        return True, remaining + granted - 1
+
+    def cleanup_old_entries(self, max_age: int = 300):
+        """Drop leases of past windows, expired denials and old fallback counters."""
+        now = self._clock()
+        window = int(now // self.window_size)
+        self._leases = {k: lease for k, lease in self._leases.items() if lease[1] == window}
+        self._denied = {k: until for k, until in self._denied.items() if until > now}
+        self.fallback.cleanup_old_entries(max_age)
+
+
+def make_limiter(max_requests: int, name: str, window_size: int = 60, backend: Optional[str] = None):
+    """Limiter of the configured backend (RATE_LIMIT_BACKEND unless given)."""
+    if (backend or settings.RATE_LIMIT_BACKEND) == "redis":
+        return RedisSlidingWindow(window_size=window_size, max_requests=max_requests, prefix=f"ratelimit:{name}")
+    return SlidingWindowCounter(window_size=window_size, max_requests=max_requests)
+
+
+class TokenBucket:
+    """
+    Token bucket per key: `capacity` tokens, refilled at `refill_per_second`.
+    Requests take as many tokens as they cost, so clients are throttled by the
+    load they generate rather than by their request count. A request costing
+    more than the capacity takes a full bucket.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._clock = clock
+        # key -> (tokens, time of last update)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.refill_per_second)
+
+    def consume(self, key: str, cost: float) -> Tuple[bool, float, float]:
+        """
+        Take `cost` tokens for key if available.
+        Returns (is_allowed, tokens remaining, seconds until the cost would fit).
+        """
+        now = self._clock()
+        tokens = self._tokens(key, now)
+        cost = min(cost, self.capacity)
+        if tokens >= cost:
+            self._buckets[key] = (tokens - cost, now)
+            return True, tokens - cost, 0.0
+        self._buckets[key] = (tokens, now)
+        return False, tokens, (cost - tokens) / self.refill_per_second
+
+    def refund(self, key: str, tokens: float) -> float:
+        """Give back tokens taken for a request that turned out cheap; returns the tokens now left."""
+        now = self._clock()
+        left = min(self.capacity, self._tokens(key, now) + tokens)
+        self._buckets[key] = (left, now)
+        return left
+
+    def cleanup_old_entries(self):
+        """Forget full buckets (same as a new key)."""
+        now = self._clock()
+        self._buckets = {k: v for k, v in self._buckets.items() if self._tokens(k, now) < self.capacity}
+
+
+# --- Request costs (tokens) of the cost-based limiter ---
+
+CostFn = Callable[[Mapping[str, str]], float]
+
+# One token = one day of 5-minute buckets over one filter breadth unit
+_POINTS_PER_TOKEN = 288
+_FILTERS = ("customer", "supplier", "destination")
+
+# (method, exact path) -> cost function of the query params. Exact, not prefix:
+# /api/metrics/page or DELETE /api/metrics/{id} are not reports
+_cost_functions: Dict[Tuple[str, str], CostFn] = {}
+
+# Response header marking a body served from a cache: such responses (and 304s) are not charged
+CACHE_HIT_HEADER = "X-Cache"
+
+
+def register_cost(path: str, cost_fn: CostFn, method: str = "GET") -> None:
+    """Declare the cost of `method path` requests; other requests cost 1 token."""
+    _cost_functions[(method.upper(), path.rstrip("/") or "/")] = cost_fn
+
+
+def request_cost(path: str, params: Mapping[str, str], method: str = "GET") -> float:
+    cost_fn = _cost_functions.get((method.upper(), path.rstrip("/") or "/"))
+    return cost_fn(params) if cost_fn is not None else 1.0
+
+
+def _is_wildcard(value: Optional[str]) -> bool:
+    # Filters are ILIKE patterns; an empty filter matches everything
+    return not value or "%" in value or "_" in value
+
+
+def report_cost(params: Mapping[str, str]) -> float:
+    """
+    Tokens of a report query: time buckets scanned (5-minute, or hourly for
+    granularity=1h) in days of 5-minute buckets, times 1 + the number of
+    wildcard or empty filters. A 1-day 5m report costs 1 (all filters exact)
+    to 4 (no filters); a 30-day one 30 to 120. Requests without a valid
+    range cost 1 (validation rejects them).
+    """
+    try:
+        seconds = (datetime.fromisoformat(params["to"]) - datetime.fromisoformat(params["from"])).total_seconds()
+    except (KeyError, ValueError, TypeError):
+        return 1.0
+    bucket_seconds = 3600 if params.get("granularity") == "1h" else 300
+    points = max(0.0, seconds) / bucket_seconds
+    breadth = 1 + sum(_is_wildcard(params.get(name)) for name in _FILTERS)
+    return max(1.0, points / _POINTS_PER_TOKEN * breadth)
+
+
+def drilldown_cost(params: Mapping[str, str]) -> float:
+    """
+    Tokens of a drill-down on a report (series of one group, zoom): read from
+    the report's cached partials, or on a miss fetched for one group, so the
+    filter breadth does not count: the cost of the same report with exact filters.
+    """
+    return report_cost({**params, **{name: "exact" for name in _FILTERS}})
+
 
 # Global rate limiter instance
 _rate_limiter = SlidingWindowCounter(window_size=60, max_requests=100)
@@ -98,10 +353,23 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     Different limits for API endpoints vs static content.
     """
     
-    def __init__(self, app, api_limit: int = 60, general_limit: int = 100):
+    def __init__(
+        self,
+        app,
+        api_limit: int = 60,
+        general_limit: int = 100,
+        backend: Optional[str] = None,
+        cost_capacity: Optional[float] = None,
+        cost_refill: Optional[float] = None,
+    ):
         super().__init__(app)
-        self.api_limiter = SlidingWindowCounter(window_size=60, max_requests=api_limit)
-        self.general_limiter = SlidingWindowCounter(window_size=60, max_requests=general_limit)
+        self.api_limiter = make_limiter(api_limit, "api", backend=backend)
+        self.general_limiter = make_limiter(general_limit, "general", backend=backend)
+        # Cost-based limits on /api/ (requests charged by request_cost); off when capacity is 0
+        capacity = settings.RATE_LIMIT_COST_CAPACITY if cost_capacity is None else cost_capacity
+        self.cost_limiter = TokenBucket(
+            capacity, cost_refill or settings.RATE_LIMIT_COST_REFILL
+        ) if capacity > 0 else None
         self._last_cleanup = time.time()
     
     def _get_client_key(self, request: Request) -> str:
@@ -132,6 +400,8 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         if now - self._last_cleanup > 300:
             self.api_limiter.cleanup_old_entries()
             self.general_limiter.cleanup_old_entries()
+            if self.cost_limiter is not None:
+                self.cost_limiter.cleanup_old_entries()
             self._last_cleanup = now
         
         client_key = self._get_client_key(request)
@@ -140,7 +410,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         is_api = request.url.path.startswith("/api/")
         limiter = self.api_limiter if is_api else self.general_limiter
         
-        is_allowed, remaining = limiter.is_allowed(client_key)
+        is_allowed, remaining = await limiter.acquire(client_key)
         
         if not is_allowed:
             logger.warning(f"Rate limit exceeded for {client_key} on {request.url.path}")
@@ -154,12 +424,40 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 headers={"Retry-After": "60", "X-RateLimit-Remaining": "0"}
             )
         
+        cost_headers: Dict[str, str] = {}
+        if is_api and self.cost_limiter is not None:
+            cost = request_cost(request.url.path, request.query_params, request.method)
+            allowed, budget, wait = self.cost_limiter.consume(client_key, cost)
+            cost_headers = {
+                "X-RateLimit-Cost": f"{cost:.1f}",
+                "X-RateLimit-Budget": f"{self.cost_limiter.capacity:g}",
+                "X-RateLimit-Budget-Remaining": f"{budget:.1f}",
+            }
+            if not allowed:
+                retry_after = max(1, math.ceil(wait))
+                logger.warning(f"Cost limit exceeded for {client_key} on {request.url.path} (cost {cost:.1f})")
+                return JSONResponse(
+                    status_code=429,
+                    content={
+                        "error": "rate_limit_exceeded",
+                        "message": "Request budget exhausted. Narrow the query or slow down.",
+                        "retry_after": retry_after
+                    },
+                    headers={"Retry-After": str(retry_after), **cost_headers}
+                )
+
         # Add rate limit headers to response
         response = await call_next(request)
+        if cost_headers and (response.status_code == 304 or response.headers.get(CACHE_HIT_HEADER) == "HIT"):
+            # Nothing was computed: give the tokens back
+            budget = self.cost_limiter.refund(client_key, cost)
+            cost_headers["X-RateLimit-Cost"] = "0.0"
+            cost_headers["X-RateLimit-Budget-Remaining"] = f"{budget:.1f}"
         response.headers["X-RateLimit-Remaining"] = str(remaining)
         response.headers["X-RateLimit-Limit"] = str(
             self.api_limiter.max_requests if is_api else self.general_limiter.max_requests
         )
+        response.headers.update(cost_headers)
         
         return response
 
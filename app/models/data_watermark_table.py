@@ -0,0 +1,17 @@
+# app/models/data_watermark_table.py
+# Per-table data watermark (latest row time + ingest counter), kept current by triggers
+
+from sqlalchemy import Table, Column, Text, BigInteger, TIMESTAMP
+
+from app.db.base import metadata
+
+
+data_watermark = Table(
+    'data_watermark',
+    metadata,
+    Column('table_name', Text, primary_key=True),
+    Column('max_time', TIMESTAMP(timezone=True), nullable=True),
+    Column('ingest_count', BigInteger, nullable=False, server_default='0'),
+    Column('updated_at', TIMESTAMP(timezone=True), nullable=False),
+    schema='public',
+)
@@ -3,7 +3,11 @@
 # Pydantic V2 model for query params validation
 from pydantic import BaseModel, Field, model_validator
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+from app.utils.baselines import format_baselines, parse_baselines
+from app.utils.partials import BUCKET_SECONDS, to_epoch
+from app.utils.topn import SORT_KEYS
 
 class MetricsQueryParams(BaseModel):
     """
@@ -19,6 +23,18 @@ class MetricsQueryParams(BaseModel):
     reverse: bool = False
     granularity: str = "both"  # allowed: '5m' | '1h' | 'both'
 
+    # Top-N: rank groups by `sort`, keep `limit` of them, fold the rest (and groups
+    # below `min_share` of the total) into an "Other" row
+    sort: Optional[str] = None  # allowed: keys of app.utils.topn.SORT_KEYS
+    limit: Optional[int] = Field(None, ge=1)
+    min_share: Optional[float] = Field(None, ge=0, lt=1)
+
+    # Leave hourly/5m rows out of the report; clients fetch them per group from /api/metrics/series
+    lazy: bool = False
+
+    # Extra comparison offsets besides day-over-day, e.g. "7d,28d" (see app.utils.baselines)
+    baselines: Optional[str] = None
+
     # cross-field validation
     @model_validator(mode='after')
     def check_dates(self) -> 'MetricsQueryParams':
@@ -41,7 +57,68 @@ class MetricsQueryParams(BaseModel):
             self.granularity = "both"
         return self
 
+    @model_validator(mode='after')
+    def validate_sort(self) -> 'MetricsQueryParams':
+        """Ensure sort names a rankable metric."""
+        if self.sort is not None and self.sort not in SORT_KEYS:
+            raise ValueError(f"Validation Error: 'sort' must be one of {', '.join(SORT_KEYS)}")
+        return self
+
+    @model_validator(mode='after')
+    def normalize_baselines(self) -> 'MetricsQueryParams':
+        """Validate baseline offsets and normalize them to the canonical spec (e.g. "1d,7d")."""
+        if self.baselines is not None:
+            try:
+                self.baselines = format_baselines(parse_baselines(self.baselines))
+            except ValueError as e:
+                raise ValueError(f"Validation Error: 'baselines': {e}")
+        return self
+
     # Pydantic V2 config
     class Config:
         # This allows the model to be populated from object attributes as well as dictionaries.
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class MetricsSeriesParams(MetricsQueryParams):
+    """
+    Query params for /api/metrics/series: the report params plus the
+    (main, peer, destination) group to drill into.
+    """
+    main: str
+    peer: str
+    dest: str
+
+class MetricsZoomParams(MetricsQueryParams):
+    """
+    Query params for /api/metrics/zoom: the report params plus the zoom window
+    (ISO datetimes or epoch seconds/milliseconds) to re-aggregate over.
+    """
+    zoom_from: datetime
+    zoom_to: datetime
+
+    @model_validator(mode='after')
+    def check_zoom(self) -> 'MetricsZoomParams':
+        """Ensures the zoom window is not empty."""
+        if to_epoch(self.zoom_to) <= to_epoch(self.zoom_from):
+            raise ValueError('Validation Error: "zoom_to" must be after "zoom_from"')
+        return self
+
+class ReportJobParams(MetricsQueryParams):
+    """
+    Body of POST /api/jobs/report: the report params; without from/to the job
+    covers the last `hours` hours (up to the current 5-minute bucket).
+    """
+    time_from: Optional[datetime] = Field(None, alias='from')
+    time_to: Optional[datetime] = Field(None, alias='to')
+    hours: int = Field(24, ge=1, le=24 * 366)
+
+    @model_validator(mode='after')
+    def default_range(self) -> 'ReportJobParams':
+        """Fill a missing range from `hours`; from and to must be given together."""
+        if (self.time_from is None) != (self.time_to is None):
+            raise ValueError('Validation Error: "from" and "to" must be given together')
+        if self.time_from is None:
+            now = to_epoch(datetime.now(timezone.utc))
+            self.time_to = datetime.fromtimestamp(now - now % BUCKET_SECONDS, timezone.utc)
+            self.time_from = self.time_to - timedelta(hours=self.hours)
+        return self
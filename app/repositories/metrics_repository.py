@@ -11,11 +11,29 @@ from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy import delete, insert, select, update, union_all, literal
 from sqlalchemy.sql import and_
 
-from app.db.base import get_session
+from app.config import settings
+from app.db.base import async_engine, get_session, pool_headroom
 from app.models.metrics_table import metrics
 from app.models.aggregation_table import sonus_aggregation_new
 from app.utils.cache import Cache
 
+Period = Tuple[datetime, datetime]
+
+# Repository ranges are inclusive; a slice ends this much before the next one starts
+_RESOLUTION = timedelta(microseconds=1)
+
+
+def split_period(time_from: datetime, time_to: datetime, slices: int) -> List[Period]:
+    """
+    `slices` equal inclusive sub-ranges that together select what one BETWEEN
+    over [time_from, time_to] selects; concatenating their rows keeps time order.
+    """
+    step = (time_to - time_from) / slices
+    edges = [time_from + step * i for i in range(1, slices)]
+    starts = [time_from, *edges]
+    ends = [edge - _RESOLUTION for edge in edges] + [time_to]
+    return list(zip(starts, ends))
+
 
 class MetricsRepository:
     """Data access for metrics: read from aggregation, write to metrics table."""
@@ -88,9 +106,67 @@ class MetricsRepository:
         
         Optimization: Single DB round-trip instead of two separate queries.
         """
+        periods = await self.get_metrics_multi_period(
+            filters,
+            {"today": (time_from, time_to), "yesterday": (y_time_from, y_time_to)},
+        )
+        return periods["today"], periods["yesterday"]
+
+    @staticmethod
+    def _slice_count(time_from: datetime, time_to: datetime, queries: int) -> int:
+        """
+        Time slices per period: at most FETCH_SLICES, none shorter than
+        FETCH_SLICE_MIN_SECONDS, and `queries` concurrent periods times the slice
+        count must fit in the pool's free connections minus FETCH_POOL_RESERVE.
+        """
+        if settings.FETCH_SLICES <= 1:
+            return 1
+        by_length = int((time_to - time_from).total_seconds() // settings.FETCH_SLICE_MIN_SECONDS)
+        by_pool = (pool_headroom() - settings.FETCH_POOL_RESERVE) // queries
+        return max(1, min(settings.FETCH_SLICES, by_length, by_pool))
+
+    async def _get_metrics_sliced(
+        self, filters: Dict[str, Any], time_from: datetime, time_to: datetime, slices: int
+    ) -> List[Dict[str, Any]]:
+        """get_metrics over [time_from, time_to] as concurrent slices, rows in time order."""
+        parts = await asyncio.gather(*[
+            self.get_metrics({**filters, "time_from": t0, "time_to": t1}, limit=0)
+            for t0, t1 in split_period(time_from, time_to, slices)
+        ])
+        return [row for part in parts for row in part]
+
+    async def get_metrics_multi_period(
+        self,
+        filters: Dict[str, Any],
+        periods: Dict[str, Period],
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Fetch rows of several time ranges (e.g. a report range and its baselines)
+        in one UNION ALL; each branch is tagged with its period name.
+        Long ranges are split into time slices, one UNION ALL per slice on its
+        own pooled connection (see _slice_count).
+        Returns {period name: rows in time order} with an entry for every period.
+        """
+        if not periods:
+            return {}
+        first_from, first_to = next(iter(periods.values()))
+        slices = self._slice_count(first_from, first_to, queries=1)
+        if slices == 1:
+            return await self._query_multi_period(filters, periods)
+
+        split = {name: split_period(p_from, p_to, slices) for name, (p_from, p_to) in periods.items()}
+        parts = await asyncio.gather(*[
+            self._query_multi_period(filters, {name: split[name][i] for name in periods})
+            for i in range(slices)
+        ])
+        return {name: [row for part in parts for row in part[name]] for name in periods}
+
+    @staticmethod
+    def _multi_period_stmt(filters: Dict[str, Any], periods: Dict[str, Period]):
+        """UNION ALL of one branch per period, tagged with the period name, in time order."""
         source = sonus_aggregation_new
         filters = filters or {}
-        
+
         # Build base conditions (excluding time)
         base_conditions = []
         for key in ("customer", "supplier", "destination"):
@@ -102,81 +178,60 @@ class MetricsRepository:
                 base_conditions.append(col.ilike(value))
             else:
                 base_conditions.append(col == value)
-        
-        # Today query with period marker
-        today_conditions = base_conditions + [source.c.time.between(time_from, time_to)]
-        today_stmt = select(
-            source.c.time,
-            source.c.customer,
-            source.c.supplier,
-            source.c.destination,
-            source.c.seconds,
-            source.c.start_nuber,
-            source.c.start_attempt,
-            source.c.start_uniq_attempt,
-            source.c.answer_time,
-            source.c.pdd,
-            literal('today').label('_period')
-        ).where(and_(*today_conditions)) if today_conditions else select(
-            source.c.time,
-            source.c.customer,
-            source.c.supplier,
-            source.c.destination,
-            source.c.seconds,
-            source.c.start_nuber,
-            source.c.start_attempt,
-            source.c.start_uniq_attempt,
-            source.c.answer_time,
-            source.c.pdd,
-            literal('today').label('_period')
-        ).where(source.c.time.between(time_from, time_to))
-        
-        # Yesterday query with period marker
-        yesterday_conditions = base_conditions + [source.c.time.between(y_time_from, y_time_to)]
-        yesterday_stmt = select(
-            source.c.time,
-            source.c.customer,
-            source.c.supplier,
-            source.c.destination,
-            source.c.seconds,
-            source.c.start_nuber,
-            source.c.start_attempt,
-            source.c.start_uniq_attempt,
-            source.c.answer_time,
-            source.c.pdd,
-            literal('yesterday').label('_period')
-        ).where(and_(*yesterday_conditions)) if yesterday_conditions else select(
-            source.c.time,
-            source.c.customer,
-            source.c.supplier,
-            source.c.destination,
-            source.c.seconds,
-            source.c.start_nuber,
-            source.c.start_attempt,
-            source.c.start_uniq_attempt,
-            source.c.answer_time,
-            source.c.pdd,
-            literal('yesterday').label('_period')
-        ).where(source.c.time.between(y_time_from, y_time_to))
-        
+
+        branches = [
+            select(
+                source.c.time,
+                source.c.customer,
+                source.c.supplier,
+                source.c.destination,
+                source.c.seconds,
+                source.c.start_nuber,
+                source.c.start_attempt,
+                source.c.start_uniq_attempt,
+                source.c.answer_time,
+                source.c.pdd,
+                literal(name).label('_period')
+            ).where(and_(*base_conditions, source.c.time.between(p_from, p_to)))
+            for name, (p_from, p_to) in periods.items()
+        ]
+
         # Combine with UNION ALL
-        combined_stmt = union_all(today_stmt, yesterday_stmt).order_by('time')
-        
+        return union_all(*branches).order_by('time')
+
+    async def _query_multi_period(
+        self,
+        filters: Dict[str, Any],
+        periods: Dict[str, Period],
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """One UNION ALL over all periods (single connection)."""
+        combined_stmt = self._multi_period_stmt(filters, periods)
+
         async with get_session() as session:
             result = await session.execute(combined_stmt)
             rows = [dict(r) for r in result.mappings().all()]
-        
+
         # Split by period
-        today_rows = []
-        yesterday_rows = []
+        out: Dict[str, List[Dict[str, Any]]] = {name: [] for name in periods}
         for row in rows:
-            period = row.pop('_period', 'today')
-            if period == 'today':
-                today_rows.append(row)
-            else:
-                yesterday_rows.append(row)
-        
-        return today_rows, yesterday_rows
+            out[row.pop('_period')].append(row)
+        return out
+
+    async def estimate_rows(self, filters: Dict[str, Any], periods: Dict[str, Period]) -> int:
+        """
+        Planner row estimate (EXPLAIN, nothing is executed) of fetching every
+        period with these filters; based on the table statistics of the
+        aggregation table, so it costs one planning round trip.
+        """
+        compiled = self._multi_period_stmt(filters, periods).compile(dialect=async_engine.dialect)
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        async with get_session() as session:
+            conn = await session.connection()
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params)
+            plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
 
     async def get_metrics_parallel(
         self,
@@ -189,7 +244,15 @@ class MetricsRepository:
         """
         Alternative: Fetch today and yesterday in parallel.
         Useful when UNION is slower than parallel queries.
+        Long ranges are additionally split into time slices fetched concurrently.
         """
+        slices = self._slice_count(time_from, time_to, queries=2)
+        if slices > 1:
+            return tuple(await asyncio.gather(
+                self._get_metrics_sliced(filters, time_from, time_to, slices),
+                self._get_metrics_sliced(filters, y_time_from, y_time_to, slices),
+            ))
+
         today_filters = {**filters, "time_from": time_from, "time_to": time_to}
         yesterday_filters = {**filters, "time_from": y_time_from, "time_to": y_time_to}
         
@@ -200,6 +263,25 @@ class MetricsRepository:
         today_rows, yesterday_rows = await asyncio.gather(today_task, yesterday_task)
         return today_rows, yesterday_rows
 
+    async def get_metrics_per_period(
+        self,
+        filters: Dict[str, Any],
+        periods: Dict[str, Period],
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        get_metrics_parallel for any number of periods: one query per period
+        (or per time slice of a long period), all run concurrently.
+        Returns {period name: rows in time order} like get_metrics_multi_period.
+        """
+        if not periods:
+            return {}
+        first_from, first_to = next(iter(periods.values()))
+        slices = self._slice_count(first_from, first_to, queries=len(periods))
+        parts = await asyncio.gather(*[
+            self._get_metrics_sliced(filters, p_from, p_to, slices) for p_from, p_to in periods.values()
+        ])
+        return dict(zip(periods, parts))
+
     async def insert_metric(self, data: Dict[str, Any]) -> int:
         """Insert into writable metrics table and invalidate API caches."""
         stmt = insert(metrics).returning(metrics.c.id)
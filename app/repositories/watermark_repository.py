@@ -0,0 +1,23 @@
+# app/repositories/watermark_repository.py
+# Read per-table data watermarks maintained by database triggers
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.db.base import get_session
+from app.models.data_watermark_table import data_watermark
+
+
+class WatermarkRepository:
+    """Repository for the data_watermark table."""
+
+    async def get_all(self) -> Dict[str, Tuple[Optional[datetime], int]]:
+        """Return {table_name: (max_time, ingest_count)} for all watched tables."""
+        stmt = select(data_watermark.c.table_name, data_watermark.c.max_time, data_watermark.c.ingest_count)
+        async with get_session() as session:
+            result = await session.execute(stmt)
+            return {row.table_name: (row.max_time, int(row.ingest_count)) for row in result}
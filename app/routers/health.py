@@ -10,6 +10,10 @@ from fastapi import APIRouter, Response, status
 from pydantic import BaseModel
 
 from app.db.db import get_db_pool, get_connection
+from app.db.scheduler import db_scheduler
+from app.middleware.circuit_breaker import breakers_snapshot
+from app.middleware.concurrency_limiter import report_limiter
+from app.utils.executor import cpu_executor
 
 logger = logging.getLogger(__name__)
 
@@ -197,3 +201,18 @@ async def database_health(response: Response):
             "status": "unhealthy",
             "error": str(e)
         }
+
+
+@router.get("/health/load")
+async def load_status():
+    """
+    Report load shedding state: the adaptive concurrency limit of report
+    computation, the report executor queue, DB session queues and wait
+    times per priority class, and the Postgres/Redis circuit breakers.
+    """
+    return {
+        "report_concurrency": report_limiter.snapshot(),
+        "report_executor": cpu_executor.stats(),
+        "db_scheduler": db_scheduler.stats(),
+        "circuit_breakers": breakers_snapshot(),
+    }
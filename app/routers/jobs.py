@@ -1,72 +1,41 @@
 from __future__ import annotations
 
-from typing import Optional
-
-from fastapi import APIRouter, status
-from pydantic import BaseModel
-from arq.connections import ArqRedis, create_pool, RedisSettings
-from arq.jobs import Job
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from app.jobs.queue import enqueue_report as enqueue_report_job, get_arq as _get_arq, jobs_stats, report_job_params_from
+from app.jobs.results import job_status, load_page
+from app.models.query_params import ReportJobParams
 from app.schemas.common import JobEnqueueResponse, JobStatusResponse
-from app.config import settings
 
 
 router = APIRouter()
 
-# Module-level connection pool (lazy init)
-_arq_pool: Optional[ArqRedis] = None
-
-
-class ReportRequest(BaseModel):
-    customer: str
-    supplier: str
-    hours: int = 24
-
-
-async def _get_arq() -> ArqRedis:
-    """Get or create shared ArqRedis connection pool."""
-    global _arq_pool
-    if _arq_pool is None:
-        redis_settings = RedisSettings.from_dsn(settings.REDIS_URL)
-        _arq_pool = await create_pool(redis_settings)
-    return _arq_pool
-
 
 @router.post("/jobs/report", response_model=JobEnqueueResponse, status_code=status.HTTP_202_ACCEPTED)
-async def enqueue_report(req: ReportRequest) -> JobEnqueueResponse:
-    arq = await _get_arq()
-    job = await arq.enqueue_job("generate_report", req.customer, req.supplier, req.hours)
-    return JobEnqueueResponse(task_id=job.job_id if job else "")
-
-
-@router.get("/jobs/{task_id}", response_model=JobStatusResponse)
-async def get_job_status(task_id: str) -> JobStatusResponse:
-    arq = await _get_arq()
-    job = Job(task_id, arq)
-    info = await job.info()
-    status_str = info.status if info else "pending"
-    result = info.result if info and hasattr(info, "status") and info.status == "complete" else None
-    return JobStatusResponse(task_id=task_id, status=str(status_str), result=result)
+async def enqueue_report(req: ReportJobParams) -> JobEnqueueResponse:
+    """Compute a report in the background worker; poll status_url for progress and result pages."""
+    task_id = await enqueue_report_job(report_job_params_from(req))
+    return JobEnqueueResponse(task_id=task_id, status_url=f"/api/jobs/{task_id}")
 
 
 @router.get("/jobs/metrics")
 async def jobs_metrics():
     """Return counters of jobs activity in Redis."""
-    arq = await _get_arq()
+    return await jobs_stats(await _get_arq())
 
-    async def _get_int(key: str) -> int:
-        v = await arq.get(key)
-        try:
-            return int(v) if v is not None else 0
-        except Exception:
-            return 0
 
-    queued = await arq.llen("arq:queue")
-    started = await _get_int("jobs:started")
-    finished = await _get_int("jobs:finished")
-    failed = await _get_int("jobs:failed")
-    return {
-        "queued": queued or 0,
-        "started": started,
-        "finished": finished,
-        "failed": failed,
-    }
+@router.get("/jobs/{task_id}", response_model=JobStatusResponse)
+async def get_job_status(task_id: str) -> JobStatusResponse:
+    return JobStatusResponse(**await job_status(await _get_arq(), task_id))
+
+
+@router.get("/jobs/{task_id}/result/{page}")
+async def get_job_result_page(task_id: str, page: int, accept_encoding: str | None = Header(None)) -> Response:
+    """One NDJSON line of a finished report job, stored gzip-compressed."""
+    encoded = await load_page(await _get_arq(), task_id, page)
+    if encoded is None:
+        raise HTTPException(status_code=404, detail="Result page not found or expired")
+    coding, body = encoded.select(accept_encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type=encoded.content_type, headers=headers)
@@ -2,17 +2,41 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 
 from app.schemas.metrics import MetricIn, MetricOut, MetricFilter, PaginatedMetricsResponse
 from app.repositories.metrics_repository import MetricsRepository
+from app.db.scheduler import CRAWL, priority_class
+from app.jobs.queue import enqueue_report, report_job_params
+from app.middleware.concurrency_limiter import report_limiter
+from app.middleware.rate_limiter import CACHE_HIT_HEADER, drilldown_cost, register_cost, report_cost
+from app.services.cost_guard import ACTION_DOWNGRADE, ACTION_JOB, GRANULARITY_HEADER, CostDecision
 from app.services.metrics_service import MetricsService
+from app.services.query_planner import query_planner
+from app.services.watermark_service import data_watermark
 from app.schemas.common import StatusResponse
+from app.utils.baselines import DEFAULT_BASELINES, Baseline, format_baselines, parse_baselines
+from app.utils.arrow_format import ARROW_STREAM_MEDIA_TYPE, HAVE_ARROW, report_to_arrow_ipc, wants_arrow
+from app.utils import json_codec
 from app.utils.cache import Cache
+from app.utils.etag import build_etag, etag_matches
+from app.utils.executor import cpu_executor
+from app.utils.json_codec import FastJSONResponse
+from app.utils.partials import to_epoch
+from app.utils.report_stream import NDJSON_MEDIA_TYPE, iter_report_ndjson
+from app.utils.response_cache import EncodedBody, ResponseCache
+from app.utils.topn import SORT_KEYS
 
 
 router = APIRouter()
 
+# Rate limit cost of report queries: range length x granularity x filter breadth;
+# drill-downs re-aggregate one group or the cached partials. 304s and cache hits are refunded.
+register_cost("/api/metrics", report_cost)
+register_cost("/api/metrics/series", drilldown_cost)
+register_cost("/api/metrics/zoom", drilldown_cost)
+
 def get_service() -> MetricsService:
     """Provide service with DI so handlers stay thin."""
     repo = MetricsRepository()
@@ -20,6 +44,102 @@ def get_service() -> MetricsService:
 
 
 _cache = Cache()
+SORT_PATTERN = "^(" + "|".join(SORT_KEYS) + ")$"
+# Final report bytes (+ gzip/br variants), served without re-encoding
+_response_cache = ResponseCache()
+
+
+def _not_modified(etag: str | None, if_none_match: str | None) -> Response | None:
+    """Return a 304 response when the client already has this ETag."""
+    if etag and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=_etag_headers(etag))
+    return None
+
+
+def _parse_baselines(spec: str | None) -> tuple[Baseline, ...]:
+    """?baselines= offsets; malformed specs are a 422 like other invalid params."""
+    try:
+        return parse_baselines(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def _etag_headers(etag: str | None) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
+
+
+def _encoded_response(encoded: EncodedBody, accept_encoding: str | None, headers: dict[str, str]) -> Response:
+    """Serve the precompressed variant matching Accept-Encoding as-is."""
+    coding, body = encoded.select(accept_encoding)
+    headers = {**headers, **encoded.headers, "Vary": "Accept-Encoding"}
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type=encoded.content_type, headers=headers)
+
+
+async def _load_report(
+    service: MetricsService,
+    customer: str | None,
+    supplier: str | None,
+    destination: str | None,
+    time_from: datetime,
+    time_to: datetime,
+    reverse: bool,
+    sort: str | None = None,
+    limit: int | None = None,
+    min_share: float | None = None,
+    lazy: bool = False,
+    baselines: tuple[Baseline, ...] = DEFAULT_BASELINES,
+    granularity: str = "both",
+    watermark: str | None = None,
+    headers: dict[str, str] | None = None,
+) -> dict:
+    """
+    Report dict from the JSON cache, computing and caching it on a miss. Keyed
+    with the data watermark like the ETag, so new data never gets an old body.
+    A hit is marked in headers (not charged by the cost-based rate limit).
+    """
+    cache_key = Cache.build_key(
+        "api:report",
+        {
+            "customer": customer or "",
+            "supplier": supplier or "",
+            "destination": destination or "",
+            "from": time_from,
+            "to": time_to,
+            "reverse": reverse,
+            "sort": sort,
+            "limit": limit,
+            "min_share": min_share,
+            "lazy": lazy,
+            "baselines": format_baselines(baselines),
+            "granularity": granularity,
+            "watermark": watermark,
+        },
+    )
+    # A report decodes/encodes to megabytes: both run on the report executor
+    cached = await _cache.get_encoded(cache_key)
+    if cached:
+        if headers is not None:
+            headers[CACHE_HIT_HEADER] = "HIT"
+        return await cpu_executor.run(json_codec.loads, cached, threaded=True)
+    data = await service.get_full_metrics_report(
+        customer, supplier, destination, time_from, time_to, reverse,
+        granularity=granularity, sort=sort, limit=limit, min_share=min_share, lazy=lazy, baselines=baselines,
+    )
+    await _cache.set_encoded(cache_key, await cpu_executor.run(json_codec.dumps_chunked, data, threaded=True))
+    return data
+
+
+async def _job_accepted(decision: CostDecision, params: dict) -> Response:
+    """202 with the id of a background job computing the report (cost guard's job threshold)."""
+    task_id = await enqueue_report(params)
+    status_url = f"/api/jobs/{task_id}"
+    return FastJSONResponse(
+        {"task_id": task_id, "status_url": status_url, "estimated_rows": decision.estimated_rows},
+        status_code=202,
+        headers={"Location": status_url},
+    )
 
 
 @router.post("/metrics", response_model=MetricOut)
@@ -36,47 +156,211 @@ async def get_metrics_report(
     time_from: datetime = Query(..., alias="from"),
     time_to: datetime = Query(..., alias="to"),
     reverse: bool = False,
+    sort: str | None = Query(None, pattern=SORT_PATTERN),
+    limit: int | None = Query(None, ge=1),
+    min_share: float | None = Query(None, ge=0, lt=1),
+    lazy: bool = False,
+    baselines: str | None = None,
+    format: str | None = Query(None, pattern="^(json|ndjson|arrow)$"),
+    accept: str | None = Header(None),
+    accept_encoding: str | None = Header(None),
+    if_none_match: str | None = Header(None),
     service: MetricsService = Depends(get_service),
 ):
-    cache_key = Cache.build_key(
-        "api:report",
+    # Explicit ?format= wins; otherwise an Arrow Accept header selects arrow when available
+    fmt = format or ("arrow" if HAVE_ARROW and wants_arrow(accept) else "json")
+    if fmt == "arrow" and not HAVE_ARROW:
+        raise HTTPException(status_code=406, detail="Arrow output is not available on this server.")
+
+    periods = _parse_baselines(baselines)
+
+    # Conditional GET: answer 304 from the cached watermark, before any cache/DB work
+    normalized = {
+        "path": "/api/metrics",
+        "customer": customer, "supplier": supplier, "destination": destination,
+        "from": time_from, "to": time_to, "reverse": reverse, "format": fmt,
+        "sort": sort, "limit": limit, "min_share": min_share, "lazy": lazy,
+        "baselines": format_baselines(periods),
+    }
+    watermark = data_watermark.token()
+    etag = build_etag(normalized, watermark)
+    not_modified = _not_modified(etag, if_none_match)
+    if not_modified is not None:
+        return not_modified
+
+    async def guarded_report() -> dict | Response:
+        # Holds a slot of the adaptive concurrency limit (Overloaded -> 503 when none is free)
+        async with report_limiter.admit():
+            # Pre-flight cost check: expensive reports are downgraded or become background jobs
+            decision = await service.check_cost(customer, supplier, destination, time_from, time_to, "both", periods)
+            if decision.action == ACTION_JOB:
+                return await _job_accepted(decision, report_job_params(
+                    customer, supplier, destination, time_from, time_to, reverse, "both",
+                    sort, limit, min_share, lazy, format_baselines(periods),
+                ))
+            if decision.action == ACTION_DOWNGRADE:
+                headers[GRANULARITY_HEADER] = decision.granularity
+            return await _load_report(
+                service, customer, supplier, destination, time_from, time_to, reverse,
+                sort, limit, min_share, lazy, periods, decision.granularity, watermark, headers,
+            )
+
+    headers = _etag_headers(etag)
+    if fmt != "ndjson":
+        # Cache hit: stored bytes go out untouched (no JSON encoding, no compression)
+        body_key = Cache.build_key("api:report_body", {**normalized, "watermark": watermark})
+        encoded = await _response_cache.get(body_key)
+        if encoded is None:
+            data = await guarded_report()
+            if isinstance(data, Response):
+                return data
+            # Serialized on the report executor; one typed record batch per section for arrow.
+            # A downgraded granularity is stored with the body and sent on hits too
+            stored = {GRANULARITY_HEADER: headers[GRANULARITY_HEADER]} if GRANULARITY_HEADER in headers else None
+            if fmt == "arrow":
+                body = await cpu_executor.run(report_to_arrow_ipc, data, threaded=True)
+                encoded = await _response_cache.put(body_key, body, ARROW_STREAM_MEDIA_TYPE, stored)
+            else:
+                body = await cpu_executor.run(json_codec.dumps_chunked, data, threaded=True)
+                encoded = await _response_cache.put(body_key, body, "application/json", stored)
+        else:
+            headers[CACHE_HIT_HEADER] = "HIT"
+        return _encoded_response(encoded, accept_encoding, headers)
+
+    # Stream totals first, then row sections in chunks
+    data = await guarded_report()
+    if isinstance(data, Response):
+        return data
+    return StreamingResponse(iter_report_ndjson(data), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+@router.get("/metrics/series")
+async def get_metrics_series(
+    main: str,
+    peer: str,
+    dest: str,
+    customer: str | None = None,
+    supplier: str | None = None,
+    destination: str | None = None,
+    time_from: datetime = Query(..., alias="from"),
+    time_to: datetime = Query(..., alias="to"),
+    reverse: bool = False,
+    granularity: str = Query("both", pattern="^(5m|1h|both)$"),
+    sort: str | None = Query(None, pattern=SORT_PATTERN),
+    limit: int | None = Query(None, ge=1),
+    min_share: float | None = Query(None, ge=0, lt=1),
+    baselines: str | None = None,
+    if_none_match: str | None = Header(None),
+    service: MetricsService = Depends(get_service),
+):
+    """Hourly/5m rows of one (main, peer, destination) group; used with lazy reports."""
+    periods = _parse_baselines(baselines)
+    etag = build_etag(
         {
-            "customer": customer or "",
-            "supplier": supplier or "",
-            "destination": destination or "",
-            "from": time_from,
-            "to": time_to,
-            "reverse": reverse,
+            "path": "/api/metrics/series",
+            "main": main, "peer": peer, "dest": dest,
+            "customer": customer, "supplier": supplier, "destination": destination,
+            "from": time_from, "to": time_to, "reverse": reverse, "granularity": granularity,
+            "sort": sort, "limit": limit, "min_share": min_share,
+            "baselines": format_baselines(periods),
         },
+        data_watermark.token(),
     )
-    cached = await _cache.get_json(cache_key)
-    if cached:
-        return cached
+    not_modified = _not_modified(etag, if_none_match)
+    if not_modified is not None:
+        return not_modified
 
-    data = await service.get_full_metrics_report(customer, supplier, destination, time_from, time_to, reverse)
-    await _cache.set_json(cache_key, data)
-    return data
+    series = await service.get_series(
+        customer, supplier, destination, time_from, time_to, main, peer, dest,
+        reverse=reverse, granularity=granularity, sort=sort, limit=limit, min_share=min_share,
+        baselines=periods,
+    )
+    return FastJSONResponse(series, headers=_etag_headers(etag))
+
+
+@router.get("/metrics/zoom")
+async def get_metrics_zoom(
+    zoom_from: datetime,
+    zoom_to: datetime,
+    customer: str | None = None,
+    supplier: str | None = None,
+    destination: str | None = None,
+    time_from: datetime = Query(..., alias="from"),
+    time_to: datetime = Query(..., alias="to"),
+    reverse: bool = False,
+    sort: str | None = Query(None, pattern=SORT_PATTERN),
+    limit: int | None = Query(None, ge=1),
+    min_share: float | None = Query(None, ge=0, lt=1),
+    baselines: str | None = None,
+    if_none_match: str | None = Header(None),
+    service: MetricsService = Depends(get_service),
+):
+    """Main/peer rows of a report re-aggregated over the zoom window [zoom_from, zoom_to)."""
+    if to_epoch(zoom_to) <= to_epoch(zoom_from):
+        raise HTTPException(status_code=422, detail='"zoom_to" must be after "zoom_from"')
+    periods = _parse_baselines(baselines)
+    etag = build_etag(
+        {
+            "path": "/api/metrics/zoom",
+            "zoom_from": zoom_from, "zoom_to": zoom_to,
+            "customer": customer, "supplier": supplier, "destination": destination,
+            "from": time_from, "to": time_to, "reverse": reverse,
+            "sort": sort, "limit": limit, "min_share": min_share,
+            "baselines": format_baselines(periods),
+        },
+        data_watermark.token(),
+    )
+    not_modified = _not_modified(etag, if_none_match)
+    if not_modified is not None:
+        return not_modified
+
+    zoom = await service.get_zoom(
+        customer, supplier, destination, time_from, time_to, zoom_from, zoom_to,
+        reverse=reverse, sort=sort, limit=limit, min_share=min_share, baselines=periods,
+    )
+    return FastJSONResponse(zoom, headers=_etag_headers(etag))
+
+
+@router.get("/metrics/planner")
+async def get_query_planner():
+    """Fetch strategy latency estimates per query shape and the planner's recent decisions."""
+    return query_planner.snapshot()
 
 
 @router.get("/metrics/page", response_model=PaginatedMetricsResponse)
-async def list_metrics_page(filters: MetricFilter = Depends(), service: MetricsService = Depends(get_service)) -> PaginatedMetricsResponse:
-    cache_key = Cache.build_key("api:metrics_page", filters.dict(by_alias=True))
+async def list_metrics_page(
+    response: Response,
+    filters: MetricFilter = Depends(),
+    if_none_match: str | None = Header(None),
+    service: MetricsService = Depends(get_service),
+) -> PaginatedMetricsResponse | Response:
+    watermark = data_watermark.token()
+    etag = build_etag({"path": "/api/metrics/page", **filters.dict(by_alias=True)}, watermark)
+    not_modified = _not_modified(etag, if_none_match)
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(_etag_headers(etag))
+
+    # Keyed with the watermark like the ETag, so new data never gets an old page
+    cache_key = Cache.build_key("api:metrics_page", {**filters.dict(by_alias=True), "watermark": watermark})
     cached = await _cache.get_json(cache_key)
     if cached:
         return PaginatedMetricsResponse(**cached)
 
-    rows, next_c, prev_c = await service.list_metrics_page(
-        filters={
-            "customer": filters.customer,
-            "supplier": filters.supplier,
-            "destination": filters.destination,
-            "time_from": filters.time_from,
-            "time_to": filters.time_to,
-        },
-        limit=filters.limit,
-        next_cursor=filters.next_cursor,
-        prev_cursor=filters.prev_cursor,
-    )
+    # Paginated crawls queue behind typeahead and dashboard reports for DB slots
+    with priority_class(CRAWL):
+        rows, next_c, prev_c = await service.list_metrics_page(
+            filters={
+                "customer": filters.customer,
+                "supplier": filters.supplier,
+                "destination": filters.destination,
+                "time_from": filters.time_from,
+                "time_to": filters.time_to,
+            },
+            limit=filters.limit,
+            next_cursor=filters.next_cursor,
+            prev_cursor=filters.prev_cursor,
+        )
     resp = PaginatedMetricsResponse(items=[MetricOut(**row) for row in rows], next_cursor=next_c, prev_cursor=prev_c)
     await _cache.set_json(cache_key, resp.dict())
     return resp
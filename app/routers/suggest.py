@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException, Query
 from sqlalchemy import select, func
 
 from app.db.base import get_session
+from app.db.scheduler import TYPEAHEAD, priority_class
 from app.models.aggregation_table import sonus_aggregation_new
 
 router = APIRouter()
@@ -34,8 +35,9 @@ async def suggest(
     if q:
         stmt = stmt.where(col.ilike(f"{q}%"))
 
-    async with get_session() as session:
-        res = await session.execute(stmt)
-        values = [v for v in res.scalars().all() if v is not None]
+    with priority_class(TYPEAHEAD):
+        async with get_session() as session:
+            res = await session.execute(stmt)
+            values = [v for v in res.scalars().all() if v is not None]
 
     return {"items": values}
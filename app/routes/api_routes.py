@@ -2,7 +2,8 @@
 
 import tornado.web
 from app import config
-from app.handlers.metrics_handler import MetricsHandler, Metrics5mHandler, Metrics1hHandler
+from app.handlers.metrics_handler import MetricsHandler, Metrics5mHandler, Metrics1hHandler, MetricsSeriesHandler, MetricsZoomHandler, MetricsPlannerHandler
+from app.handlers.jobs_handler import JobReportHandler, JobResultPageHandler, JobsMetricsHandler, JobStatusHandler
 from app.handlers.suggest_handler import SuggestHandler
 from app.handlers.main_handler import MainHandler
 from app.handlers.shared_state_handler import SharedStateSaveHandler, SharedStateLoadHandler
@@ -47,6 +48,17 @@ def make_app():
         (r"/api/metrics", MetricsHandler),
         (r"/api/metrics/5m", Metrics5mHandler),
         (r"/api/metrics/1h", Metrics1hHandler),
+        # Drill-down: hourly/5m series of one (main, peer, destination) group
+        (r"/api/metrics/series", MetricsSeriesHandler),
+        # Chart zoom: main/peer rows re-aggregated over a sub-window of a report
+        (r"/api/metrics/zoom", MetricsZoomHandler),
+        # Fetch strategy planner: latency estimates per query shape and recent decisions
+        (r"/api/metrics/planner", MetricsPlannerHandler),
+        # Background report jobs: enqueue, status/progress, compressed result pages
+        (r"/api/jobs/report", JobReportHandler),
+        (r"/api/jobs/metrics", JobsMetricsHandler),
+        (r"/api/jobs/([A-Za-z0-9_:-]+)", JobStatusHandler),
+        (r"/api/jobs/([A-Za-z0-9_:-]+)/result/([0-9]+)", JobResultPageHandler),
         # Suggest endpoints for typeahead (prefix filter by kind)
         (r"/api/suggest/(customer|supplier|destination)", SuggestHandler),
         # Shared state endpoints (short links)
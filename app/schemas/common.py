@@ -10,9 +10,15 @@ class StatusResponse(BaseModel):
 
 class JobEnqueueResponse(BaseModel):
     task_id: str
+    status_url: str | None = None
 
 
 class JobStatusResponse(BaseModel):
     task_id: str
     status: str
+    # {"percent", "stage", ...} published by the worker
+    progress: dict | None = None
     result: object | None = None
+    # URLs of the result pages of a finished report job
+    pages: list[str] | None = None
+    error: str | None = None
@@ -0,0 +1,60 @@
+# app/services/cost_guard.py
+# Pre-flight cost guard of report requests.
+#
+# Before a report is computed, the repository's planner row estimate
+# (EXPLAIN over the report's periods, see MetricsRepository.estimate_rows)
+# decides how it is served:
+#   direct    - computed in the request, as requested;
+#   downgrade - 5-minute sections are dropped (hourly only), which bounds the
+#               grouping, serialization and response size;
+#   job       - computed by the arq worker; the request gets 202 + a job id.
+# Thresholds are per deployment (COST_DOWNGRADE_ROWS, COST_JOB_ROWS; 0 disables).
+
+from typing import NamedTuple, Optional
+
+from app.config import settings
+
+ACTION_DIRECT = "direct"
+ACTION_DOWNGRADE = "downgrade"
+ACTION_JOB = "job"
+
+# Response header naming the granularity of a downgraded report (also on body cache hits)
+GRANULARITY_HEADER = "X-Report-Granularity"
+
+# Granularities that include 5-minute sections, and what they are downgraded to
+_COARSER = {"5m": "1h", "both": "1h"}
+
+
+class CostDecision(NamedTuple):
+    """How a report is served; estimated_rows is None when the guard is off."""
+
+    action: str
+    estimated_rows: Optional[int]
+    granularity: str
+
+
+class CostGuard:
+    """Maps a row estimate to direct / downgrade / job by configured thresholds."""
+
+    def __init__(self, downgrade_rows: int = 0, job_rows: int = 0):
+        self.downgrade_rows = downgrade_rows
+        self.job_rows = job_rows
+
+    @classmethod
+    def from_settings(cls) -> "CostGuard":
+        return cls(settings.COST_DOWNGRADE_ROWS, settings.COST_JOB_ROWS)
+
+    @property
+    def enabled(self) -> bool:
+        return self.downgrade_rows > 0 or self.job_rows > 0
+
+    def decide(self, estimated_rows: int, granularity: str) -> CostDecision:
+        if self.job_rows and estimated_rows >= self.job_rows:
+            return CostDecision(ACTION_JOB, estimated_rows, granularity)
+        if self.downgrade_rows and estimated_rows >= self.downgrade_rows and granularity in _COARSER:
+            return CostDecision(ACTION_DOWNGRADE, estimated_rows, _COARSER[granularity])
+        return CostDecision(ACTION_DIRECT, estimated_rows, granularity)
+
+
+# Process-wide guard (services are created per request)
+cost_guard = CostGuard.from_settings()
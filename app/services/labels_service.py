@@ -1,9 +1,10 @@
 # app/services/labels_service.py
 from __future__ import annotations
 
-from datetime import datetime, timezone
 from typing import Any, Dict, Iterable, List, Mapping, Tuple
 
+from app.utils.time_buckets import EpochCache
+
 # --- Public API ---
 
 def build_labels(rows: Iterable[Mapping[str, Any]], *, granularity: str) -> Dict[str, Dict[str, List[float]]]:
@@ -22,12 +23,15 @@ def build_labels(rows: Iterable[Mapping[str, Any]], *, granularity: str) -> Dict
     by_ts_supplier_asr: Dict[tuple[int, str], List[float]] = {}
     by_ts_supplier_acd: Dict[tuple[int, str], List[float]] = {}
 
+    # rows of one bin share their time label: parse each distinct value once
+    epochs = EpochCache()
+
     for r in rows or []:
-        ts_ms = _parse_row_time_ms(r.get("time"))
-        if ts_ms is None:
+        epoch = epochs[r.get("time")]
+        if epoch is None:
             continue
         # align to bin center
-        center = (ts_ms // step_ms) * step_ms + (step_ms // 2)
+        center = (epoch * 1000 // step_ms) * step_ms + (step_ms // 2)
         # prefer 'peer' as supplier dimension (present in grouped rows)
         name = str(r.get("peer") or "").strip()
         if not name:
@@ -70,31 +74,6 @@ def _infer_step_ms(granularity: str) -> int:
     return 60 * 60_000
 
 
-def _parse_row_time_ms(raw: Any) -> int | None:
-    if isinstance(raw, datetime):
-        dt = raw
-    elif isinstance(raw, str):
-        s = raw.strip().replace("Z", "")
-        try:
-            dt = datetime.fromisoformat(s.replace(" ", "T"))
-        except Exception:
-            try:
-                dt = datetime.fromisoformat(s)
-            except Exception:
-                return None
-    else:
-        try:
-            s = str(raw).strip().replace("Z", "")
-            dt = datetime.fromisoformat(s)
-        except Exception:
-            return None
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    else:
-        dt = dt.astimezone(timezone.utc)
-    return int(dt.timestamp() * 1000)
-
-
 def _to_num(v: Any) -> float | None:
     try:
         if v is None:
@@ -1,21 +1,110 @@
 # app/services/metrics_service.py
 
+import asyncio
+import contextvars
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any, Tuple, List
+from typing import Optional, Dict, Any, Awaitable, Callable, Iterable, Sequence, Set, Tuple, List
 
-from app.utils.metrics import calculate_metrics
-from app.utils.grouped import calculate_grouped_metrics, calculate_hourly_metrics, calculate_5min_metrics
+from app.utils.baselines import DEFAULT_BASELINES, Baseline, format_baselines
+from app.utils.enrich import enrich_rows
+from app.utils.executor import cpu_executor
+from app.utils.formulas import calc_acd, calc_asr, calc_delta_percent, calc_minutes
+from app.utils.metrics import metrics_from_totals
+from app.utils.grouped import finalize_main, finalize_peer, finalize_hourly, finalize_5min
+from app.utils.partials import (
+    Partials, PartialsCache, partials_to_grouped, partials_to_series, to_epoch,
+)
+from app.utils.topn import OTHER_LABEL, TopN, fold_groups, fold_series
 from app.services.labels_service import build_labels  # use backend labels
 from app.utils.logger import log_info
 from app.repositories.metrics_repository import MetricsRepository
+from app.services.cost_guard import ACTION_DIRECT, CostDecision, CostGuard, cost_guard
+from app.services.query_planner import QueryPlanner, query_planner
+from app.services.shard_service import ShardedAggregator, merge_sums, reduce_rows, shard_aggregator, split_range
+from app.services.watermark_service import data_watermark
+
+
+# progress(done, total) of a chunked aggregation
+ProgressFn = Callable[[int, int], Awaitable[None]]
+
+
+def _to_utc_aware(dt: datetime) -> datetime:
+    # If None, pass through
+    if dt is None:
+        return dt
+    # If timezone-aware, convert to UTC
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc)
+    # If naive, treat as already UTC (inputs are in GMT0)
+    return dt.replace(tzinfo=timezone.utc)
+
+
+def _report_periods(
+    time_from: datetime, time_to: datetime, baselines: Sequence[Baseline]
+) -> Dict[str, Tuple[datetime, datetime]]:
+    """UTC ranges of "today" and every baseline prefix."""
+    time_from, time_to = _to_utc_aware(time_from), _to_utc_aware(time_to)
+    periods = {"today": (time_from, time_to)}
+    for b in baselines:
+        shift = timedelta(seconds=b.offset)
+        periods[b.prefix] = (time_from - shift, time_to - shift)
+    return periods
 
 
 class MetricsService:
     """Business logic for computing and comparing metrics."""
 
-    def __init__(self, repository: MetricsRepository):
+    def __init__(
+        self,
+        repository: MetricsRepository,
+        partials_cache: Optional[PartialsCache] = None,
+        sharder: Optional[ShardedAggregator] = None,
+        planner: Optional[QueryPlanner] = None,
+        guard: Optional[CostGuard] = None,
+    ):
         # Store repository dependency
         self._repo = repository
+        self._partials = partials_cache or PartialsCache()
+        self._sharder = sharder or shard_aggregator
+        self._planner = planner or query_planner
+        self._guard = guard or cost_guard
+        # Pending background partials writes (strong refs until done)
+        self._writes: Set[asyncio.Task] = set()
+
+    def _store_partials(self, key: str, partials: Partials, base_partials: Dict[str, Partials]) -> None:
+        """
+        Cache partials for drill-down without making the caller wait for the write.
+        The write runs in a fresh context: it outlives the request, so it must not
+        inherit its deadline, DB priority class or concurrency-limiter samples.
+        """
+        task = asyncio.get_running_loop().create_task(
+            self._partials.put(key, partials, base_partials), context=contextvars.Context(),
+        )
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def check_cost(
+        self,
+        customer: Optional[str],
+        supplier: Optional[str],
+        destination: Optional[str],
+        time_from: datetime,
+        time_to: datetime,
+        granularity: str = "both",
+        baselines: Sequence[Baseline] = DEFAULT_BASELINES,
+    ) -> CostDecision:
+        """
+        Pre-flight check of a report: serve it directly, downgraded to a coarser
+        granularity, or as a background job, by the estimated rows of all periods.
+        """
+        if not self._guard.enabled:
+            return CostDecision(ACTION_DIRECT, None, granularity)
+        filters = {"customer": customer, "supplier": supplier, "destination": destination}
+        estimated = await self._repo.estimate_rows(filters, _report_periods(time_from, time_to, baselines))
+        decision = self._guard.decide(estimated, granularity)
+        if decision.action != ACTION_DIRECT:
+            log_info(f"Report cost guard: ~{estimated} rows -> {decision.action} ({decision.granularity})")
+        return decision
 
     async def get_full_metrics_report(
         self,
@@ -26,68 +115,142 @@ class MetricsService:
         time_to: datetime,
         reverse: bool = False,
         granularity: str = "both",
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        min_share: Optional[float] = None,
+        lazy: bool = False,
+        baselines: Sequence[Baseline] = DEFAULT_BASELINES,
+        chunk_seconds: Optional[int] = None,
+        progress: Optional[ProgressFn] = None,
     ) -> Dict[str, Any]:
-        """Compute totals, grouped and hourly metrics with YoY (yesterday) deltas."""
+        """
+        Compute totals, grouped and hourly metrics with YoY (yesterday) deltas.
+
+        With sort/limit/min_share, main and peer-level sections are ranked by the sort
+        metric and cut to the top groups; the long tail is folded into an "Other" row
+        (per time slot for hourly/5m). Peer, hourly and 5m rows share one peer ranking.
+        With lazy, hourly/5m rows are left out and served per group by get_series.
+        Further baselines (e.g. week-over-week) add <prefix><metric> / <metric>_delta_<prefix>
+        columns; all periods are fetched in one query.
+        chunk_seconds/progress: see _aggregate_periods (background report jobs).
+        """
         log_info("Computing full metrics report")
+        topn = TopN(sort, limit, min_share) if (sort or limit or min_share) else None
 
-        rows_today, rows_yesterday = await self._fetch_comparison_data(
-            customer, supplier, destination, time_from, time_to
+        g = self._normalize_granularity(granularity)
+
+        # One pass over raw rows into per-5m-bucket partial sums; every section derives from them
+        partials, base_partials, totals = await self._aggregate_periods(
+            customer, supplier, destination, time_from, time_to, baselines, reverse, chunk_seconds, progress
         )
 
-        # Totals for today/yesterday
-        today_metrics = calculate_metrics(rows_today)
-        yesterday_metrics = calculate_metrics(rows_yesterday)
+        # Totals for today and every baseline
+        today_metrics = metrics_from_totals(totals["today"])
+        base_metrics = {b.prefix: metrics_from_totals(totals[b.prefix]) for b in baselines}
 
-        # Grouped by main/peer/destination
-        grouped_today = calculate_grouped_metrics(rows_today, reverse=reverse)
-        grouped_yesterday = calculate_grouped_metrics(rows_yesterday, reverse=reverse)
+        # Kept for drill-down (series/zoom) requests on the same report; written in the background
+        self._store_partials(
+            self._partials_key(customer, supplier, destination, time_from, time_to, reverse, baselines),
+            partials,
+            base_partials,
+        )
 
-        # Normalize granularity
-        g = (granularity or "both").lower()
-        if g not in ("5m", "1h", "both"):
-            g = "both"
+        # Grouping, top-N, enrichment and labels run on the report executor
+        return await cpu_executor.run(
+            self._assemble_report,
+            partials, base_partials, today_metrics, base_metrics, tuple(baselines), g, topn, lazy,
+        )
+
+    @staticmethod
+    def _assemble_report(
+        partials: Partials,
+        base_partials: Dict[str, Partials],
+        today_metrics: Dict[str, Any],
+        base_metrics: Dict[str, Dict[str, Any]],
+        baselines: Tuple[Baseline, ...],
+        g: str,
+        topn: Optional[TopN],
+        lazy: bool,
+    ) -> Dict[str, Any]:
+        """Report sections from the partials (CPU-bound; data in, data out so it can run in a worker)."""
+        # Grouped by main/peer/destination (raw sums; finalized after top-N)
+        main_agg, peer_agg = partials_to_grouped(partials)
+        base_main_agg: Dict[str, Dict[tuple, Dict[str, Any]]] = {}
+        base_peer_agg: Dict[str, Dict[tuple, Dict[str, Any]]] = {}
+        for prefix, p in base_partials.items():
+            base_main_agg[prefix], base_peer_agg[prefix] = partials_to_grouped(p)
+
+        # Series rows; lazy reports only need today's series that feeds the labels
+        want_hourly = g in ("1h", "both")
+        want_five = g == "5m" if lazy else g in ("5m", "both")
 
         # Hourly per (main, peer, destination, hour) — compute only if requested
-        if g in ("1h", "both"):
-            hourly_today = calculate_hourly_metrics(rows_today, reverse=reverse)
-            hourly_yesterday = calculate_hourly_metrics(rows_yesterday, reverse=reverse)
+        if want_hourly:
+            hourly_agg = partials_to_series(partials, "1h")
+            base_hourly_agg = {} if lazy else {
+                prefix: partials_to_series(p, "1h") for prefix, p in base_partials.items()
+            }
         else:
-            hourly_today = []
-            hourly_yesterday = []
+            hourly_agg = {}
+            base_hourly_agg = {}
 
         # Five-minute per (main, peer, destination, 5m slot) — compute only if requested
-        if g in ("5m", "both"):
-            five_today = calculate_5min_metrics(rows_today, reverse=reverse)
-            five_yesterday = calculate_5min_metrics(rows_yesterday, reverse=reverse)
+        if want_five:
+            five_agg = partials_to_series(partials, "5m")
+            base_five_agg = {} if lazy else {
+                prefix: partials_to_series(p, "5m") for prefix, p in base_partials.items()
+            }
         else:
-            five_today = []
-            five_yesterday = []
+            five_agg = {}
+            base_five_agg = {}
+
+        topn_meta = None
+        if topn is not None:
+            # Partial selection on raw sums: folded groups are never finalized or enriched
+            main_rank = topn.rank(main_agg)
+            peer_rank = topn.rank(peer_agg)
+            topn_meta = {
+                "sort": topn.sort, "limit": topn.limit, "min_share": topn.min_share,
+                "main_groups": len(main_agg), "peer_groups": len(peer_agg),
+            }
+            main_agg = fold_groups(main_agg, main_rank)
+            peer_agg = fold_groups(peer_agg, peer_rank)
+            hourly_agg = fold_series(hourly_agg, peer_rank)
+            five_agg = fold_series(five_agg, peer_rank)
+            # Baselines are folded with today's ranking
+            base_main_agg = {prefix: fold_groups(a, main_rank) for prefix, a in base_main_agg.items()}
+            base_peer_agg = {prefix: fold_groups(a, peer_rank) for prefix, a in base_peer_agg.items()}
+            base_hourly_agg = {prefix: fold_series(a, peer_rank) for prefix, a in base_hourly_agg.items()}
+            base_five_agg = {prefix: fold_series(a, peer_rank) for prefix, a in base_five_agg.items()}
+            log_info(
+                f"Top-N by {topn.sort}: kept {len(main_rank)}/{topn_meta['main_groups']} main, "
+                f"{len(peer_rank)}/{topn_meta['peer_groups']} peer"
+            )
+
+        hourly_today = finalize_hourly(hourly_agg)
+        five_today = finalize_5min(five_agg)
 
-        # Enrich with yesterday values and deltas
-        main_rows = self._enrich_rows(
-            grouped_today.get("main_rows", []),
-            grouped_yesterday.get("main_rows", []),
+        # Enrich with baseline values and deltas
+        main_rows = MetricsService._enrich_periods(
+            finalize_main(main_agg),
+            {prefix: finalize_main(a) for prefix, a in base_main_agg.items()},
             key_fields=["main", "destination"],
         )
-        peer_rows = self._enrich_rows(
-            grouped_today.get("peer_rows", []),
-            grouped_yesterday.get("peer_rows", []),
+        peer_rows = MetricsService._enrich_periods(
+            finalize_peer(peer_agg),
+            {prefix: finalize_peer(a) for prefix, a in base_peer_agg.items()},
             key_fields=["main", "peer", "destination"],
         )
-        hourly_rows = self._enrich_rows(
-            hourly_today,
-            hourly_yesterday,
-            key_fields=["main", "peer", "destination", "time"],
-            extra_fields=("time",),  # keep full "time" for display
-        )
-
-        # Enrich 5-minute rows (key on HH:MM slot, keep full 'time')
-        five_min_rows = self._enrich_rows(
-            five_today,
-            five_yesterday,
-            key_fields=["main", "peer", "destination", "time"],
-            extra_fields=("time",),
-        )
+        if lazy:
+            # Series are fetched per group on expand (get_series)
+            hourly_rows, five_min_rows = [], []
+        else:
+            hourly_rows = MetricsService._enrich_series(
+                hourly_today, {prefix: finalize_hourly(a) for prefix, a in base_hourly_agg.items()}
+            )
+            five_min_rows = MetricsService._enrich_series(
+                five_today, {prefix: finalize_5min(a) for prefix, a in base_five_agg.items()}
+            )
 
         # Build labels (backend computes; JS only lays out)
         try:
@@ -101,62 +264,319 @@ class MetricsService:
         except Exception:
             labels = {}
 
-        return {
+        report = {
             "today_metrics": today_metrics,
-            "yesterday_metrics": yesterday_metrics,
+            "yesterday_metrics": base_metrics["Y"],
             "main_rows": main_rows,
             "peer_rows": peer_rows,
             "hourly_rows": hourly_rows,
             "five_min_rows": five_min_rows,
             "labels": labels,  # additive field
         }
+        if len(baselines) > 1:
+            report["baselines"] = [{"prefix": b.prefix, "offset": b.label} for b in baselines]
+            report["baseline_metrics"] = {prefix: m for prefix, m in base_metrics.items() if prefix != "Y"}
+        if topn_meta is not None:
+            report["topn"] = topn_meta
+        if lazy:
+            report["lazy"] = True
+        return report
 
-    async def _fetch_comparison_data(
+    async def get_series(
         self,
         customer: Optional[str],
         supplier: Optional[str],
         destination: Optional[str],
-        time_from_dt: datetime,
-        time_to_dt: datetime,
-    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        time_from: datetime,
+        time_to: datetime,
+        main: str,
+        peer: str,
+        dest: str,
+        reverse: bool = False,
+        granularity: str = "both",
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        min_share: Optional[float] = None,
+        baselines: Sequence[Baseline] = DEFAULT_BASELINES,
+    ) -> Dict[str, Any]:
         """
-        Fetch rows for period and same period minus one day.
-        Optimized: Uses parallel queries instead of sequential.
-        Convert inputs to UTC-aware datetimes to match TIMESTAMP WITH TIME ZONE.
+        Hourly/5m rows of one (main, peer, destination) group of a report (lazy drill-down).
+
+        Served from the report's cached partials when present; otherwise only that
+        group's rows are fetched. The "Other" group is re-folded with the report's
+        sort/limit/min_share.
         """
-        def _to_utc_aware(dt: datetime) -> datetime:
-            # If None, pass through
-            if dt is None:
-                return dt
-            # If timezone-aware, convert to UTC
-            if dt.tzinfo is not None:
-                return dt.astimezone(timezone.utc)
-            # If naive, treat as already UTC (inputs are in GMT0)
-            return dt.replace(tzinfo=timezone.utc)
-
-        time_from_dt = _to_utc_aware(time_from_dt)
-        time_to_dt = _to_utc_aware(time_to_dt)
-
-        # Calculate yesterday's time range in UTC
-        y_time_from_dt = _to_utc_aware(time_from_dt - timedelta(days=1))
-        y_time_to_dt = _to_utc_aware(time_to_dt - timedelta(days=1))
-
-        # Build filters for repository
-        filters = {
-            "customer": customer,
-            "supplier": supplier,
-            "destination": destination,
+        g = self._normalize_granularity(granularity)
+        group = (main, peer, dest)
+        is_other = group == (OTHER_LABEL,) * 3
+        key = self._partials_key(customer, supplier, destination, time_from, time_to, reverse, baselines)
+
+        cached = await self._partials.get(key)
+        if cached is not None:
+            partials, base_partials = cached
+        else:
+            if not is_other:
+                # Narrow the fetch to this group; exact matching happens on the partial keys
+                customer, supplier = (peer, main) if reverse else (main, peer)
+                destination = dest
+            partials, base_partials, _ = await self._aggregate_periods(
+                customer, supplier, destination, time_from, time_to, baselines, reverse
+            )
+            if is_other:
+                # Whole report was fetched: cache it for the next drill-down
+                await self._partials.put(key, partials, base_partials)
+
+        if is_other:
+            ranked = TopN(sort, limit, min_share).rank(partials_to_grouped(partials)[1])
+
+            def _series(p: Partials, gran: str) -> Dict[tuple, Dict[str, Any]]:
+                folded = fold_series(partials_to_series(p, gran), ranked)
+                return {k: a for k, a in folded.items() if k[:3] == group}
+        else:
+            def _series(p: Partials, gran: str) -> Dict[tuple, Dict[str, Any]]:
+                return partials_to_series(p, gran, groups={group})
+
+        result: Dict[str, Any] = {"main": main, "peer": peer, "destination": dest}
+        result["hourly_rows"] = self._enrich_series(
+            finalize_hourly(_series(partials, "1h")),
+            {prefix: finalize_hourly(_series(p, "1h")) for prefix, p in base_partials.items()},
+        ) if g in ("1h", "both") else []
+        result["five_min_rows"] = self._enrich_series(
+            finalize_5min(_series(partials, "5m")),
+            {prefix: finalize_5min(_series(p, "5m")) for prefix, p in base_partials.items()},
+        ) if g in ("5m", "both") else []
+        return result
+
+    async def get_zoom(
+        self,
+        customer: Optional[str],
+        supplier: Optional[str],
+        destination: Optional[str],
+        time_from: datetime,
+        time_to: datetime,
+        zoom_from: datetime,
+        zoom_to: datetime,
+        reverse: bool = False,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        min_share: Optional[float] = None,
+        baselines: Sequence[Baseline] = DEFAULT_BASELINES,
+    ) -> Dict[str, Any]:
+        """
+        Main/peer rows of a report re-aggregated over a zoom window [zoom_from, zoom_to)
+        (5m buckets by start time), with every baseline compared over the same window
+        shifted back by its offset.
+
+        Served from the report's cached partials; on a miss the report's rows are
+        fetched once and their partials cached for further zooms.
+        """
+        key = self._partials_key(customer, supplier, destination, time_from, time_to, reverse, baselines)
+        cached = await self._partials.get(key)
+        if cached is not None:
+            partials, base_partials = cached
+        else:
+            partials, base_partials, _ = await self._aggregate_periods(
+                customer, supplier, destination, time_from, time_to, baselines, reverse
+            )
+            await self._partials.put(key, partials, base_partials)
+
+        # Baseline partials sit on the report's buckets, so one window selects all periods
+        t0, t1 = to_epoch(zoom_from), to_epoch(zoom_to)
+        main_agg, peer_agg = partials_to_grouped(partials, t0, t1)
+        base_main_agg: Dict[str, Dict[tuple, Dict[str, Any]]] = {}
+        base_peer_agg: Dict[str, Dict[tuple, Dict[str, Any]]] = {}
+        for prefix, p in base_partials.items():
+            base_main_agg[prefix], base_peer_agg[prefix] = partials_to_grouped(p, t0, t1)
+        aggregates = self._zoom_aggregates(main_agg.values(), base_main_agg["Y"].values())
+
+        topn_meta = None
+        if sort or limit or min_share:
+            # Ranked within the window, like a report requested for it
+            topn = TopN(sort, limit, min_share)
+            main_rank = topn.rank(main_agg)
+            peer_rank = topn.rank(peer_agg)
+            topn_meta = {
+                "sort": topn.sort, "limit": topn.limit, "min_share": topn.min_share,
+                "main_groups": len(main_agg), "peer_groups": len(peer_agg),
+            }
+            main_agg = fold_groups(main_agg, main_rank)
+            peer_agg = fold_groups(peer_agg, peer_rank)
+            base_main_agg = {prefix: fold_groups(a, main_rank) for prefix, a in base_main_agg.items()}
+            base_peer_agg = {prefix: fold_groups(a, peer_rank) for prefix, a in base_peer_agg.items()}
+
+        result: Dict[str, Any] = {
+            "zoom": {"from": zoom_from.isoformat(), "to": zoom_to.isoformat()},
+            "main_rows": self._enrich_periods(
+                finalize_main(main_agg),
+                {prefix: finalize_main(a) for prefix, a in base_main_agg.items()},
+                key_fields=["main", "destination"],
+            ),
+            "peer_rows": self._enrich_periods(
+                finalize_peer(peer_agg),
+                {prefix: finalize_peer(a) for prefix, a in base_peer_agg.items()},
+                key_fields=["main", "peer", "destination"],
+            ),
+            "aggregates": aggregates,
         }
-        
-        # Use parallel fetch for better performance
-        return await self._repo.get_metrics_parallel(
-            filters,
-            time_from_dt,
-            time_to_dt,
-            y_time_from_dt,
-            y_time_to_dt,
+        if topn_meta is not None:
+            result["topn"] = topn_meta
+        return result
+
+    @staticmethod
+    def _zoom_aggregates(today: Iterable[Dict[str, Any]], yesterday: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Footer totals of a zoom window (same shape as the browser's computeAggregates), from raw sums."""
+        def totals(aggs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+            seconds = success = attempt = 0
+            for a in aggs:
+                seconds += a["seconds"]
+                success += a["success"]
+                attempt += a["attempt"]
+            return {
+                "totalMinutes": calc_minutes(seconds),
+                "totalSuccessfulCalls": success,
+                "totalCalls": attempt,
+                "acdAvg": calc_acd(seconds, success),
+                "asrAvg": calc_asr(success, attempt),
+            }
+
+        curr, y = totals(today), totals(yesterday)
+        return {"curr": curr, "y": y, "delta": {k: calc_delta_percent(curr[k], y[k]) for k in curr}}
+
+    @staticmethod
+    def _normalize_granularity(granularity: Optional[str]) -> str:
+        g = (granularity or "both").lower()
+        return g if g in ("5m", "1h", "both") else "both"
+
+    @staticmethod
+    def _partials_key(
+        customer: Optional[str],
+        supplier: Optional[str],
+        destination: Optional[str],
+        time_from: datetime,
+        time_to: datetime,
+        reverse: bool,
+        baselines: Sequence[Baseline] = DEFAULT_BASELINES,
+    ) -> str:
+        """Cache key of a report's partials; includes the data watermark like report ETags."""
+        return PartialsCache.build_key({
+            "customer": customer or "",
+            "supplier": supplier or "",
+            "destination": destination or "",
+            "from": time_from,
+            "to": time_to,
+            "reverse": reverse,
+            "baselines": format_baselines(baselines),
+            "watermark": data_watermark.token(),
+        })
+
+    async def _aggregate_periods(
+        self,
+        customer: Optional[str],
+        supplier: Optional[str],
+        destination: Optional[str],
+        time_from: datetime,
+        time_to: datetime,
+        baselines: Sequence[Baseline],
+        reverse: bool,
+        chunk_seconds: Optional[int] = None,
+        progress: Optional[ProgressFn] = None,
+    ) -> Tuple[Partials, Dict[str, Partials], Dict[str, Dict[str, Any]]]:
+        """
+        Partials of today and of every baseline, plus total counters keyed "today"
+        and by prefix. Baseline buckets are shifted forward by the offset so that
+        hourly/5m rows line up with today's time labels. Large ranges are fetched
+        and reduced in time shards on the shard workers; with chunk_seconds, ranges
+        longer than that are fetched and reduced one time chunk after another
+        (only one chunk of raw rows in memory), calling progress(done, total).
+        """
+        if self._sharder.applies(time_from, time_to):
+            filters = {"customer": customer, "supplier": supplier, "destination": destination}
+            sums = await self._sharder.aggregate(
+                filters, _to_utc_aware(time_from), _to_utc_aware(time_to), baselines, reverse
+            )
+        elif chunk_seconds and to_epoch(time_to) - to_epoch(time_from) > chunk_seconds:
+            chunks = split_range(time_from, time_to, chunk_seconds)
+            shifts = {b.prefix: b.offset for b in baselines}
+            sums = {}
+            for done, (start, end) in enumerate(chunks, 1):
+                rows_today, rows_base = await self._fetch_periods(
+                    customer, supplier, destination, start, end, baselines
+                )
+                merge_sums(sums, await cpu_executor.run(
+                    reduce_rows, {"today": rows_today, **rows_base}, shifts, reverse, threaded=True
+                ))
+                if progress is not None:
+                    await progress(done, len(chunks))
+            return self._split_sums(sums, baselines)
+        else:
+            rows_today, rows_base = await self._fetch_periods(
+                customer, supplier, destination, time_from, time_to, baselines
+            )
+            shifts = {b.prefix: b.offset for b in baselines}
+            # Raw rows cost more to pickle than to reduce: threads even in process mode
+            sums = await cpu_executor.run(
+                reduce_rows, {"today": rows_today, **rows_base}, shifts, reverse, threaded=True
+            )
+
+        if progress is not None:
+            await progress(1, 1)
+        return self._split_sums(sums, baselines)
+
+    @staticmethod
+    def _split_sums(
+        sums: Dict[str, Tuple[Partials, Dict[str, Any]]], baselines: Sequence[Baseline]
+    ) -> Tuple[Partials, Dict[str, Partials], Dict[str, Dict[str, Any]]]:
+        partials = sums["today"][0]
+        base_partials = {b.prefix: sums[b.prefix][0] for b in baselines}
+        totals = {name: counters for name, (_, counters) in sums.items()}
+        return partials, base_partials, totals
+
+    @staticmethod
+    def _enrich_series(
+        today_rows: List[Dict[str, Any]], base_rows: Dict[str, List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """Enrich hourly/5m rows, keeping the full "time" for display."""
+        return MetricsService._enrich_periods(
+            today_rows,
+            base_rows,
+            key_fields=["main", "peer", "destination", "time"],
+            extra_fields=("time",),
+        )
+
+    @staticmethod
+    def _enrich_periods(
+        today_rows: List[Dict[str, Any]],
+        base_rows: Dict[str, List[Dict[str, Any]]],
+        key_fields: List[str],
+        extra_fields: Tuple[str, ...] = (),
+    ) -> List[Dict[str, Any]]:
+        """_enrich_rows with rows per baseline prefix (none for sections left out by granularity)."""
+        return MetricsService._enrich_rows(
+            today_rows,
+            base_rows.get("Y", []),
+            key_fields,
+            extra_fields,
+            baselines=[(prefix, rows) for prefix, rows in base_rows.items() if prefix != "Y"],
         )
 
+    async def _fetch_periods(
+        self,
+        customer: Optional[str],
+        supplier: Optional[str],
+        destination: Optional[str],
+        time_from: datetime,
+        time_to: datetime,
+        baselines: Sequence[Baseline],
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+        """
+        Today's rows and rows per baseline prefix, fetched with the strategy
+        (UNION ALL or parallel queries) the query planner picks for this shape.
+        Inputs are converted to UTC-aware datetimes to match TIMESTAMP WITH TIME ZONE.
+        """
+        filters = {"customer": customer, "supplier": supplier, "destination": destination}
+        rows = await self._planner.fetch(self._repo, filters, _report_periods(time_from, time_to, baselines))
+        return rows["today"], {b.prefix: rows[b.prefix] for b in baselines}
+
     async def _fetch_with_repository(
         self,
         customer: Optional[str],
@@ -176,52 +596,30 @@ class MetricsService:
         }
         return await self._repo.get_metrics(filters, limit=limit)
 
+    @staticmethod
     def _enrich_rows(
-        self,
         today_rows: List[Dict[str, Any]],
         yesterday_rows: List[Dict[str, Any]],
         key_fields: List[str],
         extra_fields: Tuple[str, ...] = (),
+        baselines: Sequence[Tuple[str, List[Dict[str, Any]]]] = (),
     ) -> List[Dict[str, Any]]:
-        """Attach yesterday values and percentage deltas to today's rows."""
-        yesterday_map = {tuple(r.get(k) for k in key_fields): r for r in yesterday_rows}
-
-        enriched_rows: List[Dict[str, Any]] = []
-        metrics_to_compare = ["Min", "ACD", "ASR", "PDD", "ATime", "SCall", "TCall"]
-
-        for today_row in today_rows:
-            key = tuple(today_row.get(k) for k in key_fields)
-            yesterday_row = yesterday_map.get(key, {})
-            combined = {field: today_row.get(field) for field in key_fields}
-            # Preserve extra display fields (e.g. full "time" for hourly)
-            for f in extra_fields:
-                combined[f] = today_row.get(f)
-
-            for metric in metrics_to_compare:
-                t_val = today_row.get(metric, 0) or 0
-                y_val = yesterday_row.get(metric, 0) or 0
-                if y_val == 0:
-                    delta = 100.0 if t_val > 0 else 0.0
-                else:
-                    delta = round(((t_val - y_val) / y_val) * 100, 1)
-                combined[metric] = t_val
-                combined[f"Y{metric}"] = y_val
-                combined[f"{metric}_delta"] = delta
-
-            enriched_rows.append(combined)
-
-        return enriched_rows
+        """Attach yesterday values and percentage deltas to today's rows (columnar when numpy is available)."""
+        return enrich_rows(today_rows, yesterday_rows, key_fields, extra_fields, baselines)
 
     # --- CRUD proxy methods for FastAPI router ---
 
     async def insert_metric(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Insert a new metric record."""
         new_id = await self._repo.insert_metric(data)
+        # Ingest path: invalidate ETags for this process without waiting for the trigger refresh
+        data_watermark.bump("metrics")
         return {**data, "id": new_id}
 
     async def delete_metric(self, metric_id: int) -> None:
         """Delete metric by id."""
         await self._repo.delete_metric(metric_id)
+        data_watermark.bump("metrics")
 
     async def list_metrics_page(
         self,
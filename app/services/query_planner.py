@@ -0,0 +1,175 @@
+# app/services/query_planner.py
+# Adaptive choice between equivalent fetch strategies of a report's periods.
+#
+# A report needs the rows of "today" and of every baseline period. The
+# repository can read them as one UNION ALL ("union") or as concurrent
+# per-period queries ("parallel"); which one is faster depends on the range,
+# the filter selectivity and the pool load. The planner keeps an EWMA of the
+# observed latency per (query shape, strategy), picks the fastest strategy of a
+# shape and explores another one with probability epsilon (epsilon-greedy).
+# Further strategies (push-down, rollups) join with QueryPlanner.register.
+
+import math
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.db.base import pool_headroom
+
+Period = Tuple[datetime, datetime]
+Rows = Dict[str, List[Dict[str, Any]]]
+# (repository, filters, {period name: (from, to)}) -> {period name: rows in time order}
+FetchFn = Callable[[Any, Dict[str, Any], Dict[str, Period]], Awaitable[Rows]]
+# (repository, periods) -> whether the strategy can serve this fetch
+SupportsFn = Callable[[Any, Dict[str, Period]], bool]
+
+
+class Strategy(NamedTuple):
+    """A named way of fetching the rows of several periods."""
+
+    name: str
+    fetch: FetchFn
+    supports: SupportsFn
+
+
+class _Stats:
+    __slots__ = ("ewma", "count", "last")
+
+    def __init__(self):
+        self.ewma: Optional[float] = None
+        self.count = 0
+        self.last = 0.0
+
+
+async def _fetch_union(repo, filters: Dict[str, Any], periods: Dict[str, Period]) -> Rows:
+    return await repo.get_metrics_multi_period(filters, periods)
+
+
+async def _fetch_parallel(repo, filters: Dict[str, Any], periods: Dict[str, Period]) -> Rows:
+    if len(periods) == 2:
+        # Report + day-over-day: the original two-query fetch
+        (name, (t0, t1)), (base_name, (y0, y1)) = periods.items()
+        rows, base_rows = await repo.get_metrics_parallel(filters, t0, t1, y0, y1)
+        return {name: rows, base_name: base_rows}
+    return await repo.get_metrics_per_period(filters, periods)
+
+
+def _supports_union(repo, periods: Dict[str, Period]) -> bool:
+    return hasattr(repo, "get_metrics_multi_period")
+
+
+def _supports_parallel(repo, periods: Dict[str, Period]) -> bool:
+    return hasattr(repo, "get_metrics_parallel" if len(periods) == 2 else "get_metrics_per_period")
+
+
+def query_shape(filters: Dict[str, Any], periods: Dict[str, Period]) -> str:
+    """
+    Planner key of a fetch, e.g. "24h|e--|p2|free": range length (rounded up
+    to a power of two hours), per filter exact (e) / pattern (p) / none (-),
+    number of periods, and whether the pool is busy.
+    """
+    t0, t1 = next(iter(periods.values()))
+    hours = max(1.0, (t1 - t0).total_seconds() / 3600)
+    span = 2 ** math.ceil(math.log2(hours))
+
+    selectivity = ""
+    for key in ("customer", "supplier", "destination"):
+        value = filters.get(key)
+        if not value:
+            selectivity += "-"
+        elif isinstance(value, str) and ("%" in value or "_" in value):
+            selectivity += "p"
+        else:
+            selectivity += "e"
+
+    load = "busy" if pool_headroom() <= settings.FETCH_POOL_RESERVE else "free"
+    return f"{span}h|{selectivity}|p{len(periods)}|{load}"
+
+
+class QueryPlanner:
+    """Epsilon-greedy strategy selection on EWMA latencies per query shape."""
+
+    def __init__(
+        self,
+        epsilon: float = 0.05,
+        alpha: float = 0.2,
+        history: int = 50,
+        rng: Optional[random.Random] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.epsilon = epsilon
+        self.alpha = alpha
+        self._rng = rng or random.Random()
+        self._clock = clock
+        self._strategies: Dict[str, Strategy] = {}
+        self._stats: Dict[str, Dict[str, _Stats]] = {}
+        self._decisions: Deque[Dict[str, Any]] = deque(maxlen=history)
+
+    @classmethod
+    def from_settings(cls) -> "QueryPlanner":
+        planner = cls(settings.QUERY_PLANNER_EPSILON, settings.QUERY_PLANNER_ALPHA)
+        planner.register("parallel", _fetch_parallel, _supports_parallel)
+        planner.register("union", _fetch_union, _supports_union)
+        return planner
+
+    def register(self, name: str, fetch: FetchFn, supports: SupportsFn = lambda repo, periods: True) -> None:
+        """Add (or replace) a strategy; it competes from its first untried shape on."""
+        self._strategies[name] = Strategy(name, fetch, supports)
+
+    def choose(self, shape: str, candidates: List[str]) -> Tuple[str, bool]:
+        """(strategy name, explored): untried candidates first, then epsilon-greedy."""
+        stats = self._stats.get(shape, {})
+        untried = [name for name in candidates if name not in stats]
+        if untried:
+            return untried[0], True
+        if len(candidates) > 1 and self._rng.random() < self.epsilon:
+            return self._rng.choice(candidates), True
+        return min(candidates, key=lambda name: stats[name].ewma), False
+
+    def record(self, shape: str, name: str, seconds: float) -> None:
+        stats = self._stats.setdefault(shape, {}).setdefault(name, _Stats())
+        stats.ewma = seconds if stats.ewma is None else self.alpha * seconds + (1 - self.alpha) * stats.ewma
+        stats.count += 1
+        stats.last = seconds
+
+    async def fetch(self, repo, filters: Dict[str, Any], periods: Dict[str, Period]) -> Rows:
+        """Rows per period from the strategy chosen for this query shape; its latency is recorded."""
+        candidates = [s.name for s in self._strategies.values() if s.supports(repo, periods)]
+        if not candidates:
+            raise RuntimeError("No fetch strategy supports this repository")
+        shape = query_shape(filters, periods)
+        name, explored = self.choose(shape, candidates)
+
+        start = self._clock()
+        rows = await self._strategies[name].fetch(repo, filters, periods)
+        elapsed = self._clock() - start
+        # Failed fetches raise before this point and are not recorded
+        self.record(shape, name, elapsed)
+        self._decisions.append({
+            "at": time.time(), "shape": shape, "strategy": name,
+            "explored": explored, "ms": round(elapsed * 1000, 2),
+        })
+        return rows
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Strategies, latency estimates per shape and the latest decisions."""
+        return {
+            "epsilon": self.epsilon,
+            "alpha": self.alpha,
+            "strategies": list(self._strategies),
+            "shapes": {
+                shape: {
+                    name: {"ewma_ms": round(s.ewma * 1000, 2), "count": s.count, "last_ms": round(s.last * 1000, 2)}
+                    for name, s in stats.items()
+                }
+                for shape, stats in self._stats.items()
+            },
+            "decisions": list(self._decisions),
+        }
+
+
+# Process-wide planner (services are created per request)
+query_planner = QueryPlanner.from_settings()
@@ -0,0 +1,165 @@
+# app/services/shard_service.py
+# Sharded aggregation of large report ranges on a process pool.
+#
+# The report range is split into time shards. A worker process fetches one
+# shard of every comparison period (one UNION ALL query) and reduces it to
+# mergeable sums: per-bucket partials and total counters. The parent only
+# merges the shards (in time order), so the CPU-bound grouping of a multi-day
+# report runs on all cores instead of the event loop thread.
+# Workers are spawned, not forked, and keep one event loop each, so every
+# worker creates and uses its own database engine on that loop.
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.repositories.metrics_repository import MetricsRepository
+from app.utils.baselines import Baseline
+from app.utils.logger import log_info
+from app.utils.metrics import merge_totals, sum_totals
+from app.utils.partials import BUCKET_SECONDS, Partials, build_partials, merge_partials, to_epoch
+
+Period = Tuple[datetime, datetime]
+# Period name ("today" or a baseline prefix) -> (partials, total counters)
+ShardSums = Dict[str, Tuple[Partials, Dict[str, Any]]]
+# (filters, periods, bucket shifts, reverse) -> sums; must be picklable for process pools
+ShardFn = Callable[[Dict[str, Any], Dict[str, Period], Dict[str, int], bool], ShardSums]
+
+# Repository ranges are inclusive; a shard ends this much before the next one starts
+_RESOLUTION = timedelta(microseconds=1)
+
+
+def split_range(time_from: datetime, time_to: datetime, shard_seconds: int) -> List[Period]:
+    """
+    Inclusive (from, to) shards that together select what one BETWEEN over
+    [time_from, time_to] selects. Inner boundaries fall on multiples of
+    shard_seconds (whole 5-minute buckets), so no bucket is split across shards.
+    """
+    step = max(BUCKET_SECONDS, shard_seconds - shard_seconds % BUCKET_SECONDS)
+    edge = time_from.replace(microsecond=0) + timedelta(seconds=step - to_epoch(time_from) % step)
+
+    shards: List[Period] = []
+    start = time_from
+    while edge < time_to:
+        shards.append((start, edge - _RESOLUTION))
+        start = edge
+        edge += timedelta(seconds=step)
+    shards.append((start, time_to))
+    return shards
+
+
+def reduce_rows(rows: Dict[str, List[Dict[str, Any]]], shifts: Dict[str, int], reverse: bool) -> ShardSums:
+    """Raw rows per period -> mergeable sums; baseline buckets are shifted onto the report's."""
+    return {
+        name: (build_partials(period_rows, reverse=reverse, shift=shifts.get(name, 0)), sum_totals(period_rows))
+        for name, period_rows in rows.items()
+    }
+
+
+def merge_sums(target: ShardSums, other: ShardSums) -> ShardSums:
+    """Merge the sums of a later time range into target (in place, keeps row order)."""
+    for name, (partials, totals) in other.items():
+        if name in target:
+            merge_partials(target[name][0], partials)
+            merge_totals(target[name][1], totals)
+        else:
+            target[name] = (partials, totals)
+    return target
+
+
+# One event loop per worker process: the worker's engine connections are bound to it
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def aggregate_shard(
+    filters: Dict[str, Any],
+    periods: Dict[str, Period],
+    shifts: Dict[str, int],
+    reverse: bool,
+) -> ShardSums:
+    """Worker entry point: fetch one shard of every period and reduce it."""
+    global _worker_loop
+    if _worker_loop is None:
+        _worker_loop = asyncio.new_event_loop()
+    rows = _worker_loop.run_until_complete(MetricsRepository().get_metrics_multi_period(filters, periods))
+    return reduce_rows(rows, shifts, reverse)
+
+
+class ShardedAggregator:
+    """
+    Splits large report ranges into time shards aggregated in worker processes
+    and merges their sums. Disabled with workers=0 (the default setting).
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        shard_seconds: int = 6 * 3600,
+        min_range_seconds: int = 2 * 86400,
+        executor: Optional[Executor] = None,
+        shard_fn: ShardFn = aggregate_shard,
+    ):
+        self.workers = workers
+        self.shard_seconds = shard_seconds
+        self.min_range_seconds = min_range_seconds
+        self._executor = executor
+        self._shard_fn = shard_fn
+
+    @classmethod
+    def from_settings(cls) -> "ShardedAggregator":
+        return cls(settings.SHARD_WORKERS, settings.SHARD_SECONDS, settings.SHARD_MIN_RANGE_SECONDS)
+
+    def applies(self, time_from: datetime, time_to: datetime) -> bool:
+        """Whether a report over this range is sharded."""
+        enabled = self.workers > 0 or self._executor is not None
+        return enabled and to_epoch(time_to) - to_epoch(time_from) >= self.min_range_seconds
+
+    def _pool(self) -> Executor:
+        # Created on first use: processes are only started when a large report comes in
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def aggregate(
+        self,
+        filters: Dict[str, Any],
+        time_from: datetime,
+        time_to: datetime,
+        baselines: Sequence[Baseline],
+        reverse: bool = False,
+    ) -> ShardSums:
+        """Sums of "today" and every baseline prefix over [time_from, time_to], merged from shards."""
+        shards = split_range(time_from, time_to, self.shard_seconds)
+        shifts = {"today": 0, **{b.prefix: b.offset for b in baselines}}
+        log_info(f"Sharded aggregation: {len(shards)} shards, {self.workers} workers")
+
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        futures = []
+        for start, end in shards:
+            periods = {
+                name: (start - timedelta(seconds=shift), end - timedelta(seconds=shift))
+                for name, shift in shifts.items()
+            }
+            futures.append(loop.run_in_executor(pool, self._shard_fn, filters, periods, shifts, reverse))
+
+        # Merge in time order (rows keep the order of an in-process report) while
+        # later shards are still running
+        merged: ShardSums = {}
+        for future in futures:
+            merge_sums(merged, await future)
+        return merged
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Process-wide aggregator (services are created per request)
+shard_aggregator = ShardedAggregator.from_settings()
@@ -0,0 +1,98 @@
+# app/services/watermark_service.py
+# In-process view of per-table data watermarks.
+#
+# Request paths only read the cached token (no I/O); a stale token schedules
+# one background refresh from the database. Writes made by this process bump
+# the local counter immediately so its own changes are never masked; once a
+# refresh sees a newer ingest count the bumps are folded into it, so every
+# process converges on the same token (and ETags) again.
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.repositories.watermark_repository import WatermarkRepository
+from app.utils.logger import log_exception
+
+# Report source first; writes to the metrics table also invalidate report ETags
+WATCHED_TABLES: tuple[str, ...] = ("sonus_aggregation_new", "metrics")
+
+
+class DataWatermark:
+    """Cached (max_time, ingest_count) per table, refreshed lazily in the background."""
+
+    def __init__(self, repository: WatermarkRepository | None = None, refresh_interval: float | None = None):
+        self._repo = repository or WatermarkRepository()
+        self.refresh_interval = (
+            settings.WATERMARK_REFRESH_SECONDS if refresh_interval is None else refresh_interval
+        )
+        self._marks: Dict[str, Tuple[Optional[str], int]] = {}
+        self._local_bumps: Dict[str, int] = {}
+        self._refreshed_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def token(self, tables: tuple[str, ...] = WATCHED_TABLES) -> Optional[str]:
+        """
+        Return the combined watermark token for tables without awaiting anything.
+        None until the first refresh has completed (callers skip ETags then).
+        """
+        if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            self._schedule_refresh()
+        if not self._marks:
+            return None
+        parts = []
+        for table in tables:
+            max_time, count = self._marks.get(table, (None, 0))
+            parts.append(f"{table}={max_time}:{count}:{self._local_bumps.get(table, 0)}")
+        return ";".join(parts)
+
+    def bump(self, table: str) -> None:
+        """Record a write made by this process (ingest path)."""
+        self._local_bumps[table] = self._local_bumps.get(table, 0) + 1
+
+    async def refresh(self) -> None:
+        """Reload all watermarks from the database."""
+        # Bumps made while the query runs may not be visible to it yet; keep those
+        bumps_before = dict(self._local_bumps)
+        rows = await self._repo.get_all()
+        marks = {
+            table: (max_time.isoformat() if max_time is not None else None, count)
+            for table, (max_time, count) in rows.items()
+        }
+        for table, (_, count) in marks.items():
+            previous = self._marks.get(table)
+            if previous is None or count > previous[1]:
+                left = self._local_bumps.get(table, 0) - bumps_before.get(table, 0)
+                if left > 0:
+                    self._local_bumps[table] = left
+                else:
+                    self._local_bumps.pop(table, None)
+        self._marks = marks
+        self._refreshed_at = time.monotonic()
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # Fresh context: not bound by the deadline, priority class or limiter
+        # samples of the request that happened to schedule it
+        self._refresh_task = loop.create_task(self._safe_refresh(), context=contextvars.Context())
+
+    async def _safe_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Keep serving the last known token; retry after the interval
+            self._refreshed_at = time.monotonic()
+            log_exception(e, "DataWatermark.refresh")
+
+
+# Shared per-process instance
+data_watermark = DataWatermark()
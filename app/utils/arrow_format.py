@@ -0,0 +1,105 @@
+# app/utils/arrow_format.py
+# Apache Arrow IPC stream encoding of metrics reports (optional, needs pyarrow).
+#
+# Layout: one IPC stream per section, concatenated back to back. Every stream
+# carries its own schema (schema metadata "section" names it) and a single
+# record batch. Arrow JS reads it with RecordBatchReader.readAll(); pyarrow
+# with repeated ipc.open_stream() (see read_report_ipc).
+
+import json
+from typing import Any, Dict, List
+
+from app.constants import DIMENSION_FIELDS, MAIN_HEADERS, PEER_HEADERS, HOURLY_HEADERS, FIVE_MIN_HEADERS
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.ipc as pa_ipc  # type: ignore
+except ImportError:
+    pa = None  # type: ignore
+    pa_ipc = None  # type: ignore
+
+HAVE_ARROW = pa is not None
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# (report key, section name, columns) in emission order
+ARROW_SECTIONS: tuple[tuple[str, str, list[str]], ...] = (
+    ("main_rows", "main", MAIN_HEADERS),
+    ("peer_rows", "peer", PEER_HEADERS),
+    ("hourly_rows", "hourly", HOURLY_HEADERS),
+    ("five_min_rows", "five_min", FIVE_MIN_HEADERS),
+)
+
+_COUNT_FIELDS = {"SCall", "YSCall", "TCall", "YTCall"}
+
+
+def _field_type(name: str):
+    if name in DIMENSION_FIELDS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if name in _COUNT_FIELDS:
+        return pa.int64()
+    return pa.float64()
+
+
+def _section_schema(section: str, columns: List[str]):
+    return pa.schema(
+        [pa.field(name, _field_type(name)) for name in columns],
+        metadata={"section": section},
+    )
+
+
+def _write_stream(sink, schema, rows: List[Dict[str, Any]]) -> None:
+    # from_pylist converts column-wise in C++; extra row keys are ignored
+    batch = pa.RecordBatch.from_pylist(rows, schema=schema)
+    with pa_ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch)
+
+
+def report_to_arrow_ipc(data: Dict[str, Any]) -> bytes:
+    """
+    Encode a report as concatenated Arrow IPC streams.
+
+    Sections: "totals" (one row per period: today, yesterday), then
+    main, peer, hourly and five_min with typed columns. Labels travel
+    as JSON in the totals schema metadata.
+    """
+    if not HAVE_ARROW:
+        raise RuntimeError("pyarrow is not installed")
+
+    sink = pa.BufferOutputStream()
+
+    # Totals: period column + metric columns inferred from values
+    totals_rows = [
+        {"period": "today", **(data.get("today_metrics") or {})},
+        {"period": "yesterday", **(data.get("yesterday_metrics") or {})},
+    ]
+    totals_table = pa.Table.from_pylist(totals_rows)
+    totals_schema = totals_table.schema.with_metadata({
+        "section": "totals",
+        "labels": json.dumps(data.get("labels") or {}),
+    })
+    _write_stream(sink, totals_schema, totals_rows)
+
+    for key, section, columns in ARROW_SECTIONS:
+        _write_stream(sink, _section_schema(section, columns), data.get(key) or [])
+
+    return sink.getvalue().to_pybytes()
+
+
+def read_report_ipc(payload: bytes) -> Dict[str, Any]:
+    """Decode report_to_arrow_ipc output into {section: pyarrow.Table}."""
+    if not HAVE_ARROW:
+        raise RuntimeError("pyarrow is not installed")
+    reader = pa.BufferReader(payload)
+    out: Dict[str, Any] = {}
+    while reader.tell() < len(payload):
+        stream = pa_ipc.open_stream(reader)
+        table = stream.read_all()
+        section = (stream.schema.metadata or {}).get(b"section", b"").decode()
+        out[section] = table
+    return out
+
+
+def wants_arrow(accept_header: str | None) -> bool:
+    """True when the Accept header asks for an Arrow IPC stream."""
+    return bool(accept_header) and ARROW_STREAM_MEDIA_TYPE in accept_header.lower()
@@ -0,0 +1,83 @@
+# app/utils/baselines.py
+# Comparison baselines of a report: the same time range shifted back by an offset.
+#
+# Day-over-day ("Y", -1d) is always compared; more offsets can be requested,
+# e.g. "7d,28d". Well-known offsets get the short column prefixes Y/W/M,
+# others "B<offset>" (e.g. B3d). Rows carry <prefix><metric> values and
+# <metric>_delta_<prefix> deltas; Y keeps the historical Y<metric>/<metric>_delta.
+
+import re
+from typing import Iterable, NamedTuple, Optional, Tuple, Union
+
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+# Offset (seconds) -> column prefix
+NAMED_PREFIXES = {DAY: "Y", WEEK: "W", 4 * WEEK: "M"}
+
+MAX_OFFSET_SECONDS = 366 * DAY
+# Each baseline adds a fetch of the whole range; keep reports bounded
+MAX_BASELINES = 4
+
+_UNITS = {"h": HOUR, "d": DAY, "w": WEEK}
+_TOKEN = re.compile(r"^-?(\d+)([hdw])$")
+
+
+class Baseline(NamedTuple):
+    """One comparison period: column prefix and offset back in time (seconds)."""
+
+    prefix: str
+    offset: int
+
+    @property
+    def delta_suffix(self) -> str:
+        return "" if self.prefix == "Y" else f"_{self.prefix}"
+
+    @property
+    def label(self) -> str:
+        """Canonical offset token, e.g. "7d"."""
+        return _offset_token(self.offset)
+
+
+DEFAULT_BASELINES: Tuple[Baseline, ...] = (Baseline("Y", DAY),)
+
+
+def _offset_token(seconds: int) -> str:
+    if seconds % DAY == 0:
+        return f"{seconds // DAY}d"
+    return f"{seconds // HOUR}h"
+
+
+def parse_baselines(spec: Optional[Union[str, Iterable[str]]]) -> Tuple[Baseline, ...]:
+    """
+    "7d,28d" (or ["-7d", "28d"]) -> (Y, W, M). Units: h, d, w; a leading "-" is
+    accepted. Day-over-day comes first and is always included; duplicates are dropped.
+    Raises ValueError on malformed, non-positive, too large or too many offsets.
+    """
+    if spec is None:
+        return DEFAULT_BASELINES
+    tokens = spec.split(",") if isinstance(spec, str) else list(spec)
+
+    offsets = [DAY]
+    for token in tokens:
+        token = token.strip().lower()
+        if not token:
+            continue
+        m = _TOKEN.match(token)
+        if m is None:
+            raise ValueError(f"Invalid baseline offset: {token!r} (expected e.g. 1d, 7d, 28d, 12h)")
+        seconds = int(m.group(1)) * _UNITS[m.group(2)]
+        if not 0 < seconds <= MAX_OFFSET_SECONDS:
+            raise ValueError(f"Baseline offset out of range: {token!r}")
+        if seconds not in offsets:
+            offsets.append(seconds)
+
+    if len(offsets) > MAX_BASELINES:
+        raise ValueError(f"At most {MAX_BASELINES} baselines are supported")
+    return tuple(Baseline(NAMED_PREFIXES.get(s) or f"B{_offset_token(s)}", s) for s in offsets)
+
+
+def format_baselines(baselines: Iterable[Baseline]) -> str:
+    """Canonical spec string, e.g. "1d,7d,28d"; parse_baselines round-trips it."""
+    return ",".join(b.label for b in baselines)
@@ -1,33 +1,82 @@
+import asyncio
 import json
 import hashlib
-from typing import Optional, Tuple, Any
+from typing import Awaitable, Callable, Optional, Tuple, Any, Dict, TypeVar
 
 from app.config import settings
+from app.middleware.circuit_breaker import CircuitBreakerError, DeadlineExceeded, get_circuit_breaker, time_left
+from app.utils import json_codec
+from app.utils.logger import log_exception
+from app.utils.redis_maintenance import unlink_matching
 
 try:
     import redis.asyncio as aioredis  # type: ignore
+    from redis.exceptions import RedisError  # type: ignore
 except ImportError:
     aioredis = None  # type: ignore
+    RedisError = OSError  # type: ignore
 
 DEFAULT_TTL_SECONDS = 60
 
-# Module-level connection pool (lazy init)
+T = TypeVar("T")
+
+# Module-level connection pools (lazy init); the bulk pool skips response decoding
+# and serves megabyte values and maintenance under a longer timeout
 _pool: Any = None
+_bulk_pool: Any = None
+
+# Per-call limit of cache calls (also the socket timeout); a request deadline can shorten it
+_TIMEOUT: Optional[float] = settings.REDIS_TIMEOUT_MS / 1000 or None
+# Same for bulk calls (report bodies, partials, response variants) and invalidation;
+# their duration grows with the value's size, so they are not counted as slow calls
+_BULK_TIMEOUT: Optional[float] = settings.REDIS_BULK_TIMEOUT_MS / 1000 or None
+
+# Opens after REDIS_BREAKER_FAILURES consecutive failed or slow calls; the cache
+# is then bypassed without touching Redis until a trial call succeeds
+redis_breaker = get_circuit_breaker(
+    "redis",
+    failure_threshold=settings.REDIS_BREAKER_FAILURES,
+    recovery_timeout=settings.REDIS_BREAKER_RECOVERY_SECONDS,
+    slow_call_threshold=settings.REDIS_BREAKER_SLOW_MS / 1000 or None,
+    exceptions=(RedisError, OSError, asyncio.TimeoutError),
+)
 
 
 async def _get_pool() -> Any:
     """Get or create async Redis connection pool."""
     global _pool
     if _pool is None:
-        _pool = aioredis.from_url(settings.REDIS_URL, decode_responses=True)  # type: ignore
+        _pool = aioredis.from_url(  # type: ignore
+            settings.REDIS_URL, decode_responses=True, socket_timeout=_TIMEOUT, socket_connect_timeout=_TIMEOUT,
+        )
     return _pool
 
 
+async def _get_bulk_pool() -> Any:
+    """Get or create async Redis connection pool (raw bytes) for bulk calls and maintenance."""
+    global _bulk_pool
+    if _bulk_pool is None:
+        _bulk_pool = aioredis.from_url(  # type: ignore
+            settings.REDIS_URL, decode_responses=False, socket_timeout=_BULK_TIMEOUT,
+            # Connecting is never bulk: an unreachable Redis still fails fast
+            socket_connect_timeout=_TIMEOUT,
+        )
+    return _bulk_pool
+
+
 class Cache:
+    """
+    Redis cache that degrades to a miss: calls go through the Redis circuit
+    breaker within the time left of the request (at most REDIS_TIMEOUT_MS, or
+    REDIS_BULK_TIMEOUT_MS for encoded reports and byte maps), and a failed, slow
+    or short-circuited call returns the default immediately.
+    """
+
     def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS):
         self.ttl = ttl_seconds
         self.hits = 0
         self.misses = 0
+        self.bypassed = 0
 
     @staticmethod
     def build_key(prefix: str, payload: dict) -> str:
@@ -35,35 +84,95 @@ class Cache:
         digest = hashlib.sha256(raw.encode()).hexdigest()
         return f"{prefix}:{digest}"
 
+    async def _guarded(self, call: Callable[[], Awaitable[T]], default: T, bulk: bool = False) -> T:
+        """
+        Run a Redis call through the breaker; `default` when Redis is unhealthy
+        or out of time. Bulk calls get the longer limit and only their errors
+        count toward the breaker, not their duration.
+        """
+        try:
+            limit = time_left(_BULK_TIMEOUT if bulk else _TIMEOUT)
+            async with redis_breaker.guard(timed=not bulk), asyncio.timeout(limit):
+                return await call()
+        except (CircuitBreakerError, DeadlineExceeded):
+            self.bypassed += 1
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self.bypassed += 1
+            log_exception(e, "Cache bypassed")
+        return default
+
     async def get_json(self, key: str) -> Optional[dict]:
         """Async get from Redis."""
         client = await _get_pool()
-        data = await client.get(key)
+        data = await self._guarded(lambda: client.get(key), None)
+        if not data:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json_codec.loads(data)
+
+    async def get_encoded(self, key: str) -> Optional[bytes]:
+        """Async get of a JSON value as stored (bytes), for callers that decode off the event loop (bulk)."""
+        client = await _get_bulk_pool()
+        data = await self._guarded(lambda: client.get(key), None, bulk=True)
         if not data:
             self.misses += 1
             return None
         self.hits += 1
-        return json.loads(data)
+        return data
 
     async def set_json(self, key: str, value: dict) -> None:
         """Async set to Redis with TTL."""
         client = await _get_pool()
-        await client.setex(key, self.ttl, json.dumps(value, default=str))
+        payload = json_codec.dumps(value)
+        await self._guarded(lambda: client.setex(key, self.ttl, payload), None)
+
+    async def set_encoded(self, key: str, payload: bytes) -> None:
+        """Async set of an already JSON-encoded value with TTL (read back with get_json/get_encoded; bulk)."""
+        client = await _get_bulk_pool()
+        await self._guarded(lambda: client.setex(key, self.ttl, payload), None, bulk=True)
+
+    async def get_bytes_map(self, key: str) -> Optional[Dict[str, bytes]]:
+        """Async get of a hash of raw byte values (bulk)."""
+        client = await _get_bulk_pool()
+        data = await self._guarded(lambda: client.hgetall(key), None, bulk=True)
+        if not data:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {k.decode(): v for k, v in data.items()}
+
+    async def set_bytes_map(self, key: str, mapping: Dict[str, bytes]) -> None:
+        """Async set of a hash of raw byte values with TTL (atomic; bulk)."""
+        client = await _get_bulk_pool()
+
+        async def store() -> None:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                pipe.hset(key, mapping=mapping)
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+
+        await self._guarded(store, None, bulk=True)
 
     async def invalidate_prefix(self, prefix: str) -> int:
-        """Async scan-based invalidation."""
-        client = await _get_pool()
-        cursor = 0
-        total = 0
-        pattern = f"{prefix}:*"
-        while True:
-            cursor, keys = await client.scan(cursor=cursor, match=pattern, count=500)
-            if keys:
-                total += len(keys)
-                await client.delete(*keys)
-            if cursor == 0:
-                break
-        return total
+        """
+        Async scan-based invalidation (pipelined, paced UNLINK batches); returns
+        keys removed. A long maintenance run, so neither timed nor counted by
+        the breaker, on the bulk pool (the short socket timeout would cut its
+        round trips); skipped (0) while the Redis circuit is open.
+        """
+        if redis_breaker.is_open:
+            self.bypassed += 1
+            return 0
+        client = await _get_bulk_pool()
+        try:
+            run = await unlink_matching(client, f"{prefix}:*")
+        except (RedisError, OSError) as e:
+            self.bypassed += 1
+            log_exception(e, "Cache invalidation skipped")
+            return 0
+        return run["deleted"]
 
     def stats(self) -> Tuple[int, int]:
         return self.hits, self.misses
@@ -0,0 +1,166 @@
+# app/utils/enrich.py
+# Attach yesterday values (Y*) and percentage deltas (*_delta) to today's rows,
+# plus further baselines (e.g. W*, *_delta_W; see app/utils/baselines.py).
+#
+# Columnar path (numpy): today's rows are joined to yesterday's once, on integer
+# row codes, then every Y*/*_delta column is computed as an array operation and
+# rows are assembled with one dict(zip()) each. Deltas follow
+# formulas.calc_delta_percent exactly: the ratio is computed in float64 (same
+# IEEE operations as Python floats) and rounded like Python's round(x, 1)
+# (see _round1). Without numpy the scalar loop is used.
+
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None  # type: ignore
+
+HAVE_NUMPY = np is not None
+
+METRICS_TO_COMPARE: Tuple[str, ...] = ("Min", "ACD", "ASR", "PDD", "ATime", "SCall", "TCall")
+
+# Below this many rows the array setup costs more than it saves
+COLUMNAR_MIN_ROWS = 32
+
+
+def enrich_rows(
+    today_rows: List[Dict[str, Any]],
+    yesterday_rows: List[Dict[str, Any]],
+    key_fields: Sequence[str],
+    extra_fields: Tuple[str, ...] = (),
+    baselines: Sequence[Tuple[str, List[Dict[str, Any]]]] = (),
+) -> List[Dict[str, Any]]:
+    """
+    Rows with key/extra fields, then per compared metric: metric, Y<metric>,
+    <metric>_delta and, for every further (prefix, rows) baseline,
+    <prefix><metric> and <metric>_delta_<prefix>.
+    """
+    periods = [("Y", "", yesterday_rows)] + [(p, f"_{p}", rows) for p, rows in baselines]
+    if HAVE_NUMPY and len(today_rows) >= COLUMNAR_MIN_ROWS:
+        return _enrich_columnar(today_rows, periods, key_fields, extra_fields)
+    return _enrich_scalar(today_rows, periods, key_fields, extra_fields)
+
+
+def _delta(t_val: Any, y_val: Any) -> float:
+    if y_val == 0:
+        return 100.0 if t_val > 0 else 0.0
+    return round(((t_val - y_val) / y_val) * 100, 1)
+
+
+# (column prefix, delta suffix, baseline rows)
+Periods = List[Tuple[str, str, List[Dict[str, Any]]]]
+
+
+def _enrich_scalar(
+    today_rows: List[Dict[str, Any]],
+    periods: Periods,
+    key_fields: Sequence[str],
+    extra_fields: Tuple[str, ...] = (),
+) -> List[Dict[str, Any]]:
+    maps = [
+        (prefix, suffix, {tuple(r.get(k) for k in key_fields): r for r in rows})
+        for prefix, suffix, rows in periods
+    ]
+
+    enriched_rows: List[Dict[str, Any]] = []
+    for today_row in today_rows:
+        key = tuple(today_row.get(k) for k in key_fields)
+        matches = [(prefix, suffix, m.get(key, {})) for prefix, suffix, m in maps]
+        combined = {field: today_row.get(field) for field in key_fields}
+        # Preserve extra display fields (e.g. full "time" for hourly)
+        for f in extra_fields:
+            combined[f] = today_row.get(f)
+
+        for metric in METRICS_TO_COMPARE:
+            t_val = today_row.get(metric, 0) or 0
+            combined[metric] = t_val
+            for prefix, suffix, base_row in matches:
+                y_val = base_row.get(metric, 0) or 0
+                combined[f"{prefix}{metric}"] = y_val
+                combined[f"{metric}_delta{suffix}"] = _delta(t_val, y_val)
+
+        enriched_rows.append(combined)
+
+    return enriched_rows
+
+
+def _enrich_columnar(
+    today_rows: List[Dict[str, Any]],
+    periods: Periods,
+    key_fields: Sequence[str],
+    extra_fields: Tuple[str, ...] = (),
+) -> List[Dict[str, Any]]:
+    try:
+        key_of = itemgetter(*key_fields)
+        metrics_of = itemgetter(*METRICS_TO_COMPARE)
+        # Finalized rows carry every field: one C-level lookup per row and side
+        today_keys = list(map(key_of, today_rows))
+        today_metrics = _metric_columns(map(metrics_of, today_rows))
+        sides = [
+            (prefix, suffix, list(map(key_of, rows)), _metric_columns(map(metrics_of, rows)))
+            for prefix, suffix, rows in periods
+        ]
+    except KeyError:
+        return _enrich_scalar(today_rows, periods, key_fields, extra_fields)
+
+    # Join: baseline row code per today row; the missing code points at an all-zero sentinel
+    joins = []
+    for _, _, keys, _ in sides:
+        codes = {k: i for i, k in enumerate(keys)}
+        missing = len(keys)
+        joins.append([codes.get(k, missing) for k in today_keys])
+
+    names: List[str] = list(dict.fromkeys((*key_fields, *extra_fields)))
+    if len(key_fields) == 1:
+        columns: List[list] = [today_keys]
+    else:
+        columns = [list(col) for col in zip(*today_keys)] if today_keys else [[] for _ in key_fields]
+    columns += [[r.get(f) for r in today_rows] for f in names[len(key_fields):]]
+
+    for m, metric in enumerate(METRICS_TO_COMPARE):
+        t_col = [v or 0 for v in today_metrics[m]]
+        t = np.asarray(t_col, dtype=np.float64)
+        names.append(metric)
+        columns.append(t_col)
+
+        for (prefix, suffix, _, base_metrics), join in zip(sides, joins):
+            y_all = [v or 0 for v in base_metrics[m]]
+            y_all.append(0)
+            y_col = [y_all[i] for i in join]
+
+            y = np.asarray(y_col, dtype=np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = (t - y) / y * 100
+            no_base = y == 0
+            ratio[no_base] = np.where(t[no_base] > 0, 100.0, 0.0)
+
+            names += (f"{prefix}{metric}", f"{metric}_delta{suffix}")
+            columns += (y_col, _round1(ratio))
+
+    return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+def _metric_columns(rows_metrics: Iterable[tuple]) -> List[tuple]:
+    """Per-row metric tuples -> one column per compared metric (empty columns for no rows)."""
+    return list(zip(*rows_metrics)) or [()] * len(METRICS_TO_COMPARE)
+
+
+def _round1(values: "np.ndarray") -> List[float]:
+    """
+    round(x, 1) for every element, identical to Python's round.
+
+    rint(x * 10) / 10 matches except where x * 10 lies within float error of a
+    .5 tie (the product is rounded, and numpy does not round the exact value);
+    those few elements are redone with round().
+    """
+    scaled = values * 10
+    out = (np.rint(scaled) / 10).tolist()
+    off_tie = np.abs(scaled - np.floor(scaled) - 0.5)
+    near = np.flatnonzero(off_tie <= 1e-9 * np.maximum(1.0, np.abs(scaled)))
+    if near.size:
+        exact = values.tolist()
+        for i in near.tolist():
+            out[i] = round(exact[i], 1)
+    return out
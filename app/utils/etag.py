@@ -0,0 +1,46 @@
+# app/utils/etag.py
+# Strong ETags for report responses: hash of (normalized params, data watermark, code version)
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from app.config import PROJECT_ROOT, settings
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """CODE_VERSION from settings, or a fingerprint of the app sources (path, size, mtime)."""
+    if settings.CODE_VERSION:
+        return settings.CODE_VERSION
+    digest = hashlib.sha1()
+    app_dir = os.path.join(PROJECT_ROOT, "app")
+    for root, _dirs, files in sorted(os.walk(app_dir)):
+        for name in sorted(files):
+            if name.endswith(".py"):
+                st = os.stat(os.path.join(root, name))
+                digest.update(f"{root}/{name}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+
+def build_etag(params: Dict[str, Any], watermark: Optional[str]) -> Optional[str]:
+    """Return a quoted strong ETag, or None when no watermark is known yet."""
+    if watermark is None:
+        return None
+    raw = json.dumps({"p": params, "w": watermark, "v": code_version()}, sort_keys=True, default=str)
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """RFC 7232 If-None-Match comparison (weak comparison, '*' matches)."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        if candidate.strip().removeprefix("W/") == target:
+            return True
+    return False
@@ -0,0 +1,109 @@
+# app/utils/executor.py
+# Bounded executor for the CPU-bound report stages (aggregation, enrichment,
+# labels, serialization), so health probes, suggest requests and static files
+# are not stalled behind one big report on the event loop.
+#
+# Modes:
+#   thread  - stages run on a thread pool. NumPy enrichment and zlib/brotli
+#             release the GIL; pure-Python stages hand the GIL back every
+#             switch interval, but the loop competes with every busy worker
+#             for it, so a large report still adds tens of ms of loop lag.
+#   process - stages run on a process pool (inputs and results are pickled,
+#             in this process and holding the GIL, so a multi-MB result still
+#             stalls the loop while it is unpickled);
+#             stages marked threaded (GIL-releasing, or inputs that cost more
+#             to pickle than to process, like raw rows) stay on the threads.
+#   inline  - stages run on the event loop (previous behaviour, for debugging).
+# Admission is bounded: at most workers + max_queue stages may be running or
+# waiting; further submissions raise ExecutorBusy (served as 503 + Retry-After).
+
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+MODES = ("thread", "process", "inline")
+
+
+class ExecutorBusy(RuntimeError):
+    """The executor queue is full; the request should be retried later."""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__("Server is busy computing reports, retry later")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """Runs blocking callables off the event loop with a bounded queue."""
+
+    def __init__(self, mode: str = "thread", workers: int = 4, max_queue: int = 16, retry_after: int = 1):
+        if mode not in MODES:
+            raise ValueError(f"Unknown executor mode: {mode!r} (expected one of {', '.join(MODES)})")
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._rejected = 0
+
+    @classmethod
+    def from_settings(cls) -> "BoundedExecutor":
+        return cls(settings.REPORT_EXECUTOR, settings.REPORT_EXECUTOR_WORKERS, settings.REPORT_EXECUTOR_QUEUE)
+
+    def _pool(self, threaded: bool) -> Executor:
+        # Pools are created on first use
+        if self.mode == "process" and not threaded:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._processes
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report-cpu")
+        return self._threads
+
+    async def run(self, fn: Callable[..., T], *args: Any, threaded: bool = False, **kwargs: Any) -> T:
+        """
+        Await fn(*args, **kwargs) on the pool. threaded stages always use the
+        thread pool; otherwise, in process mode, fn and its arguments must be picklable.
+        Raises ExecutorBusy when workers + max_queue stages are already admitted.
+        """
+        if self.mode == "inline":
+            return fn(*args, **kwargs)
+        if self._pending >= self.workers + self.max_queue:
+            self._rejected += 1
+            raise ExecutorBusy(self.retry_after)
+
+        # Only touched on the event loop thread: no lock needed
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool(threaded), functools.partial(fn, *args, **kwargs))
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "rejected": self._rejected,
+        }
+
+    def shutdown(self) -> None:
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+
+
+# Process-wide executor for report computation (services and handlers are per request)
+cpu_executor = BoundedExecutor.from_settings()
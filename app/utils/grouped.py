@@ -2,10 +2,10 @@
 # Single-pass aggregation for O(n) complexity
 
 from collections import defaultdict
-from datetime import datetime, timezone
 from typing import Any, Dict, List
 from app.utils.logger import log_info
 from app.utils.formulas import calc_minutes, calc_acd, calc_asr, calc_pdd_weighted, calc_atime_weighted
+from app.utils.time_buckets import FIVE_MIN_SECONDS, HOUR_SECONDS, BucketLabels, EpochCache
 
 
 def _zero_agg() -> Dict[str, int]:
@@ -13,10 +13,26 @@ def _zero_agg() -> Dict[str, int]:
     return {"attempt": 0, "uniq": 0, "success": 0, "seconds": 0, "pdd_w": 0, "answer_w": 0}
 
 
-def calculate_grouped_metrics(rows, reverse=False):
+# Additive fields of an aggregation dict; safe to sum across groups (e.g. top-N "Other" folding)
+SUM_FIELDS: tuple[str, ...] = ("attempt", "uniq", "success", "seconds", "pdd_w", "answer_w")
+
+
+def _finalize(a: Dict[str, Any]) -> Dict[str, Any]:
+    """Derived metrics from raw sums."""
+    return {
+        "Min": calc_minutes(a["seconds"]),
+        "TCall": a["attempt"], "SCall": a["success"],
+        "ASR": calc_asr(a["success"], a["attempt"]),
+        "ACD": calc_acd(a["seconds"], a["success"]),
+        "PDD": calc_pdd_weighted(a["pdd_w"], a["uniq"]),
+        "ATime": calc_atime_weighted(a["answer_w"], a["success"]),
+    }
+
+
+def aggregate_grouped(rows, reverse=False):
     """
-    Single-pass aggregation by (main, peer, destination).
-    O(n) time, O(groups) memory.
+    Single-pass aggregation by (main, destination) and (main, peer, destination).
+    Returns raw sums (main_agg, peer_agg); O(n) time, O(groups) memory.
     """
     main_key = "supplier" if reverse else "customer"
     peer_key = "customer" if reverse else "supplier"
@@ -57,77 +73,48 @@ def calculate_grouped_metrics(rows, reverse=False):
         ma["pdd_w"] += pdd * uniq
         ma["answer_w"] += answer * success
 
-    # Build result lists
-    peer_metrics = [
-        {
-            "main": k[0], "peer": k[1], "destination": k[2],
-            "Min": calc_minutes(a["seconds"]),
-            "TCall": a["attempt"], "SCall": a["success"],
-            "ASR": calc_asr(a["success"], a["attempt"]),
-            "ACD": calc_acd(a["seconds"], a["success"]),
-            "PDD": calc_pdd_weighted(a["pdd_w"], a["uniq"]),
-            "ATime": calc_atime_weighted(a["answer_w"], a["success"]),
-        }
-        for k, a in peer_agg.items()
-    ]
+    return main_agg, peer_agg
 
-    main_metrics = [
-        {
-            "main": k[0], "destination": k[1],
-            "Min": calc_minutes(a["seconds"]),
-            "TCall": a["attempt"], "SCall": a["success"],
-            "ASR": calc_asr(a["success"], a["attempt"]),
-            "ACD": calc_acd(a["seconds"], a["success"]),
-            "PDD": calc_pdd_weighted(a["pdd_w"], a["uniq"]),
-            "ATime": calc_atime_weighted(a["answer_w"], a["success"]),
-        }
-        for k, a in main_agg.items()
-    ]
 
-    log_info(f"Grouped metrics: {len(main_metrics)} main, {len(peer_metrics)} peer")
-    return {"main_rows": main_metrics, "peer_rows": peer_metrics}
+def finalize_main(main_agg) -> List[Dict[str, Any]]:
+    """Main rows from (main, destination) sums."""
+    return [{"main": k[0], "destination": k[1], **_finalize(a)} for k, a in main_agg.items()]
 
-def _parse_datetime(raw_time) -> datetime | None:
-    """Parse datetime from various formats (reusable helper)."""
-    if isinstance(raw_time, datetime):
-        return raw_time
-    if isinstance(raw_time, str):
-        s = raw_time.replace("Z", "").strip()
-        try:
-            return datetime.fromisoformat(s)
-        except Exception:
-            try:
-                return datetime.fromisoformat(s.replace(" ", "T"))
-            except Exception:
-                return None
-    try:
-        s = str(raw_time).replace("Z", "").strip()
-        return datetime.fromisoformat(s)
-    except Exception:
-        return None
 
+def finalize_peer(peer_agg) -> List[Dict[str, Any]]:
+    """Peer rows from (main, peer, destination) sums."""
+    return [{"main": k[0], "peer": k[1], "destination": k[2], **_finalize(a)} for k, a in peer_agg.items()]
 
-def calculate_hourly_metrics(rows, reverse=False):
+
+def calculate_grouped_metrics(rows, reverse=False):
     """
-    Single-pass hourly aggregation by (main, peer, destination, hour).
+    Single-pass aggregation by (main, peer, destination).
+    O(n) time, O(groups) memory.
+    """
+    main_agg, peer_agg = aggregate_grouped(rows, reverse=reverse)
+    main_metrics = finalize_main(main_agg)
+    peer_metrics = finalize_peer(peer_agg)
+
+    log_info(f"Grouped metrics: {len(main_metrics)} main, {len(peer_metrics)} peer")
+    return {"main_rows": main_metrics, "peer_rows": peer_metrics}
+
+def aggregate_hourly(rows, reverse=False):
+    """
+    Single-pass hourly aggregation by (main, peer, destination, hour); raw sums.
+    Rows are bucketed on integer epoch hours; labels are formatted once per hour.
     """
     main_key = "supplier" if reverse else "customer"
     peer_key = "customer" if reverse else "supplier"
 
+    epochs = EpochCache()
     agg: Dict[tuple, Dict[str, Any]] = defaultdict(_zero_agg)
 
     for row in rows:
-        main = row.get(main_key)
-        peer = row.get(peer_key)
-        dest = row.get("destination")
-        dt = _parse_datetime(row.get("time"))
-        if dt is None:
+        epoch = epochs[row.get("time")]
+        if epoch is None:
             continue
-        if dt.tzinfo is not None:
-            dt = dt.astimezone(timezone.utc)
 
-        hour_key = dt.strftime("%Y-%m-%d %H:00")
-        k = (main, peer, dest, hour_key)
+        k = (row.get(main_key), row.get(peer_key), row.get("destination"), epoch - epoch % HOUR_SECONDS)
         a = agg[k]
 
         a["attempt"] += row.get("start_attempt", 0) or 0
@@ -137,50 +124,47 @@ def calculate_hourly_metrics(rows, reverse=False):
         a["pdd_w"] += row.get("pdd", 0) or 0
         a["answer_w"] += row.get("answer_time", 0) or 0
 
+    labels = BucketLabels(HOUR_SECONDS)
+    return {(m, p, d, labels[b][0]): a for (m, p, d, b), a in agg.items()}
+
+
+def finalize_hourly(agg) -> List[Dict[str, Any]]:
+    """Hourly rows from (main, peer, destination, hour) sums."""
     return [
         {
             "time": k[3],
             "hour": k[3].split(" ")[1] if " " in k[3] else k[3],
             "main": k[0], "peer": k[1], "destination": k[2],
-            "Min": calc_minutes(a["seconds"]),
-            "TCall": a["attempt"], "SCall": a["success"],
-            "ASR": calc_asr(a["success"], a["attempt"]),
-            "ACD": calc_acd(a["seconds"], a["success"]),
-            "PDD": calc_pdd_weighted(a["pdd_w"], a["uniq"]),
-            "ATime": calc_atime_weighted(a["answer_w"], a["success"]),
+            **_finalize(a),
         }
         for k, a in agg.items()
     ]
 
-def calculate_5min_metrics(rows, reverse: bool = False):
+
+def calculate_hourly_metrics(rows, reverse=False):
     """
-    Single-pass 5-minute aggregation by (main, peer, destination, 5m window).
+    Single-pass hourly aggregation by (main, peer, destination, hour).
+    """
+    return finalize_hourly(aggregate_hourly(rows, reverse=reverse))
+
+
+def aggregate_5min(rows, reverse: bool = False):
+    """
+    Single-pass 5-minute aggregation by (main, peer, destination, 5m window); raw sums + slot.
+    Rows are bucketed on integer epoch 5m windows; labels are formatted once per window.
     """
     main_key = "supplier" if reverse else "customer"
     peer_key = "customer" if reverse else "supplier"
 
-    # key -> {agg dict + slot}
-    agg: Dict[tuple, Dict[str, Any]] = {}
+    epochs = EpochCache()
+    agg: Dict[tuple, Dict[str, Any]] = defaultdict(_zero_agg)
 
     for row in rows:
-        main = row.get(main_key)
-        peer = row.get(peer_key)
-        dest = row.get("destination")
-        dt = _parse_datetime(row.get("time"))
-        if dt is None:
+        epoch = epochs[row.get("time")]
+        if epoch is None:
             continue
-        if dt.tzinfo is not None:
-            dt = dt.astimezone(timezone.utc)
-
-        # Floor to 5-minute window
-        minute_bucket = (dt.minute // 5) * 5
-        dt5 = dt.replace(minute=minute_bucket, second=0, microsecond=0)
-        key5 = dt5.strftime("%Y-%m-%d %H:%M")
-        slot = dt5.strftime("%H:%M")
-
-        k = (main, peer, dest, key5)
-        if k not in agg:
-            agg[k] = {"attempt": 0, "uniq": 0, "success": 0, "seconds": 0, "pdd_w": 0, "answer_w": 0, "slot": slot}
+
+        k = (row.get(main_key), row.get(peer_key), row.get("destination"), epoch - epoch % FIVE_MIN_SECONDS)
         a = agg[k]
 
         a["attempt"] += row.get("start_attempt", 0) or 0
@@ -190,16 +174,30 @@ def calculate_5min_metrics(rows, reverse: bool = False):
         a["pdd_w"] += row.get("pdd", 0) or 0
         a["answer_w"] += row.get("answer_time", 0) or 0
 
+    # key -> {agg dict + slot}
+    labels = BucketLabels(FIVE_MIN_SECONDS)
+    out: Dict[tuple, Dict[str, Any]] = {}
+    for (m, p, d, b), a in agg.items():
+        time_label, slot = labels[b]
+        a["slot"] = slot
+        out[(m, p, d, time_label)] = a
+    return out
+
+
+def finalize_5min(agg) -> List[Dict[str, Any]]:
+    """Five-minute rows from (main, peer, destination, 5m window) sums."""
     return [
         {
             "time": k[3], "slot": a["slot"],
             "main": k[0], "peer": k[1], "destination": k[2],
-            "Min": calc_minutes(a["seconds"]),
-            "TCall": a["attempt"], "SCall": a["success"],
-            "ASR": calc_asr(a["success"], a["attempt"]),
-            "ACD": calc_acd(a["seconds"], a["success"]),
-            "PDD": calc_pdd_weighted(a["pdd_w"], a["uniq"]),
-            "ATime": calc_atime_weighted(a["answer_w"], a["success"]),
+            **_finalize(a),
         }
         for k, a in agg.items()
-    ]
\ No newline at end of file
+    ]
+
+
+def calculate_5min_metrics(rows, reverse: bool = False):
+    """
+    Single-pass 5-minute aggregation by (main, peer, destination, 5m window).
+    """
+    return finalize_5min(aggregate_5min(rows, reverse=reverse))
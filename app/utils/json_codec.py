@@ -0,0 +1,85 @@
+# app/utils/json_codec.py
+# Pluggable JSON encoder for API responses and cache payloads.
+# Uses orjson when installed, stdlib json otherwise; both paths encode
+# datetimes (ISO 8601), Decimals (float) and NumPy scalars/arrays the same way.
+# They differ for NaN/Infinity (orjson: null, stdlib: NaN/Infinity tokens);
+# see "JSON encoding" in docs/integration_contract.md for the wire format.
+
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # type: ignore
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None  # type: ignore
+
+HAVE_ORJSON = orjson is not None
+
+# List items per encoder call in dumps_chunked (about a millisecond of report rows)
+CHUNK_ITEMS = 1000
+
+if HAVE_ORJSON:
+    # Non-str keys keep parity with json.dumps (int keys become strings)
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS  # type: ignore[union-attr]
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for types neither encoder handles natively."""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if np is not None:
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj to compact UTF-8 JSON bytes."""
+    if HAVE_ORJSON:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)  # type: ignore[union-attr]
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def dumps_chunked(obj: Any, chunk: int = CHUNK_ITEMS) -> bytes:
+    """
+    Same bytes as dumps(obj), encoding long lists `chunk` items per call.
+    orjson holds the GIL for a whole call: run from a worker thread, short calls
+    let the event loop thread in between instead of stalling it for a whole report.
+    """
+    if isinstance(obj, dict) and all(isinstance(k, str) for k in obj):
+        return b"{" + b",".join(dumps(k) + b":" + dumps_chunked(v, chunk) for k, v in obj.items()) + b"}"
+    if isinstance(obj, list) and len(obj) > chunk:
+        return b"[" + b",".join(dumps(obj[i:i + chunk])[1:-1] for i in range(0, len(obj), chunk)) + b"]"
+    return dumps(obj)
+
+
+def dumps_str(obj: Any) -> str:
+    """Encode obj to a JSON string."""
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: str | bytes) -> Any:
+    """Decode JSON from str or bytes."""
+    if HAVE_ORJSON:
+        return orjson.loads(data)  # type: ignore[union-attr]
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """FastAPI/Starlette JSON response rendered through the fast encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
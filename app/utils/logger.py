@@ -2,12 +2,13 @@
 
 import logging
 import traceback
-import json
 import threading
 import time
 import os
 # Import our centralized config
 from app import config
+from app.utils import json_codec
+from app.utils.report_stream import NDJSON_MEDIA_TYPE, iter_report_ndjson
 
 # Ensure the log directory exists, using the path from config
 os.makedirs(config.LOGS_PATH, exist_ok=True)
@@ -52,13 +53,45 @@ def json_response(handler, data: dict, status: int = 200):
     log_info(f"{handler.request.method} {handler.request.path} → {status}")
     handler.set_status(status)
     handler.set_header("Content-Type", "application/json")
-    handler.write(json.dumps(data, default=str)) # Use default=str to handle non-serializable objects like datetime
+    handler.write(json_codec.dumps(data)) # codec handles datetime/Decimal/NumPy natively
+
+async def json_stream_response(handler, data: dict, status: int = 200):
+    """Write a report as NDJSON, flushing each chunk so the client can render early."""
+    log_info(f"{handler.request.method} {handler.request.path} → {status} (stream)")
+    handler.set_status(status)
+    handler.set_header("Content-Type", NDJSON_MEDIA_TYPE)
+    for chunk in iter_report_ndjson(data):
+        handler.write(chunk)
+        await handler.flush()
+
+def bytes_response(handler, body: bytes, content_type: str, status: int = 200):
+    """Write an already-encoded body (e.g. Arrow IPC) with the given content type."""
+    log_info(f"{handler.request.method} {handler.request.path} → {status} ({content_type})")
+    handler.set_status(status)
+    handler.set_header("Content-Type", content_type)
+    handler.write(body)
+
+def encoded_response(handler, encoded, status: int = 200):
+    """Write a cached EncodedBody as-is, choosing the variant from Accept-Encoding."""
+    coding, body = encoded.select(handler.request.headers.get("Accept-Encoding"))
+    log_info(f"{handler.request.method} {handler.request.path} → {status} (cached, {coding or 'identity'})")
+    handler.set_status(status)
+    handler.set_header("Content-Type", encoded.content_type)
+    for name, value in encoded.headers.items():
+        handler.set_header(name, value)
+    if coding:
+        # Tornado's own gzip transform skips responses that already carry Content-Encoding
+        handler.set_header("Content-Encoding", coding)
+    if not handler.application.settings.get("compress_response"):
+        # With compress_response on, the gzip transform adds Vary itself
+        handler.set_header("Vary", "Accept-Encoding")
+    handler.write(body)
 
 def json_error(handler, error_message: str, status: int = 500):
     log_info(f"{handler.request.method} {handler.request.path} → {status} | {error_message}")
     handler.set_status(status)
     handler.set_header("Content-Type", "application/json")
-    handler.write(json.dumps({"error": error_message}))
+    handler.write(json_codec.dumps({"error": error_message}))
 
 def monitor_loggers():
     def _monitor():
@@ -14,20 +14,28 @@ def calculate_metrics(rows):
 
     if not rows:
         log_info("No data for metric calculation")
-        return {
-            "Min": 0.0,
-            "ACD": 0.0,
-            "ASR": 0.0,
-            "Scall": 0.0,
-            "AvPDD": 0.0,
-            "ATime": 0.0,
-            "SCal": 0,
-            "TCall": 0,
-            "UCall": 0
-        }
+        return metrics_from_totals(sum_totals(()))
 
     log_info(f"Received {len(rows)} rows for processing")
 
+    totals = sum_totals(rows)
+    log_info(f"Totals: seconds={totals['seconds']}, pdd={totals['pdd']}, answer_time={totals['answer_time']}")
+    log_info(
+        f"Counts: pdd={totals['pdd_count']}, atime={totals['atime_count']}, "
+        f"scal={totals['scal']}, tcall={totals['tcall']}, ucall={totals['ucall']}"
+    )
+
+    result = metrics_from_totals(totals)
+    log_info(f"Metrics calculated: {result}")
+    return result
+
+
+def sum_totals(rows):
+    """
+    Raw counters behind the total metrics. Counters of disjoint row sets
+    add up (merge_totals), so totals can be computed per shard and merged.
+    """
+    count = 0
     total_seconds = 0
     total_pdd = 0
     total_answer_time = 0
@@ -38,6 +46,7 @@ def calculate_metrics(rows):
     ucall = 0
 
     for row in rows:
+        count += 1
         seconds = row.get("seconds", 0) or 0
         total_seconds += seconds
 
@@ -55,23 +64,55 @@ def calculate_metrics(rows):
         tcall += row.get("start_attempt", 0) or 0
         ucall += row.get("start_uniq_attempt", 0) or 0
 
-    log_info(f"Totals: seconds={total_seconds}, pdd={total_pdd}, answer_time={total_answer_time}")
-    log_info(f"Counts: pdd={pdd_count}, atime={atime_count}, scal={scal}, tcall={tcall}, ucall={ucall}")
+    return {
+        "rows": count,
+        "seconds": total_seconds,
+        "pdd": total_pdd,
+        "answer_time": total_answer_time,
+        "pdd_count": pdd_count,
+        "atime_count": atime_count,
+        "scal": scal,
+        "tcall": tcall,
+        "ucall": ucall,
+    }
+
+
+def merge_totals(target, other):
+    """Add the counters of `other` into `target` (in place) and return it."""
+    for key, value in other.items():
+        target[key] = target.get(key, 0) + value
+    return target
+
+
+def metrics_from_totals(totals):
+    """Total metrics from sum_totals counters."""
+    if not totals["rows"]:
+        return {
+            "Min": 0.0,
+            "ACD": 0.0,
+            "ASR": 0.0,
+            "Scall": 0.0,
+            "AvPDD": 0.0,
+            "ATime": 0.0,
+            "SCal": 0,
+            "TCall": 0,
+            "UCall": 0
+        }
+
+    scal = totals["scal"]
+    tcall = totals["tcall"]
 
     # Use centralized formulas
     asr = calc_asr(scal, tcall)
 
-    result = {
-        "Min": calc_minutes(total_seconds),
-        "ACD": calc_acd(total_seconds, scal),
+    return {
+        "Min": calc_minutes(totals["seconds"]),
+        "ACD": calc_acd(totals["seconds"], scal),
         "ASR": asr,
         "Scall": asr,  # legacy alias
-        "AvPDD": calc_pdd(total_pdd, pdd_count),
-        "ATime": calc_atime(total_answer_time, atime_count),
+        "AvPDD": calc_pdd(totals["pdd"], totals["pdd_count"]),
+        "ATime": calc_atime(totals["answer_time"], totals["atime_count"]),
         "SCal": scal,
         "TCall": tcall,
-        "UCall": ucall
+        "UCall": totals["ucall"]
     }
-
-    log_info(f"Metrics calculated: {result}")
-    return result
@@ -0,0 +1,219 @@
+# app/utils/partials.py
+# Per-bucket partial sums: one single pass over raw rows, keyed by
+# (main, peer, destination, 5-minute bucket epoch). Main/peer groups, hourly
+# and 5m series (and any time window of them) are re-aggregated from the
+# partials without touching raw rows again; reports cache them for drill-down.
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils import json_codec
+from app.utils.cache import Cache, DEFAULT_TTL_SECONDS
+from app.utils.executor import cpu_executor
+from app.utils.logger import log_exception
+from app.utils.time_buckets import FIVE_MIN_SECONDS, HOUR_SECONDS, BucketLabels, EpochCache
+
+BUCKET_SECONDS = FIVE_MIN_SECONDS
+
+# Sum layout of a partial. pdd_w/answer_w are weighted (grouped rows);
+# pdd_s/answer_s are plain sums, as used by the hourly/5m series.
+PARTIAL_FIELDS: tuple[str, ...] = ("attempt", "uniq", "success", "seconds", "pdd_w", "answer_w", "pdd_s", "answer_s")
+
+# (main, peer, destination, bucket epoch or None when the row has no usable time)
+PartialKey = Tuple[Any, Any, Any, Optional[int]]
+Partials = Dict[PartialKey, List[Any]]
+
+
+def build_partials(rows: Iterable[Dict[str, Any]], reverse: bool = False, shift: int = 0) -> Partials:
+    """
+    Single pass over raw rows into per-bucket partial sums.
+    shift (seconds) moves buckets forward: baseline rows fetched `shift` earlier
+    land on the report's own buckets, so series compare slot by slot.
+    """
+    main_key = "supplier" if reverse else "customer"
+    peer_key = "customer" if reverse else "supplier"
+
+    epochs = EpochCache()
+    partials: Partials = {}
+    for row in rows:
+        epoch = epochs[row.get("time")]
+        bucket = None if epoch is None else epoch - epoch % BUCKET_SECONDS + shift
+
+        k = (row.get(main_key), row.get(peer_key), row.get("destination"), bucket)
+        p = partials.get(k)
+        if p is None:
+            p = partials[k] = [0, 0, 0, 0, 0, 0, 0, 0]
+
+        attempt = row.get("start_attempt", 0) or 0
+        uniq = row.get("start_uniq_attempt", 0) or 0
+        success = row.get("start_nuber", 0) or 0
+        pdd = row.get("pdd", 0) or 0
+        answer = row.get("answer_time", 0) or 0
+        p[0] += attempt
+        p[1] += uniq
+        p[2] += success
+        p[3] += row.get("seconds", 0) or 0
+        p[4] += pdd * uniq
+        p[5] += answer * success
+        p[6] += pdd
+        p[7] += answer
+    return partials
+
+
+def merge_partials(target: Partials, other: Partials) -> Partials:
+    """Add `other` into `target` (in place); partials of disjoint row sets merge exactly."""
+    for k, p in other.items():
+        t = target.get(k)
+        if t is None:
+            target[k] = list(p)
+        else:
+            for i, v in enumerate(p):
+                t[i] += v
+    return target
+
+
+def _in_window(bucket: Optional[int], t0: Optional[int], t1: Optional[int]) -> bool:
+    if t0 is None and t1 is None:
+        return True
+    if bucket is None:
+        return False
+    return (t0 is None or bucket >= t0) and (t1 is None or bucket < t1)
+
+
+def _sums(p: List[Any], weighted: bool) -> Dict[str, Any]:
+    return {
+        "attempt": p[0], "uniq": p[1], "success": p[2], "seconds": p[3],
+        "pdd_w": p[4] if weighted else p[6],
+        "answer_w": p[5] if weighted else p[7],
+    }
+
+
+def _add(target: Dict[str, Any], p: List[Any], weighted: bool) -> None:
+    target["attempt"] += p[0]
+    target["uniq"] += p[1]
+    target["success"] += p[2]
+    target["seconds"] += p[3]
+    target["pdd_w"] += p[4] if weighted else p[6]
+    target["answer_w"] += p[5] if weighted else p[7]
+
+
+def partials_to_grouped(
+    partials: Partials,
+    t0: Optional[int] = None,
+    t1: Optional[int] = None,
+) -> Tuple[Dict[tuple, Dict[str, Any]], Dict[tuple, Dict[str, Any]]]:
+    """
+    (main_agg, peer_agg) raw sums, like grouped.aggregate_grouped, optionally
+    restricted to buckets in [t0, t1) (epoch seconds).
+    """
+    main_agg: Dict[tuple, Dict[str, Any]] = {}
+    peer_agg: Dict[tuple, Dict[str, Any]] = {}
+    for (main, peer, dest, bucket), p in partials.items():
+        if not _in_window(bucket, t0, t1):
+            continue
+        pk = (main, peer, dest)
+        pa = peer_agg.get(pk)
+        if pa is None:
+            peer_agg[pk] = _sums(p, weighted=True)
+        else:
+            _add(pa, p, weighted=True)
+        mk = (main, dest)
+        ma = main_agg.get(mk)
+        if ma is None:
+            main_agg[mk] = _sums(p, weighted=True)
+        else:
+            _add(ma, p, weighted=True)
+    return main_agg, peer_agg
+
+
+def partials_to_series(
+    partials: Partials,
+    granularity: str,
+    groups: Optional[Set[tuple]] = None,
+    t0: Optional[int] = None,
+    t1: Optional[int] = None,
+) -> Dict[tuple, Dict[str, Any]]:
+    """
+    Series raw sums keyed (main, peer, destination, time) like
+    grouped.aggregate_hourly ("1h") / aggregate_5min ("5m"), optionally
+    restricted to some (main, peer, destination) groups and to [t0, t1).
+    """
+    step = HOUR_SECONDS if granularity == "1h" else BUCKET_SECONDS
+    labels = BucketLabels(step)
+    agg: Dict[tuple, Dict[str, Any]] = {}
+    for (main, peer, dest, bucket), p in partials.items():
+        if bucket is None or not _in_window(bucket, t0, t1):
+            continue
+        if groups is not None and (main, peer, dest) not in groups:
+            continue
+        label = labels[bucket - bucket % step]
+        k = (main, peer, dest, label[0])
+        a = agg.get(k)
+        if a is None:
+            a = agg[k] = _sums(p, weighted=False)
+            if step != HOUR_SECONDS:
+                a["slot"] = label[1]
+        else:
+            _add(a, p, weighted=False)
+    return agg
+
+
+def to_epoch(dt: datetime) -> int:
+    """Epoch seconds; naive datetimes are taken as UTC (inputs are GMT0)."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+class PartialsCache:
+    """
+    Redis store of a report's partials: today's and one set per baseline prefix
+    (e.g. "Y", "W"); fails open when Redis is unavailable.
+    """
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self._cache = Cache(ttl_seconds)
+
+    @staticmethod
+    def build_key(payload: Dict[str, Any]) -> str:
+        return Cache.build_key("report:partials", payload)
+
+    async def get(self, key: str) -> Optional[Tuple[Partials, Dict[str, Partials]]]:
+        try:
+            raw = await self._cache.get_encoded(key)
+            return await cpu_executor.run(_load, raw, threaded=True) if raw else None
+        except Exception as e:
+            log_exception(e, "PartialsCache.get")
+            return None
+
+    async def put(self, key: str, today: Partials, baselines: Dict[str, Partials]) -> None:
+        # Partials of a large report encode to megabytes: keep that off the event loop
+        try:
+            payload = await cpu_executor.run(_dump, today, baselines, threaded=True)
+            await self._cache.set_encoded(key, payload)
+        except Exception as e:
+            log_exception(e, "PartialsCache.put")
+
+
+def _encode(partials: Partials) -> List[list]:
+    # Flat rows keep the payload compact: [main, peer, destination, bucket, *sums]
+    return [[*k, *p] for k, p in partials.items()]
+
+
+def _decode(rows: List[list]) -> Partials:
+    return {(r[0], r[1], r[2], r[3]): list(r[4:]) for r in rows}
+
+
+def _load(raw: bytes) -> Optional[Tuple[Partials, Dict[str, Partials]]]:
+    stored = json_codec.loads(raw)
+    if not stored or "baselines" not in stored:
+        return None
+    baselines = {prefix: _decode(rows) for prefix, rows in (stored.get("baselines") or {}).items()}
+    return _decode(stored.get("today") or []), baselines
+
+
+def _dump(today: Partials, baselines: Dict[str, Partials]) -> bytes:
+    return json_codec.dumps_chunked({
+        "today": _encode(today),
+        "baselines": {prefix: _encode(p) for prefix, p in baselines.items()},
+    })
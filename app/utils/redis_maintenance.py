@@ -0,0 +1,99 @@
+# app/utils/redis_maintenance.py
+# Paced, pipelined scan-and-delete for Redis maintenance (stale arq job keys,
+# cache invalidation).
+#
+# SCAN walks the keyspace one page at a time. A page is removed with one
+# UNLINK (memory is reclaimed off Redis' main thread) or, when only keys
+# without an expiry may go, by a Lua script that checks and unlinks the whole
+# page server-side. The delete of one page travels in the same pipeline as
+# the SCAN of the next, so every page costs a single round trip instead of
+# one (or two) per key. Between round trips the run sleeps so that time spent
+# waiting on Redis stays within REDIS_MAINTENANCE_BUDGET of wall time.
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.utils.logger import log_info
+
+# Unlinks the KEYS that have no expiry (TTL -1); returns how many it removed
+_UNLINK_PERSISTENT = """
+local removed = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('TTL', key) == -1 then
+        redis.call('UNLINK', key)
+        removed = removed + 1
+    end
+end
+return removed
+"""
+
+
+def pause_for(busy: float, budget: float) -> float:
+    """Sleep after `busy` seconds of Redis work so that busy / (busy + sleep) <= budget."""
+    return busy * (1.0 - budget) / budget if budget < 1.0 else 0.0
+
+
+async def unlink_matching(
+    client: Any,
+    pattern: str,
+    persistent_only: bool = False,
+    batch: Optional[int] = None,
+    budget: Optional[float] = None,
+    sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    clock: Callable[[], float] = time.perf_counter,
+) -> Dict[str, Any]:
+    """
+    Unlink every key matching pattern (with persistent_only, only keys without
+    a TTL). Returns the run's counts and timing:
+    {pattern, scanned, deleted, batches, round_trips, duration_ms, paused_ms}.
+    """
+    batch = batch or settings.REDIS_MAINTENANCE_BATCH
+    budget = settings.REDIS_MAINTENANCE_BUDGET if budget is None else budget
+    sha = await client.script_load(_UNLINK_PERSISTENT) if persistent_only else None
+
+    started = clock()
+    scanned = deleted = batches = round_trips = 0
+    paused = 0.0
+    cursor, keys, more = 0, [], True
+    while keys or more:
+        t0 = clock()
+        async with client.pipeline(transaction=False) as pipe:
+            if keys:
+                if sha:
+                    pipe.evalsha(sha, len(keys), *keys)
+                else:
+                    pipe.unlink(*keys)
+            if more:
+                pipe.scan(cursor=cursor, match=pattern, count=batch)
+            results: List[Any] = await pipe.execute()
+        busy = clock() - t0
+        round_trips += 1
+
+        if keys:
+            deleted += int(results[0])
+            batches += 1
+        keys = []
+        if more:
+            cursor, keys = results[-1]
+            scanned += len(keys)
+            more = int(cursor) != 0
+
+        if keys or more:
+            pause = pause_for(busy, budget)
+            if pause > 0:
+                await sleep(pause)
+                paused += pause
+
+    run = {
+        "pattern": pattern,
+        "scanned": scanned,
+        "deleted": deleted,
+        "batches": batches,
+        "round_trips": round_trips,
+        "duration_ms": round((clock() - started) * 1000, 1),
+        "paused_ms": round(paused * 1000, 1),
+    }
+    log_info(f"Redis maintenance: {run}")
+    return run
@@ -0,0 +1,55 @@
+# app/utils/report_stream.py
+# Incremental NDJSON encoding for large metrics reports.
+# Totals go first, then rows of each section in bounded chunks, so clients
+# can start rendering before the whole report has been serialized.
+
+from typing import Any, Dict, Iterator
+
+from app.utils import json_codec
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Rows per NDJSON line; keeps each serialized chunk small
+DEFAULT_CHUNK_ROWS = 2000
+
+# (report key, section name) in emission order
+REPORT_SECTIONS: tuple[tuple[str, str], ...] = (
+    ("main_rows", "main"),
+    ("peer_rows", "peer"),
+    ("hourly_rows", "hourly"),
+    ("five_min_rows", "five_min"),
+)
+
+
+def _line(obj: Dict[str, Any]) -> bytes:
+    return json_codec.dumps(obj) + b"\n"
+
+
+def iter_report_ndjson(data: Dict[str, Any], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Yield a report as NDJSON lines.
+
+    Line types:
+    - {"type": "totals", ...}: every non-row field (today/yesterday metrics, labels)
+    - {"type": "rows", "section": ..., "offset": ..., "rows": [...]}: one chunk of rows
+    - {"type": "end", "counts": {...}}: row counts per section, marks a complete stream
+    """
+    chunk_rows = max(1, int(chunk_rows))
+    section_keys = {key for key, _ in REPORT_SECTIONS}
+
+    totals = {k: v for k, v in data.items() if k not in section_keys}
+    yield _line({"type": "totals", **totals})
+
+    counts: Dict[str, int] = {}
+    for key, section in REPORT_SECTIONS:
+        rows = data.get(key) or []
+        counts[section] = len(rows)
+        for offset in range(0, len(rows), chunk_rows):
+            yield _line({
+                "type": "rows",
+                "section": section,
+                "offset": offset,
+                "rows": rows[offset:offset + chunk_rows],
+            })
+
+    yield _line({"type": "end", "counts": counts})
@@ -0,0 +1,130 @@
+# app/utils/response_cache.py
+# Cache of final response bytes: the encoded body plus gzip/brotli variants.
+# Variants are compressed once, on the report executor, when the entry is stored;
+# a hit is served as-is with no JSON encoding or compression per request.
+
+import gzip
+from typing import Dict, Optional, Tuple
+
+from app.utils.cache import Cache, DEFAULT_TTL_SECONDS
+from app.utils.executor import cpu_executor
+from app.utils.logger import log_exception
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None  # type: ignore
+
+HAVE_BROTLI = brotli is not None
+
+# Bodies smaller than this are stored uncompressed (same threshold as Tornado's gzip)
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+# Quality 5 keeps most of q11's ratio on JSON at a small fraction of the CPU
+BROTLI_QUALITY = 5
+
+# Server preference when the client weights several codings equally
+_PREFERENCE = ("br", "gzip", "identity")
+# Map fields holding response headers stored with the body (e.g. X-Report-Granularity)
+_HEADER_PREFIX = "header:"
+
+
+def _compress_variants(body: bytes) -> Dict[str, bytes]:
+    """identity + gzip (+ br) variants of body; runs off the event loop."""
+    variants = {"identity": body}
+    if len(body) < MIN_COMPRESS_BYTES:
+        return variants
+    # mtime=0 keeps gzip output deterministic for identical bodies
+    variants["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if HAVE_BROTLI:
+        variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY, mode=brotli.MODE_TEXT)
+    return variants
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Map of content-coding -> q-value from an Accept-Encoding header."""
+    weights: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    return weights
+
+
+class EncodedBody:
+    """A cached response body with its content type, precompressed variants and extra headers."""
+
+    __slots__ = ("content_type", "variants", "headers")
+
+    def __init__(self, content_type: str, variants: Dict[str, bytes], headers: Optional[Dict[str, str]] = None):
+        self.content_type = content_type
+        self.variants = variants
+        self.headers = headers or {}
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[Optional[str], bytes]:
+        """
+        Pick the variant the client prefers.
+        Returns (Content-Encoding or None for identity, body).
+        """
+        weights = parse_accept_encoding(accept_encoding)
+        wildcard = weights.get("*", 0.0)
+        best, best_q = "identity", 0.0
+        for coding in _PREFERENCE:
+            if coding not in self.variants:
+                continue
+            q = weights.get(coding, wildcard if coding != "identity" else 0.001)
+            if q > best_q:
+                best, best_q = coding, q
+        return (None if best == "identity" else best), self.variants[best]
+
+
+class ResponseCache:
+    """Redis-backed store of EncodedBody entries; fails open when Redis is unavailable."""
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self._cache = Cache(ttl_seconds)
+
+    async def get(self, key: str) -> Optional[EncodedBody]:
+        try:
+            stored = await self._cache.get_bytes_map(key)
+        except Exception as e:
+            log_exception(e, "ResponseCache.get")
+            return None
+        if not stored or "identity" not in stored:
+            return None
+        content_type = stored.pop("content_type", b"application/json").decode()
+        headers = {
+            field[len(_HEADER_PREFIX):]: stored.pop(field).decode()
+            for field in list(stored) if field.startswith(_HEADER_PREFIX)
+        }
+        return EncodedBody(content_type, stored, headers)
+
+    async def put(
+        self, key: str, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None
+    ) -> EncodedBody:
+        """
+        Compress body off the event loop, store all variants, return the entry.
+        headers are stored with it and sent again on every hit.
+        """
+        # zlib/brotli release the GIL: threads even in process mode
+        variants = await cpu_executor.run(_compress_variants, body, threaded=True)
+        encoded = EncodedBody(content_type, variants, headers)
+        fields = {_HEADER_PREFIX + name: value.encode() for name, value in encoded.headers.items()}
+        try:
+            await self._cache.set_bytes_map(key, {"content_type": content_type.encode(), **fields, **variants})
+        except Exception as e:
+            log_exception(e, "ResponseCache.put")
+        return encoded
+
+    def stats(self) -> Tuple[int, int]:
+        return self._cache.stats()
@@ -0,0 +1,79 @@
+# app/utils/time_buckets.py
+# Integer epoch time bucketing for the time-grouping code.
+#
+# Rows are bucketed by floor-dividing UTC epoch seconds (300s / 3600s); the
+# "YYYY-MM-DD HH:MM" labels are formatted once per bucket, not per row.
+# Naive datetimes are taken as UTC (inputs are GMT0), aware ones are converted.
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+FIVE_MIN_SECONDS = 300
+HOUR_SECONDS = 3600
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+def _parse(raw: Any) -> Optional[datetime]:
+    if isinstance(raw, str):
+        s = raw.replace("Z", "").strip()
+        try:
+            return datetime.fromisoformat(s)
+        except ValueError:
+            try:
+                return datetime.fromisoformat(s.replace(" ", "T"))
+            except ValueError:
+                return None
+    try:
+        return datetime.fromisoformat(str(raw).replace("Z", "").strip())
+    except ValueError:
+        return None
+
+
+def epoch_seconds(raw: Any) -> Optional[int]:
+    """UTC epoch seconds of a row time (datetime or ISO string), or None if unusable."""
+    if isinstance(raw, datetime):
+        dt = raw
+    elif raw is None:
+        return None
+    else:
+        dt = _parse(raw)
+        if dt is None:
+            return None
+    if dt.tzinfo is None:
+        # Integer timedelta division: no timezone lookup, no float rounding
+        return (dt - _EPOCH) // _SECOND
+    return int(dt.timestamp())
+
+
+class EpochCache(Dict[Any, Optional[int]]):
+    """
+    epoch_seconds memoized per distinct raw value; rows of one bucket usually
+    share the same time value, so strings are parsed once per value.
+    Use as cache[raw]; raw must be hashable.
+    """
+
+    def __missing__(self, raw: Any) -> Optional[int]:
+        epoch = self[raw] = epoch_seconds(raw)
+        return epoch
+
+
+class BucketLabels(Dict[int, Tuple[str, str]]):
+    """
+    bucket start (epoch seconds) -> (time label, short label), formatted on first use.
+    Hourly: ("YYYY-MM-DD HH:00", "HH:00"); 5m: ("YYYY-MM-DD HH:MM", "HH:MM").
+    """
+
+    def __init__(self, step: int):
+        super().__init__()
+        self.step = step
+
+    def __missing__(self, start: int) -> Tuple[str, str]:
+        dt = datetime.fromtimestamp(start, tz=timezone.utc)
+        if self.step == HOUR_SECONDS:
+            label = (dt.strftime("%Y-%m-%d %H:00"), dt.strftime("%H:00"))
+        else:
+            label = (dt.strftime("%Y-%m-%d %H:%M"), dt.strftime("%H:%M"))
+        self[start] = label
+        return label
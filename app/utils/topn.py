@@ -0,0 +1,114 @@
+# app/utils/topn.py
+# Top-N selection and "Other" folding on raw aggregation sums.
+#
+# Works on the dicts produced by grouped.aggregate_* (before finalize and
+# enrichment), so rows folded into "Other" are never formatted, enriched or
+# serialized individually. Folding sums raw fields, so ratio metrics of the
+# "Other" row (ASR, ACD, PDD, ATime) stay exact.
+
+import heapq
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.formulas import calc_acd, calc_asr, calc_atime_weighted, calc_pdd_weighted
+from app.utils.grouped import SUM_FIELDS
+
+# Dimension value used for every key field of the folded long-tail row
+OTHER_LABEL = "Other"
+
+DEFAULT_SORT = "Min"
+
+# Sort metric -> value computed from raw sums (unrounded, ranking only)
+SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], float]] = {
+    "Min": lambda a: a["seconds"],
+    "TCall": lambda a: a["attempt"],
+    "SCall": lambda a: a["success"],
+    "ASR": lambda a: calc_asr(a["success"], a["attempt"]),
+    "ACD": lambda a: calc_acd(a["seconds"], a["success"]),
+    "PDD": lambda a: calc_pdd_weighted(a["pdd_w"], a["uniq"]),
+    "ATime": lambda a: calc_atime_weighted(a["answer_w"], a["success"]),
+}
+
+# Metrics that add up across groups; min_share of a ratio metric is measured on minutes
+_ADDITIVE = {"Min", "TCall", "SCall"}
+
+
+class TopN:
+    """Ranking options for one report: sort metric, group limit and minimum share."""
+
+    def __init__(self, sort: Optional[str] = None, limit: Optional[int] = None, min_share: Optional[float] = None):
+        self.sort = sort or DEFAULT_SORT
+        if self.sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort metric: {self.sort}")
+        self.limit = limit
+        self.min_share = min_share or 0.0
+
+    def rank(self, agg: Dict[tuple, Dict[str, Any]]) -> List[tuple]:
+        """
+        Keys of the groups to keep, best first.
+        Uses a bounded heap (O(n log limit)) when a limit is set.
+        """
+        value = SORT_KEYS[self.sort]
+        items: Iterable[Tuple[tuple, Dict[str, Any]]] = agg.items()
+
+        if self.min_share > 0:
+            share_of = value if self.sort in _ADDITIVE else SORT_KEYS["Min"]
+            total = sum(share_of(a) for a in agg.values())
+            if total > 0:
+                floor = self.min_share * total
+                items = [(k, a) for k, a in items if share_of(a) >= floor]
+
+        if self.limit is not None:
+            top = heapq.nlargest(self.limit, items, key=lambda kv: value(kv[1]))
+        else:
+            top = sorted(items, key=lambda kv: value(kv[1]), reverse=True)
+        return [k for k, _ in top]
+
+
+def _add_sums(target: Dict[str, Any], source: Dict[str, Any]) -> None:
+    for f in SUM_FIELDS:
+        target[f] += source[f]
+
+
+def fold_groups(agg: Dict[tuple, Dict[str, Any]], ranked: List[tuple]) -> Dict[tuple, Dict[str, Any]]:
+    """
+    Keep ranked groups (in rank order) and sum every other group into one
+    all-"Other" key; the Other row is last and only present if something was folded.
+    """
+    keep: Set[tuple] = set(ranked)
+    out = {k: agg[k] for k in ranked if k in agg}
+    other: Optional[Dict[str, Any]] = None
+    for k, a in agg.items():
+        if k not in keep:
+            if other is None:
+                other = {f: 0 for f in SUM_FIELDS}
+            _add_sums(other, a)
+    if other is not None:
+        out[(OTHER_LABEL,) * len(next(iter(agg)))] = other
+    return out
+
+
+def fold_series(agg: Dict[tuple, Dict[str, Any]], ranked: List[tuple]) -> Dict[tuple, Dict[str, Any]]:
+    """
+    Time-series variant of fold_groups for keys (*group, time): rows of ranked
+    groups are kept, all other groups are summed into one "Other" row per time.
+    Output is ordered by group rank, then original (time) order; Other last.
+    """
+    rank = {k: i for i, k in enumerate(ranked)}
+    kept: List[Tuple[int, int, tuple]] = []
+    other: Dict[tuple, Dict[str, Any]] = {}
+    for pos, (k, a) in enumerate(agg.items()):
+        group, t = k[:-1], k[-1]
+        r = rank.get(group)
+        if r is not None:
+            kept.append((r, pos, k))
+            continue
+        ok = (OTHER_LABEL,) * len(group) + (t,)
+        o = other.get(ok)
+        if o is None:
+            # Carry non-summed fields (e.g. 5m "slot") from the first folded row
+            o = other[ok] = {**a, **{f: 0 for f in SUM_FIELDS}}
+        _add_sums(o, a)
+    kept.sort()
+    out = {k: agg[k] for _, _, k in kept}
+    out.update(other)
+    return out
@@ -0,0 +1,68 @@
+# benchmarks/bench_enrich.py
+# Compare the scalar and columnar yesterday enrichment (app.utils.enrich) on
+# the sections of output_hgc.json, optionally replicated to a wider report.
+#
+# Usage: python -m benchmarks.bench_enrich [--repeat N] [--scale K]
+
+import argparse
+import json
+import os
+import time
+
+from app.config import PROJECT_ROOT
+from app.utils import enrich
+
+SECTIONS = (
+    ("main_rows", ["main", "destination"], ()),
+    ("peer_rows", ["main", "peer", "destination"], ()),
+    ("hourly_rows", ["main", "peer", "destination", "time"], ("time",)),
+    ("five_min_rows", ["main", "peer", "destination", "time"], ("time",)),
+)
+
+
+def _split(rows: list, key_fields: list, scale: int) -> tuple:
+    """Today/yesterday finalized rows from enriched report rows; copy k renames main to main#k."""
+    today, yesterday = [], []
+    for k in range(scale):
+        for r in rows:
+            keys = {f: r.get(f) for f in key_fields}
+            keys["main"] = f"{keys['main']}#{k}"
+            today.append({**keys, **{m: r.get(m) for m in enrich.METRICS_TO_COMPARE}})
+            yesterday.append({**keys, **{m: r.get(f"Y{m}") for m in enrich.METRICS_TO_COMPARE}})
+    return today, yesterday
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--scale", type=int, default=1)
+    args = parser.parse_args()
+
+    with open(os.path.join(PROJECT_ROOT, "output_hgc.json"), encoding="utf-8") as f:
+        report = json.load(f)
+    print(f"columnar backend: {'numpy' if enrich.HAVE_NUMPY else 'unavailable'}")
+
+    for section, key_fields, extra in SECTIONS:
+        today, yesterday = _split(report.get(section) or [], key_fields, args.scale)
+        periods = [("Y", "", yesterday)]
+        scalar = _best_of(lambda: enrich._enrich_scalar(today, periods, key_fields, extra), args.repeat)
+        line = f"{section:14s} {len(today):8d} rows  scalar {scalar * 1000:8.2f} ms"
+        if enrich.HAVE_NUMPY:
+            assert enrich._enrich_columnar(today, periods, key_fields, extra) == \
+                enrich._enrich_scalar(today, periods, key_fields, extra)
+            columnar = _best_of(lambda: enrich._enrich_columnar(today, periods, key_fields, extra), args.repeat)
+            line += f"  columnar {columnar * 1000:8.2f} ms  x{scalar / columnar:5.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
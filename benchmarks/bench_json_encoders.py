@@ -0,0 +1,68 @@
+# benchmarks/bench_json_encoders.py
+# Compare the legacy json.dumps(default=str) path with app.utils.json_codec
+# on an output_hgc.json-sized report.
+#
+# Usage: python -m benchmarks.bench_json_encoders [--repeat N]
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from app.config import PROJECT_ROOT
+from app.utils import json_codec
+
+
+def _load_report() -> dict:
+    with open(os.path.join(PROJECT_ROOT, "output_hgc.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _with_native_types(report: dict) -> dict:
+    """Turn hourly/5m times into datetimes and metrics into Decimals, like raw DB rows."""
+    out = dict(report)
+    for key in ("hourly_rows", "five_min_rows"):
+        rows = []
+        for r in report.get(key) or []:
+            r = dict(r)
+            r["time"] = datetime.strptime(r["time"], "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
+            r["ACD"] = Decimal(str(r.get("ACD", 0)))
+            r["PDD"] = Decimal(str(r.get("PDD", 0)))
+            rows.append(r)
+        out[key] = rows
+    return out
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    report = _load_report()
+    payloads = {"strings": report, "datetime+decimal": _with_native_types(report)}
+    print(f"encoder backend: {'orjson' if json_codec.HAVE_ORJSON else 'stdlib'}")
+
+    for name, payload in payloads.items():
+        size = len(json_codec.dumps(payload))
+        legacy = _best_of(lambda: json.dumps(payload, default=str), args.repeat)
+        fast = _best_of(lambda: json_codec.dumps(payload), args.repeat)
+        print(
+            f"{name:18s} {size / 1e6:6.2f} MB  "
+            f"legacy {legacy * 1000:8.2f} ms  codec {fast * 1000:8.2f} ms  "
+            f"x{legacy / fast:5.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
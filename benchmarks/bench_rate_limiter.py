@@ -0,0 +1,89 @@
+# benchmarks/bench_rate_limiter.py
+# Per-request latency added by the rate limiter backends
+# (app.middleware.rate_limiter): in-memory, and Redis with and without local
+# permit pre-fetching. Uses the Redis at REDIS_URL; with --simulate-rtt-ms
+# (or when Redis is unreachable) an in-process stand-in with that round trip.
+#
+# Usage: python -m benchmarks.bench_rate_limiter [--requests N] [--clients N] [--prefetch N]
+#        [--simulate-rtt-ms MS]
+
+import argparse
+import asyncio
+import math
+import time
+import uuid
+
+from app.config import settings
+from app.middleware.rate_limiter import RedisSlidingWindow, SlidingWindowCounter, aioredis
+
+
+class _SimulatedRedis:
+    """Runs the reserve script's logic in-process after a fixed round trip."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.counters = {}
+
+    def register_script(self, script):
+        async def run(keys, args):
+            await asyncio.sleep(self.rtt)
+            limit, weight, want, _ttl = args
+            curr, prev = self.counters.get(keys[0], 0), self.counters.get(keys[1], 0)
+            used = prev * weight + curr
+            granted = max(0, min(want, math.floor(limit - used)))
+            self.counters[keys[0]] = curr + granted
+            return [granted, max(0, math.floor(limit - used - granted))]
+        return run
+
+
+async def _client(simulate_rtt_ms: float):
+    if simulate_rtt_ms or aioredis is None:
+        return _SimulatedRedis(simulate_rtt_ms / 1000), f"simulated {simulate_rtt_ms} ms RTT"
+    client = aioredis.from_url(settings.REDIS_URL)
+    try:
+        await asyncio.wait_for(client.ping(), 1.0)
+        return client, settings.REDIS_URL
+    except Exception:
+        return _SimulatedRedis(0.0005), "simulated 0.5 ms RTT (Redis unreachable)"
+
+
+async def _measure(limiter, requests: int, clients: int) -> tuple:
+    latencies = []
+    for i in range(requests):
+        start = time.perf_counter()
+        await limiter.acquire(f"10.0.0.{i % clients}")
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    mean = sum(latencies) / len(latencies)
+    return mean, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+async def _run(args) -> None:
+    client, target = await _client(args.simulate_rtt_ms)
+    print(f"{args.requests} requests over {args.clients} clients, Redis: {target}")
+    limit = 10 ** 9  # never deny, measure the admission path only
+    prefix = f"bench:{uuid.uuid4().hex[:8]}"
+    limiters = {
+        "memory": SlidingWindowCounter(60, limit),
+        "redis prefetch=1": RedisSlidingWindow(60, limit, prefix + ":1", prefetch=1, timeout=1.0, client=client),
+        f"redis prefetch={args.prefetch}": RedisSlidingWindow(
+            60, limit, prefix + ":n", prefetch=args.prefetch, timeout=1.0, client=client
+        ),
+    }
+    for name, limiter in limiters.items():
+        await _measure(limiter, min(args.requests, 100), args.clients)  # warm-up (script load, connections)
+        mean, p50, p99 = await _measure(limiter, args.requests, args.clients)
+        print(f"{name:20s} mean {mean * 1e6:8.1f} us  p50 {p50 * 1e6:8.1f} us  p99 {p99 * 1e6:8.1f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--prefetch", type=int, default=settings.RATE_LIMIT_PREFETCH)
+    parser.add_argument("--simulate-rtt-ms", type=float, default=0.0)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_sharding.py
+# Wall time of a multi-day report aggregation (today + yesterday partials and
+# totals) in-process against app.services.shard_service on 1..N worker
+# processes. Shard rows are synthesized inside the workers, standing in for the
+# per-shard database fetch, so the benchmark needs no database.
+#
+# Usage: python -m benchmarks.bench_sharding [--days N] [--groups N] [--workers N] [--shard-hours N]
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from app.services.shard_service import ShardedAggregator, reduce_rows
+from app.utils.baselines import DEFAULT_BASELINES
+
+REPORT_FROM = datetime(2024, 3, 1, tzinfo=timezone.utc)
+ROW_STEP = timedelta(minutes=1)
+_GROUPS = 40
+
+
+def _rows(t0: datetime, t1: datetime) -> list:
+    """One row per group and minute in [t0, t1], like the aggregation table."""
+    out = []
+    t = t0
+    while t <= t1:
+        for g in range(_GROUPS):
+            out.append({
+                "time": t, "customer": f"C{g % 10}", "supplier": f"S{g // 10}", "destination": f"D{g % 3}",
+                "start_attempt": 3 + g % 5, "start_uniq_attempt": 2, "start_nuber": 1 + g % 3,
+                "seconds": 60 + g, "pdd": 900 + g, "answer_time": 4,
+            })
+        t += ROW_STEP
+    return out
+
+
+def synthetic_shard(filters, periods, shifts, reverse):
+    """shard_fn: synthesize the shard's rows, then reduce them like aggregate_shard."""
+    return reduce_rows({name: _rows(t0, t1) for name, (t0, t1) in periods.items()}, shifts, reverse)
+
+
+def _init_worker(groups: int) -> None:
+    global _GROUPS
+    _GROUPS = groups
+
+
+def _in_process(time_to: datetime) -> dict:
+    periods = {"today": (REPORT_FROM, time_to), "Y": (REPORT_FROM - timedelta(days=1), time_to - timedelta(days=1))}
+    return synthetic_shard({}, periods, {"today": 0, "Y": 86400}, False)
+
+
+async def _sharded(workers: int, shard_seconds: int, time_to: datetime, groups: int) -> tuple:
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker, initargs=(groups,),
+    )
+    sharder = ShardedAggregator(workers, shard_seconds, min_range_seconds=0, executor=pool, shard_fn=synthetic_shard)
+    try:
+        # Warm up: spawn every worker before timing
+        await asyncio.gather(*[asyncio.get_running_loop().run_in_executor(pool, _init_worker, groups)
+                               for _ in range(workers)])
+        start = time.perf_counter()
+        sums = await sharder.aggregate({}, REPORT_FROM, time_to, DEFAULT_BASELINES)
+        return time.perf_counter() - start, sums
+    finally:
+        sharder.shutdown()
+
+
+def main() -> None:
+    global _GROUPS
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--groups", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-hours", type=int, default=6)
+    args = parser.parse_args()
+    _GROUPS = args.groups
+
+    time_to = REPORT_FROM + timedelta(days=args.days)
+    start = time.perf_counter()
+    expected = _in_process(time_to)
+    base = time.perf_counter() - start
+    rows = expected["today"][1]["rows"] + expected["Y"][1]["rows"]
+    print(f"{rows} rows, {os.cpu_count()} cpus")
+    print(f"in-process        {base:7.2f} s")
+
+    counts = sorted({1 << i for i in range(args.workers.bit_length()) if 1 << i <= args.workers} | {args.workers})
+    for workers in counts:
+        elapsed, sums = asyncio.run(_sharded(workers, args.shard_hours * 3600, time_to, args.groups))
+        assert {k: v[1] for k, v in sums.items()} == {k: v[1] for k, v in expected.items()}
+        assert {k: v[0] for k, v in sums.items()} == {k: v[0] for k, v in expected.items()}
+        print(f"{workers:2d} workers        {elapsed:7.2f} s  x{base / elapsed:4.1f}")
+
+
+if __name__ == "__main__":
+    main()
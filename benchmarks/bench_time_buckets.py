@@ -0,0 +1,117 @@
+# benchmarks/bench_time_buckets.py
+# Per-row cost of hourly/5m time grouping: the previous per-row
+# parse + astimezone + strftime keys against integer epoch buckets
+# (app.utils.time_buckets) as used by app.utils.grouped.
+#
+# Usage: python -m benchmarks.bench_time_buckets [--rows N] [--repeat N]
+
+import argparse
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from app.utils.grouped import aggregate_5min, aggregate_hourly
+
+
+def _legacy_parse(raw):
+    if isinstance(raw, datetime):
+        return raw
+    s = str(raw).replace("Z", "").strip()
+    try:
+        return datetime.fromisoformat(s)
+    except ValueError:
+        return None
+
+
+def _add(a, row):
+    a["attempt"] += row.get("start_attempt", 0) or 0
+    a["uniq"] += row.get("start_uniq_attempt", 0) or 0
+    a["success"] += row.get("start_nuber", 0) or 0
+    a["seconds"] += row.get("seconds", 0) or 0
+    a["pdd_w"] += row.get("pdd", 0) or 0
+    a["answer_w"] += row.get("answer_time", 0) or 0
+
+
+def _zero():
+    return {"attempt": 0, "uniq": 0, "success": 0, "seconds": 0, "pdd_w": 0, "answer_w": 0}
+
+
+def _legacy_hourly(rows):
+    """aggregate_hourly as it was before epoch bucketing."""
+    agg = defaultdict(_zero)
+    for row in rows:
+        dt = _legacy_parse(row.get("time"))
+        if dt is None:
+            continue
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc)
+        k = (row.get("customer"), row.get("supplier"), row.get("destination"), dt.strftime("%Y-%m-%d %H:00"))
+        _add(agg[k], row)
+    return agg
+
+
+def _legacy_5min(rows):
+    """aggregate_5min as it was before epoch bucketing."""
+    agg = {}
+    for row in rows:
+        dt = _legacy_parse(row.get("time"))
+        if dt is None:
+            continue
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc)
+        dt5 = dt.replace(minute=(dt.minute // 5) * 5, second=0, microsecond=0)
+        key5 = dt5.strftime("%Y-%m-%d %H:%M")
+        slot = dt5.strftime("%H:%M")
+        k = (row.get("customer"), row.get("supplier"), row.get("destination"), key5)
+        if k not in agg:
+            agg[k] = {**_zero(), "slot": slot}
+        _add(agg[k], row)
+    return agg
+
+
+def _rows(n: int, kind: str) -> list:
+    base = datetime(2024, 1, 1)
+    out = []
+    for i in range(n):
+        # A new value object per row, like a DB driver returns
+        t = base + timedelta(minutes=5 * (i // 400), seconds=i % 300)
+        if kind == "aware":
+            t = t.replace(tzinfo=timezone.utc)
+        elif kind == "string":
+            t = t.isoformat(sep=" ")
+        out.append({
+            "time": t, "customer": f"C{i % 20}", "supplier": f"S{i // 20 % 20}", "destination": "US",
+            "start_attempt": 3, "start_uniq_attempt": 2, "start_nuber": 1, "seconds": 60, "pdd": 900, "answer_time": 4,
+        })
+    return out
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for kind in ("naive", "aware", "string"):
+        rows = _rows(args.rows, kind)
+        for name, before, after in (
+            ("hourly", _legacy_hourly, aggregate_hourly),
+            ("5m", _legacy_5min, aggregate_5min),
+        ):
+            assert list(before(rows)) == list(after(rows))
+            b = _best_of(lambda: before(rows), args.repeat) / len(rows) * 1e9
+            a = _best_of(lambda: after(rows), args.repeat) / len(rows) * 1e9
+            print(f"{kind:7s} {name:6s} before {b:7.0f} ns/row  after {a:7.0f} ns/row  x{b / a:4.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,12 @@ const GRANULARITY_ENDPOINTS = {
   '1h': `${API_BASE}/1h`
 };
 
+// Drill-down for lazy reports (hourly/5m rows of one group)
+const SERIES_ENDPOINT = `${API_BASE}/series`;
+
+// Chart zoom: main/peer rows re-aggregated server-side over a sub-window
+const ZOOM_ENDPOINT = `${API_BASE}/zoom`;
+
 // ─────────────────────────────────────────────────────────────
 // Helpers
 // ─────────────────────────────────────────────────────────────
@@ -37,16 +43,7 @@ function createAbortController() {
   return { controller, timeoutId };
 }
 
-// ─────────────────────────────────────────────────────────────
-// Main export
-// ─────────────────────────────────────────────────────────────
-
-export async function fetchMetrics(filterParams) {
-  const params = buildParams(filterParams);
-  const endpoint = getEndpoint(params.granularity);
-  const queryString = new URLSearchParams(params).toString();
-  const url = `${endpoint}?${queryString}`;
-
+async function fetchJson(url, context) {
   const { controller, timeoutId } = createAbortController();
 
   try {
@@ -60,7 +57,43 @@ export async function fetchMetrics(filterParams) {
     return await response.json();
   } catch (err) {
     clearTimeout(timeoutId);
-    logError(ErrorCategory.DATA, 'fetchMetrics', err);
+    logError(ErrorCategory.DATA, context, err);
     return null;
   }
 }
+
+// ─────────────────────────────────────────────────────────────
+// Main export
+// ─────────────────────────────────────────────────────────────
+
+export async function fetchMetrics(filterParams) {
+  const params = buildParams(filterParams);
+  const endpoint = getEndpoint(params.granularity);
+  const queryString = new URLSearchParams(params).toString();
+  return fetchJson(`${endpoint}?${queryString}`, 'fetchMetrics');
+}
+
+/**
+ * Fetch hourly/5m rows for one (main, peer, destination) group of a report
+ * requested with `lazy: 'true'`. Same filter params as fetchMetrics.
+ * @returns {Promise<{hourly_rows: Array, five_min_rows: Array}|null>}
+ */
+export async function fetchSeries(filterParams, { main, peer, destination }) {
+  const params = { ...buildParams(filterParams), main, peer, dest: destination };
+  delete params.lazy;
+  const queryString = new URLSearchParams(params).toString();
+  return fetchJson(`${SERIES_ENDPOINT}?${queryString}`, 'fetchSeries');
+}
+
+/**
+ * Fetch main/peer rows of a report re-aggregated over a zoom window
+ * (epoch ms, [fromTs, toTs)). Same filter params as fetchMetrics.
+ * @returns {Promise<{main_rows: Array, peer_rows: Array, aggregates: Object}|null>}
+ */
+export async function fetchZoom(filterParams, { fromTs, toTs }) {
+  const params = { ...buildParams(filterParams), zoom_from: String(fromTs), zoom_to: String(toTs) };
+  delete params.lazy;
+  delete params.granularity;
+  const queryString = new URLSearchParams(params).toString();
+  return fetchJson(`${ZOOM_ENDPOINT}?${queryString}`, 'fetchZoom');
+}
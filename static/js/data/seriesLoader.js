@@ -0,0 +1,83 @@
+// static/js/data/seriesLoader.js
+// Responsibility: Load hourly/5m rows of a lazy report per peer group on expand
+import { subscribe, publish } from '../state/eventBus.js';
+import { getFullData } from '../state/tableState.js';
+import { buildPeerGroupId } from '../state/expansionState.js';
+import { fetchSeries } from './fetchMetrics.js';
+import { logError, ErrorCategory } from '../utils/errorLogger.js';
+
+// ─────────────────────────────────────────────────────────────
+// Constants
+// ─────────────────────────────────────────────────────────────
+
+const EXPANSION_EVENT = 'table:expansionChanged';
+const LOADED_EVENT = 'table:seriesLoaded';
+
+// ─────────────────────────────────────────────────────────────
+// State
+// ─────────────────────────────────────────────────────────────
+
+// filter params of the lazy report on screen; null when its series came inline
+let lazyParams = null;
+// peer group ids already requested for the current report
+const requested = new Set();
+
+// ─────────────────────────────────────────────────────────────
+// Helpers
+// ─────────────────────────────────────────────────────────────
+
+function findPeerRow(groupId) {
+  const { peerRows } = getFullData();
+  const len = peerRows?.length ?? 0;
+  for (let i = 0; i < len; i++) {
+    const r = peerRows[i];
+    if (buildPeerGroupId(r.main, r.peer, r.destination) === groupId) return r;
+  }
+  return null;
+}
+
+async function loadPeerSeries(groupId) {
+  const params = lazyParams;
+  const row = findPeerRow(groupId);
+  if (!row) return;
+
+  requested.add(groupId);
+  const data = await fetchSeries(params, row);
+
+  // report replaced while the request was in flight
+  if (params !== lazyParams) return;
+  if (!data) {
+    requested.delete(groupId); // retry on next expand
+    return;
+  }
+
+  const rows = data.five_min_rows?.length ? data.five_min_rows : (data.hourly_rows || []);
+  if (!rows.length) return;
+
+  const full = getFullData();
+  full.hourlyRows = (full.hourlyRows || []).concat(rows);
+  publish(LOADED_EVENT, { groupId, rows });
+}
+
+function handleExpansionChanged({ level, id, expanded } = {}) {
+  if (!lazyParams || level !== 'peer' || !expanded || requested.has(id)) return;
+  loadPeerSeries(id).catch(e => logError(ErrorCategory.DATA, 'seriesLoader:load', e));
+}
+
+// ─────────────────────────────────────────────────────────────
+// Public API
+// ─────────────────────────────────────────────────────────────
+
+/**
+ * Register the report now on screen: pass its filter params when it was
+ * fetched with `lazy: 'true'` (series are then fetched per peer group on
+ * expand), null otherwise.
+ */
+export function setLazySeriesSource(params) {
+  lazyParams = params || null;
+  requested.clear();
+}
+
+export const isLazySeriesActive = () => lazyParams !== null;
+
+subscribe(EXPANSION_EVENT, handleExpansionChanged);
@@ -2,6 +2,9 @@
 // Responsibility: UI-level data processing (filtering, sorting, search)
 import { getState, getFullData } from '../state/tableState.js';
 import { getChartsZoomRange } from '../state/runtimeFlags.js';
+import { getFilters } from '../state/appState.js';
+import { fetchZoom } from './fetchMetrics.js';
+import { isLazySeriesActive } from './seriesLoader.js';
 
 // ─────────────────────────────────────────────────────────────
 // Constants
@@ -86,6 +89,18 @@ function filterByZoomRange(rows, zoomRange) {
   });
 }
 
+/**
+ * Main/peer rows of the report on screen (filters of the last Find)
+ * re-aggregated server-side over the zoom window, from its cached partials.
+ * @returns {Promise<{main_rows: Array, peer_rows: Array, aggregates: Object}|null>} null on failure
+ */
+export async function fetchZoomRows(zoomRange) {
+  const filters = getFilters();
+  if (!filters.from || !filters.to) return null;
+  const data = await fetchZoom(filters, zoomRange);
+  return Array.isArray(data?.main_rows) && Array.isArray(data?.peer_rows) ? data : null;
+}
+
 // ─────────────────────────────────────────────────────────────
 // Sort helpers
 // ─────────────────────────────────────────────────────────────
@@ -277,12 +292,15 @@ function getFilteredAndSortedData() {
   let effectivePeerRows = peerRows;
   let effectiveHourlyRows = hourlyRows;
 
-  // zoom re-aggregation
+  // zoom re-aggregation; lazy reports only hold the series of expanded groups,
+  // and their main/peer rows already cover the zoom window (server-side)
   const zoomRange = getValidZoomRange();
   if (zoomRange && hourlyRows?.length) {
     effectiveHourlyRows = filterByZoomRange(hourlyRows, zoomRange);
-    effectivePeerRows = aggregatePeerRows(effectiveHourlyRows);
-    effectiveMainRows = aggregateMainRows(effectivePeerRows);
+    if (!isLazySeriesActive()) {
+      effectivePeerRows = aggregatePeerRows(effectiveHourlyRows);
+      effectiveMainRows = aggregateMainRows(effectivePeerRows);
+    }
   }
 
   // apply column filters to all row levels
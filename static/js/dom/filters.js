@@ -3,7 +3,7 @@
 import { fetchMetrics } from '../data/fetchMetrics.js';
 import {
   isReverseMode, setReverseMode, setMetricsData, setAppStatus,
-  getAppStatus, setFilters, setUI, setShowTable, getUI
+  getAppStatus, setFilters, getFilters, setUI, setShowTable, getUI
 } from '../state/appState.js';
 import { subscribe } from '../state/eventBus.js';
 import { saveStateToUrl } from '../state/urlState.js';
@@ -16,6 +16,8 @@ import { initTableInteractions } from './table.js';
 import { initStickyFooter, initStickyHeader } from './sticky-table-chrome.js';
 import { renderCoordinator } from '../rendering/render-coordinator.js';
 import { getCachedMetrics, putCachedMetrics } from '../data/metricsCache.js';
+import { setLazySeriesSource } from '../data/seriesLoader.js';
+import { fetchZoomRows } from '../data/tableProcessor.js';
 import { toast } from '../ui/notify.js';
 import {
   isSummaryDelegationInstalled, setSummaryDelegationInstalled,
@@ -541,14 +543,52 @@ function formatTimestamp(ts) {
   return `${d.getUTCFullYear()}-${pad(d.getUTCMonth() + 1)}-${pad(d.getUTCDate())} ${pad(d.getUTCHours())}:${pad(d.getUTCMinutes())}:${pad(d.getUTCSeconds())}`;
 }
 
-function applyZoomToParams(params) {
+function getValidChartsZoomRange() {
   const zr = getChartsZoomRange();
-  if (zr && Number.isFinite(zr.fromTs) && Number.isFinite(zr.toTs) && zr.toTs > zr.fromTs) {
+  return zr && Number.isFinite(zr.fromTs) && Number.isFinite(zr.toTs) && zr.toTs > zr.fromTs ? zr : null;
+}
+
+function applyZoomToParams(params) {
+  const zr = getValidChartsZoomRange();
+  if (zr) {
     params.from = formatTimestamp(zr.fromTs);
     params.to = formatTimestamp(zr.toTs);
   }
 }
 
+/**
+ * Main/peer rows for the summary table, without series (loaded per peer
+ * group on expand). Zoomed, they are re-aggregated server-side from the
+ * partials of the report on screen; a zoom-window report is the fallback.
+ */
+async function fetchSummaryData() {
+  const zr = getValidChartsZoomRange();
+  if (zr) {
+    const zoomed = await fetchZoomRows(zr);
+    if (zoomed) {
+      // series of the full report, cut to the window by the table
+      const base = { ...getFilters() };
+      base.granularity = computeFetchGranularity(base.from, base.to);
+      base.lazy = 'true';
+      setLazySeriesSource(base);
+      return { ...zoomed, hourly_rows: [], five_min_rows: [], lazy: true };
+    }
+  }
+
+  const filterParams = buildFilterParams();
+  applyZoomToParams(filterParams);
+
+  if (!filterParams.from || !filterParams.to) {
+    throw new Error('Date range is not set. Cannot fetch metrics.');
+  }
+
+  filterParams.granularity = computeFetchGranularity(filterParams.from, filterParams.to);
+  filterParams.lazy = 'true';
+  const data = await fetchMetrics(filterParams);
+  setLazySeriesSource(data?.lazy ? filterParams : null);
+  return data;
+}
+
 function synthesizeMainRows(peerRows) {
   const map = new Map();
   peerRows.forEach(p => {
@@ -634,15 +674,7 @@ async function handleSummaryClick() {
 
   try {
     safeCall(refreshFilterValues, 'handleSummaryClick:refresh');
-    const filterParams = buildFilterParams();
-    applyZoomToParams(filterParams);
-
-    if (!filterParams.from || !filterParams.to) {
-      throw new Error('Date range is not set. Cannot fetch metrics.');
-    }
-
-    filterParams.granularity = computeFetchGranularity(filterParams.from, filterParams.to);
-    const data = await fetchMetrics(filterParams);
+    const data = await fetchSummaryData();
 
     if (!data) {
       showErrorTable('Error loading data. Please try again.');
@@ -75,6 +75,12 @@ function getElement(id) {
 
 subscribe('appState:dataChanged', resetExpansionState);
 
+// Series of a lazy report's peer group arrived; the virtual manager handles its own rows
+subscribe('table:seriesLoaded', () => {
+  if (getVirtualManager()?.isActive) return;
+  renderCoordinator.requestRender('table', redrawTable, { debounceMs: 0, cooldownMs: 0 });
+});
+
 export function resetRowOpenState() {
   resetExpansionState();
 }
@@ -70,5 +70,14 @@ export function attachSubscriptions(vm) {
   };
   unsubs.push(subscribe('appState:reverseModeChanged', debounce(onReverse, 24)));
 
+  // Series of a lazy report's peer group arrived — index them and show under the open peer
+  const onSeriesLoaded = ({ rows } = {}) => {
+    if (!vm.isActive || !vm.rawData || !rows?.length) return;
+    vm.rawData.hourlyRows = (vm.rawData.hourlyRows || []).concat(rows);
+    safeCall(() => vm.initializeLazyData?.(), 'vmSub:seriesLazy');
+    safeCall(() => vm.refreshVirtualTable?.(), 'vmSub:seriesRefresh');
+  };
+  unsubs.push(subscribe('table:seriesLoaded', onSeriesLoaded));
+
   return { unsubs };
 }
@@ -0,0 +1,47 @@
+# tests/unit/test_arrow_format.py
+# Unit tests for Arrow IPC report encoding
+
+import pytest
+
+pa = pytest.importorskip("pyarrow", reason="pyarrow is not installed")
+
+from app.utils.arrow_format import read_report_ipc, report_to_arrow_ipc, wants_arrow  # noqa: E402
+
+
+@pytest.fixture
+def report():
+    row = {"main": "A", "destination": "US", "Min": 1.5, "YMin": 1.0, "Min_delta": 50.0,
+           "SCall": 3, "YSCall": 2, "TCall": 10, "YTCall": 8}
+    return {
+        "today_metrics": {"Min": 1.5, "TCall": 10},
+        "yesterday_metrics": {"Min": 1.0, "TCall": 8},
+        "main_rows": [row, {**row, "destination": "UK"}],
+        "peer_rows": [{**row, "peer": "P1"}],
+        "hourly_rows": [{**row, "peer": "P1", "time": "2024-01-01 10:00"}],
+        "five_min_rows": [],
+        "labels": {"ASR": {"1704103200": [10.0]}},
+    }
+
+
+class TestArrowFormat:
+    """Test section layout and column types of the Arrow output."""
+
+    def test_one_stream_per_section(self, report):
+        tables = read_report_ipc(report_to_arrow_ipc(report))
+        assert list(tables) == ["totals", "main", "peer", "hourly", "five_min"]
+        assert tables["main"].num_rows == 2
+        assert tables["five_min"].num_rows == 0
+        assert tables["totals"].column("period").to_pylist() == ["today", "yesterday"]
+
+    def test_typed_columns(self, report):
+        main = read_report_ipc(report_to_arrow_ipc(report))["main"]
+        assert pa.types.is_dictionary(main.schema.field("destination").type)
+        assert main.schema.field("TCall").type == pa.int64()
+        assert main.schema.field("Min").type == pa.float64()
+        assert main.column("destination").to_pylist() == ["US", "UK"]
+        assert main.column("ACD").to_pylist() == [None, None]  # missing keys become nulls
+
+    def test_accept_header_negotiation(self):
+        assert wants_arrow("application/vnd.apache.arrow.stream, */*")
+        assert not wants_arrow("application/json")
+        assert not wants_arrow(None)
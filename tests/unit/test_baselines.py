@@ -0,0 +1,146 @@
+# tests/unit/test_baselines.py
+# Unit tests for multi-baseline (day/week/month-over) report comparisons
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.query_params import MetricsQueryParams
+from app.services.metrics_service import MetricsService
+from app.utils.baselines import DAY, DEFAULT_BASELINES, WEEK, Baseline, format_baselines, parse_baselines
+from app.utils.partials import _decode, _encode
+
+REPORT = (datetime(2024, 2, 1), datetime(2024, 2, 2))
+
+
+def _rows(base, n=96, scale=1):
+    return [
+        {
+            "time": base + timedelta(minutes=i * 15),
+            "customer": "AB"[i % 2], "supplier": "XY"[i % 3 % 2], "destination": "US",
+            "start_attempt": scale * (10 + i % 7), "start_uniq_attempt": 8, "start_nuber": scale * (1 + i % 5),
+            "seconds": 60 * (i % 9), "pdd": 1000 + i, "answer_time": 3 + i % 4,
+        }
+        for i in range(n)
+    ]
+
+
+class FakePartialsCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def put(self, key, today, baselines):
+        self.data[key] = (_decode(_encode(today)), {p: _decode(_encode(b)) for p, b in baselines.items()})
+
+
+class FakeRepository:
+    """Serves rows of any period from one pool, like the UNION ALL query."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.periods = []
+
+    async def get_metrics_parallel(self, filters, t0, t1, y0, y1):
+        out = await self.get_metrics_multi_period(filters, {"today": (t0, t1), "yesterday": (y0, y1)})
+        return out["today"], out["yesterday"]
+
+    async def get_metrics_multi_period(self, filters, periods):
+        self.periods.append(periods)
+        return {
+            name: [r for r in self.rows if t0 <= r["time"].replace(tzinfo=timezone.utc) <= t1]
+            for name, (t0, t1) in periods.items()
+        }
+
+
+@pytest.fixture
+def rows():
+    # Today, yesterday (x2 calls), last week (x3 calls); clear of the inclusive range ends
+    start = REPORT[0] + timedelta(minutes=5)
+    return _rows(start) + _rows(start - timedelta(days=1), scale=2) + _rows(start - timedelta(days=7), scale=3)
+
+
+class TestParseBaselines:
+    """Test baseline spec parsing and canonical formatting."""
+
+    def test_default(self):
+        assert parse_baselines(None) == DEFAULT_BASELINES
+        assert parse_baselines("") == DEFAULT_BASELINES
+
+    def test_named_and_custom_offsets(self):
+        assert parse_baselines("-7d, 28d,1d") == (
+            Baseline("Y", DAY), Baseline("W", WEEK), Baseline("M", 4 * WEEK),
+        )
+        assert parse_baselines(["3d", "12h"]) == (
+            Baseline("Y", DAY), Baseline("B3d", 3 * DAY), Baseline("B12h", 12 * 3600),
+        )
+
+    def test_duplicates_dropped_and_roundtrip(self):
+        baselines = parse_baselines("1w,7d,168h")
+        assert baselines == (Baseline("Y", DAY), Baseline("W", WEEK))
+        assert format_baselines(baselines) == "1d,7d"
+        assert parse_baselines(format_baselines(baselines)) == baselines
+
+    @pytest.mark.parametrize("spec", ["7", "0d", "abc", "400d", "2d,3d,4d,5d"])
+    def test_invalid(self, spec):
+        with pytest.raises(ValueError):
+            parse_baselines(spec)
+
+    def test_query_params(self):
+        params = MetricsQueryParams(**{"from": REPORT[0], "to": REPORT[1], "baselines": "28d,-7d"})
+        assert params.baselines == "1d,28d,7d"
+        with pytest.raises(ValidationError):
+            MetricsQueryParams(**{"from": REPORT[0], "to": REPORT[1], "baselines": "7x"})
+
+
+class TestMultiBaselineReport:
+    """Test that extra baselines add W columns from one multi-period fetch."""
+
+    async def test_week_columns(self, rows):
+        repo = FakeRepository(rows)
+        service = MetricsService(repo, partials_cache=FakePartialsCache())
+        report = await service.get_full_metrics_report(None, None, None, *REPORT, baselines=parse_baselines("7d"))
+
+        assert len(repo.periods) == 1
+        periods = repo.periods[0]
+        assert list(periods) == ["today", "Y", "W"]
+        assert periods["W"][0] == datetime(2024, 1, 25, tzinfo=timezone.utc)
+
+        assert report["baselines"] == [{"prefix": "Y", "offset": "1d"}, {"prefix": "W", "offset": "7d"}]
+        assert report["baseline_metrics"]["W"]["TCall"] == 3 * report["today_metrics"]["TCall"]
+        for row in report["main_rows"]:
+            assert row["YTCall"] == 2 * row["TCall"]
+            assert row["WTCall"] == 3 * row["TCall"]
+            assert row["TCall_delta_W"] == round((1 - 3) / 3 * 100, 1)
+
+    async def test_default_report_unchanged(self, rows):
+        service = MetricsService(FakeRepository(rows), partials_cache=FakePartialsCache())
+        report = await service.get_full_metrics_report(None, None, None, *REPORT)
+        assert "baselines" not in report
+        assert not any(k.startswith("W") for k in report["main_rows"][0])
+
+    async def test_series_aligned_with_baselines(self, rows):
+        service = MetricsService(FakeRepository(rows), partials_cache=FakePartialsCache())
+        report = await service.get_full_metrics_report(None, None, None, *REPORT, baselines=parse_baselines("7d"))
+        # Baseline slots are compared with the same time of day, not left unmatched
+        for section in ("hourly_rows", "five_min_rows"):
+            assert report[section]
+            for row in report[section]:
+                assert row["YTCall"] == 2 * row["TCall"]
+                assert row["WTCall"] == 3 * row["TCall"]
+
+    async def test_zoom_and_series_use_baselines(self, rows):
+        repo = FakeRepository(rows)
+        service = MetricsService(repo, partials_cache=FakePartialsCache())
+        baselines = parse_baselines("7d")
+        await service.get_full_metrics_report(None, None, None, *REPORT, baselines=baselines)
+        zoom = await service.get_zoom(
+            None, None, None, *REPORT, datetime(2024, 2, 1, 6), datetime(2024, 2, 1, 12), baselines=baselines,
+        )
+        series = await service.get_series(None, None, None, *REPORT, "A", "X", "US", baselines=baselines)
+        assert len(repo.periods) == 1  # both served from the report's cached partials
+        assert all(r["WTCall"] == 3 * r["TCall"] for r in zoom["peer_rows"])
+        assert all(r["WTCall"] == 3 * r["TCall"] for r in series["hourly_rows"])
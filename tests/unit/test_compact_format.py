@@ -0,0 +1,66 @@
+# tests/unit/test_compact_format.py
+# Unit tests for compact (v1/v2) report formats
+
+import pytest
+
+from app.constants import HOURLY_HEADERS
+from app.handlers.metrics_handler import BaseMetricsHandler
+
+
+@pytest.fixture
+def report():
+    hourly = [
+        {"main": "Cust", "peer": "Sup1", "destination": "Yemen Republic Mobile Yementel", "time": "2024-01-01 10:00", "Min": 1.0},
+        {"main": "Cust", "peer": "Sup2", "destination": "Yemen Republic Mobile Yementel", "time": "2024-01-01 11:00", "Min": 2.0},
+        {"main": "Cust", "peer": "Sup1", "destination": "Yemen Republic Mobile Yementel", "time": "2024-01-01 10:00", "Min": 3.0},
+    ]
+    return {
+        "today_metrics": {"Min": 6.0},
+        "yesterday_metrics": {},
+        "main_rows": [{"main": "Cust", "destination": "Yemen Republic Mobile Yementel", "Min": 6.0}],
+        "peer_rows": [],
+        "hourly_rows": hourly,
+        "five_min_rows": [],
+    }
+
+
+def _decode(section: dict, strings: list[str]) -> list[dict]:
+    """Reference decoder for compact v2 sections."""
+    out = []
+    prev = 0
+    for row in section["rows"]:
+        item = {}
+        for header, value in zip(section["headers"], row):
+            enc = section["encodings"].get(header)
+            if enc == "dict":
+                value = strings[value] if value is not None else None
+            elif enc == "delta" and value is not None:
+                prev = value = prev + value
+            item[header] = value
+        out.append(item)
+    return out
+
+
+class TestCompactV2:
+    """Test dictionary and delta encoding of compact v2."""
+
+    def test_shared_dictionary(self, report):
+        out = BaseMetricsHandler._to_compact_v2_format(report)
+        assert out["version"] == 2
+        # each distinct string stored once across all sections
+        assert out["dict"].count("Yemen Republic Mobile Yementel") == 1
+        assert out["main"]["rows"][0][:2] == out["hourly"]["rows"][0][:1] + out["hourly"]["rows"][0][2:3]
+
+    def test_roundtrip_matches_v1(self, report):
+        v1 = BaseMetricsHandler._to_compact_format(report)
+        v2 = BaseMetricsHandler._to_compact_v2_format(report)
+        decoded = _decode(v2["hourly"], v2["dict"])
+        assert [[r[h] for h in HOURLY_HEADERS] for r in decoded] == v1["hourly"]["rows"]
+
+    def test_delta_time(self, report):
+        v2 = BaseMetricsHandler._to_compact_v2_format(report, delta_time=True)
+        times = [row[3] for row in v2["hourly"]["rows"]]
+        assert times == [1704103200, 3600, -3600]
+        assert v2["hourly"]["encodings"]["time"] == "delta"
+        decoded = _decode(v2["hourly"], v2["dict"])
+        assert [r["time"] for r in decoded] == [1704103200, 1704106800, 1704103200]
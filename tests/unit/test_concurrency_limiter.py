@@ -0,0 +1,124 @@
+# tests/unit/test_concurrency_limiter.py
+# Unit tests for the adaptive (AIMD) concurrency limit of report computation
+
+import asyncio
+
+import pytest
+
+from app.db.base import pool_waits, query_times
+from app.middleware.concurrency_limiter import AdaptiveConcurrencyLimiter, Overloaded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _limiter(clock, max_limit=8, min_limit=2):
+    return AdaptiveConcurrencyLimiter(
+        max_limit=max_limit, min_limit=min_limit, latency_target=2.0, pool_wait_target=0.1, backoff=0.5,
+        clock=clock,
+    )
+
+
+class TestAdmission:
+    """Test slots and shedding."""
+
+    async def test_sheds_when_full(self):
+        clock = FakeClock()
+        limiter = _limiter(clock, max_limit=2)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.admit():
+                await release.wait()
+
+        holders = [asyncio.create_task(hold()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 2
+
+        with pytest.raises(Overloaded) as exc:
+            async with limiter.admit():
+                pass
+        assert exc.value.retry_after >= 1
+
+        release.set()
+        await asyncio.gather(*holders)
+        assert limiter.in_flight == 0
+        assert limiter.snapshot()["shed"] == 1
+
+    async def test_disabled_admits_everything(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=0)
+        async with limiter.admit():
+            async with limiter.admit():
+                assert pool_waits.get() is None and query_times.get() is None
+        assert not limiter.enabled
+
+
+class TestAimd:
+    """Test multiplicative decrease on slowness and additive increase under load."""
+
+    def test_decrease_on_query_latency_once_per_target(self):
+        clock = FakeClock()
+        limiter = _limiter(clock)
+        limiter.record(3.0, 0.0, 3.0, busy=8)
+        limiter.record(3.0, 0.0, 3.0, busy=8)
+        assert limiter.limit == 4
+
+        clock.now += 2
+        limiter.record(3.0, 0.0, 3.0, busy=8)
+        clock.now += 2
+        limiter.record(3.0, 0.0, 3.0, busy=8)
+        # Floor
+        assert limiter.limit == 2
+
+    def test_large_report_with_fast_queries_does_not_shrink(self):
+        clock = FakeClock()
+        limiter = _limiter(clock)
+        # Long because of grouping/serialization, not the database
+        limiter.record(10.0, 0.01, 0.5, busy=8)
+        assert limiter.limit == 8
+        assert limiter.retry_after() == 10
+
+    def test_increase_only_when_slots_are_used(self):
+        clock = FakeClock()
+        limiter = _limiter(clock)
+        limiter.limit = 4.0
+        limiter.record(0.1, 0.0, 0.05, busy=1)
+        assert limiter.limit == 4
+
+        limiter.record(0.1, 0.0, 0.05, busy=2)
+        assert limiter.limit == 4.25
+        for _ in range(100):
+            limiter.record(0.1, 0.0, 0.05, busy=8)
+        assert limiter.limit == 8
+
+    async def test_pool_wait_shrinks_limit(self):
+        clock = FakeClock()
+        limiter = _limiter(clock)
+
+        async def query(wait):
+            # What get_session does while a list is collecting waits
+            pool_waits.get().append(wait)
+
+        async with limiter.admit():
+            # Concurrent fetches (child tasks) report into the same request
+            await asyncio.gather(query(0.01), query(0.5))
+        assert limiter.limit == 4
+        assert pool_waits.get() is None
+
+    async def test_slow_query_shrinks_limit(self):
+        clock = FakeClock()
+        limiter = _limiter(clock)
+
+        async def query(seconds):
+            # What get_session does when the session is closed
+            query_times.get().append(seconds)
+
+        async with limiter.admit():
+            await asyncio.gather(query(0.2), query(2.5))
+        assert limiter.limit == 4
+        assert query_times.get() is None
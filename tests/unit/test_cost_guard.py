@@ -0,0 +1,139 @@
+# tests/unit/test_cost_guard.py
+# Unit tests for the report cost guard and the report job it routes to
+
+import gzip
+from datetime import datetime, timedelta
+
+from app.jobs import worker
+from app.jobs.queue import report_job_params
+from app.jobs.results import get_progress, page_key
+from app.services.cost_guard import ACTION_DIRECT, ACTION_DOWNGRADE, ACTION_JOB, CostGuard
+from app.services.metrics_service import MetricsService
+from app.utils import json_codec
+from app.utils.baselines import parse_baselines
+
+DAY = (datetime(2024, 3, 1), datetime(2024, 3, 2))
+
+
+class FakeRepository:
+    def __init__(self, estimate=0, rows=()):
+        self.estimate = estimate
+        self.rows = list(rows)
+        self.estimated = []
+
+    async def estimate_rows(self, filters, periods):
+        self.estimated.append((filters, periods))
+        return self.estimate
+
+    async def get_metrics_parallel(self, *args):
+        return self.rows, self.rows
+
+
+class FakePartialsCache:
+    async def get(self, key):
+        return None
+
+    async def put(self, key, today, baselines):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.counters = {}
+        self.values = {}
+
+    async def incr(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def get(self, key):
+        return self.values.get(key)
+
+
+def reassemble(redis, job_id, pages):
+    """Rebuild a report dict from its stored NDJSON pages."""
+    report = {}
+    for n in range(pages):
+        line = json_codec.loads(gzip.decompress(redis.values[page_key(job_id, n)]))
+        kind = line.pop("type")
+        if kind == "totals":
+            report.update(line)
+        elif kind == "rows":
+            report.setdefault(f"{line['section']}_rows", []).extend(line["rows"])
+    return report
+
+
+class TestCostGuard:
+    """Test threshold decisions."""
+
+    def test_decide(self):
+        guard = CostGuard(downgrade_rows=1000, job_rows=5000)
+        assert guard.decide(999, "both") == (ACTION_DIRECT, 999, "both")
+        assert guard.decide(1000, "both") == (ACTION_DOWNGRADE, 1000, "1h")
+        assert guard.decide(1000, "5m") == (ACTION_DOWNGRADE, 1000, "1h")
+        # Already coarse: nothing to downgrade
+        assert guard.decide(1000, "1h") == (ACTION_DIRECT, 1000, "1h")
+        assert guard.decide(5000, "1h") == (ACTION_JOB, 5000, "1h")
+
+    def test_thresholds_optional(self):
+        assert not CostGuard().enabled
+        assert CostGuard(job_rows=10).decide(10**9, "both").action == ACTION_JOB
+        assert CostGuard(downgrade_rows=10).decide(10**9, "both").action == ACTION_DOWNGRADE
+
+
+class TestCheckCost:
+    """Test the service's pre-flight check."""
+
+    async def test_disabled_skips_estimate(self):
+        repo = FakeRepository(estimate=10**9)
+        service = MetricsService(repo, guard=CostGuard())
+        decision = await service.check_cost(None, None, None, *DAY, "5m")
+        assert decision == (ACTION_DIRECT, None, "5m")
+        assert repo.estimated == []
+
+    async def test_estimates_all_periods(self):
+        repo = FakeRepository(estimate=2000)
+        service = MetricsService(repo, guard=CostGuard(downgrade_rows=1000, job_rows=5000))
+        decision = await service.check_cost("A%", None, "US", *DAY, "both", parse_baselines("7d"))
+        assert decision == (ACTION_DOWNGRADE, 2000, "1h")
+
+        filters, periods = repo.estimated[0]
+        assert filters == {"customer": "A%", "supplier": None, "destination": "US"}
+        assert list(periods) == ["today", "Y", "W"]
+        assert periods["W"][0] == periods["today"][0] - timedelta(days=7)
+
+
+class TestReportJob:
+    """Test that the job computes the report the request would have served."""
+
+    async def test_job_matches_direct(self, monkeypatch):
+        rows = [
+            {
+                "time": DAY[0] + timedelta(minutes=5 * i), "customer": "AB"[i % 2], "supplier": "XY"[i % 3 % 2],
+                "destination": "US", "start_attempt": 5, "start_uniq_attempt": 4, "start_nuber": i % 4,
+                "seconds": 30 * (i % 5), "pdd": 800 + i, "answer_time": 2,
+            }
+            for i in range(200)
+        ]
+        service = MetricsService(FakeRepository(rows=rows), partials_cache=FakePartialsCache())
+        direct = await service.get_full_metrics_report(None, None, None, *DAY, granularity="1h", limit=1)
+
+        monkeypatch.setattr(worker, "MetricsRepository", lambda: FakeRepository(rows=rows))
+        params = report_job_params(None, None, None, *DAY, granularity="1h", limit=1, baselines="1d")
+        monkeypatch.setattr(worker.settings, "REPORT_JOB_PAGE_ROWS", 7)
+        redis = FakeRedis()
+        manifest = await worker.generate_metrics_report({"redis": redis, "job_id": "j1"}, params)
+        assert redis.counters == {"jobs:started": 1, "jobs:finished": 1}
+        assert manifest["counts"]["main"] == len(direct["main_rows"])
+        assert manifest["pages"] > 2
+        assert (await get_progress(redis, "j1"))["percent"] == 100
+
+        expected = json_codec.loads(json_codec.dumps(direct))
+        for key in ("main_rows", "peer_rows", "hourly_rows", "five_min_rows"):
+            expected.setdefault(key, [])
+        stored = reassemble(redis, "j1", manifest["pages"])
+        for key in ("main_rows", "peer_rows", "hourly_rows", "five_min_rows"):
+            stored.setdefault(key, [])
+        assert stored == expected
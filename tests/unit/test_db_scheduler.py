@@ -0,0 +1,135 @@
+# tests/unit/test_db_scheduler.py
+# Unit tests for weighted fair queuing of DB sessions by priority class
+
+import asyncio
+
+import pytest
+
+from app.db.scheduler import (
+    BACKGROUND, CRAWL, INTERACTIVE, TYPEAHEAD, FairScheduler, db_priority, parse_classes, priority_class,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _hold(scheduler, name, release, order=None):
+    async with scheduler.slot(name):
+        if order is not None:
+            order.append(name)
+        await release.wait()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestReservedSlots:
+    """Test that a class keeps its reserved slots while another floods the pool."""
+
+    async def test_crawl_cannot_take_reserved_slots(self):
+        scheduler = FairScheduler(slots=4, reserved={TYPEAHEAD: 1, INTERACTIVE: 1})
+        release = asyncio.Event()
+        crawls = [asyncio.create_task(_hold(scheduler, CRAWL, release)) for _ in range(5)]
+        await _settle()
+        stats = scheduler.stats()["classes"]
+        assert stats[CRAWL]["in_use"] == 2 and stats[CRAWL]["queued"] == 3
+
+        # Typeahead gets its slot at once, the crawl still queues
+        async with scheduler.slot(TYPEAHEAD):
+            assert scheduler.in_use == 3
+
+        release.set()
+        await asyncio.gather(*crawls)
+        assert scheduler.in_use == 0
+
+    def test_reservations_cut_to_slots(self):
+        scheduler = FairScheduler(slots=2, reserved={INTERACTIVE: 2, TYPEAHEAD: 1})
+        classes = scheduler.stats()["classes"]
+        assert classes[INTERACTIVE]["reserved"] == 2 and classes[TYPEAHEAD]["reserved"] == 0
+
+
+class TestWeightedFairQueuing:
+    """Test grant order between queued classes."""
+
+    async def test_weights_share_contended_slots(self):
+        scheduler = FairScheduler(slots=1, weights={TYPEAHEAD: 4, CRAWL: 1})
+        blocker = asyncio.Event()
+        holder = asyncio.create_task(_hold(scheduler, INTERACTIVE, blocker))
+        await _settle()
+
+        order, release = [], asyncio.Event()
+        release.set()
+        waiters = [asyncio.create_task(_hold(scheduler, CRAWL, release, order)) for _ in range(5)]
+        waiters += [asyncio.create_task(_hold(scheduler, TYPEAHEAD, release, order)) for _ in range(5)]
+        await _settle()
+        assert scheduler.stats()["classes"][CRAWL]["queued"] == 5
+
+        blocker.set()
+        await asyncio.gather(holder, *waiters)
+        # Typeahead (4x the weight) goes first though the crawl queued first
+        assert order[:5].count(TYPEAHEAD) >= 4
+        assert sorted(order) == sorted([CRAWL] * 5 + [TYPEAHEAD] * 5)
+
+    async def test_wait_time_per_class(self):
+        clock = FakeClock()
+        scheduler = FairScheduler(slots=1, clock=clock)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(scheduler, INTERACTIVE, release))
+        await _settle()
+        waiter = asyncio.create_task(_hold(scheduler, CRAWL, asyncio.Event()))
+        await _settle()
+
+        clock.now += 0.25
+        release.set()
+        await _settle()
+        crawl = scheduler.stats()["classes"][CRAWL]
+        assert crawl["in_use"] == 1 and crawl["queued"] == 0
+        assert crawl["wait_max_ms"] == 250.0
+        waiter.cancel()
+        await asyncio.gather(holder, waiter, return_exceptions=True)
+        assert scheduler.in_use == 0
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        scheduler = FairScheduler(slots=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(scheduler, INTERACTIVE, release))
+        await _settle()
+        waiter = asyncio.create_task(_hold(scheduler, BACKGROUND, release))
+        await _settle()
+        waiter.cancel()
+        await _settle()
+        assert scheduler.stats()["classes"][BACKGROUND]["queued"] == 0
+
+        release.set()
+        await holder
+        assert scheduler.in_use == 0
+
+
+class TestPriorityClass:
+    """Test class selection and configuration parsing."""
+
+    async def test_context_sets_class(self):
+        scheduler = FairScheduler(slots=2)
+        with priority_class(TYPEAHEAD):
+            async with scheduler.slot():
+                assert scheduler.stats()["classes"][TYPEAHEAD]["in_use"] == 1
+        assert db_priority.get() == INTERACTIVE
+
+    async def test_disabled_passes_through(self):
+        scheduler = FairScheduler(slots=0)
+        async with scheduler.slot(CRAWL):
+            assert scheduler.in_use == 0
+
+    def test_parse_classes(self):
+        assert parse_classes("typeahead=8, crawl=0.5") == {TYPEAHEAD: 8.0, CRAWL: 0.5}
+        with pytest.raises(ValueError):
+            parse_classes("bulk=1")
+        with pytest.raises(ValueError):
+            priority_class("bulk").__enter__()
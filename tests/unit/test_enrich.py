@@ -0,0 +1,67 @@
+# tests/unit/test_enrich.py
+# Unit tests for yesterday enrichment: the columnar path must equal the scalar one
+
+import random
+
+import pytest
+
+from app.utils import enrich
+from app.utils.enrich import _enrich_columnar, _enrich_scalar, _round1
+
+np = pytest.importorskip("numpy")
+
+
+def _rows(n, seed, drop):
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        if rnd.random() < drop:
+            continue
+        out.append({
+            "main": f"C{i % 7}", "peer": f"S{i // 7 % 5}", "destination": "US",
+            "time": f"2024-01-01 {i % 24:02d}:00",
+            "Min": round(rnd.random() * 100, 1), "ACD": rnd.choice([0.0, 1.5, 2.25, None]),
+            "ASR": round(rnd.random() * 100, 1), "PDD": rnd.choice([0, 0.5, 3.3]),
+            "ATime": round(rnd.random() * 9, 1), "SCall": rnd.randint(0, 5), "TCall": rnd.randint(0, 9),
+        })
+    return out
+
+
+class TestColumnarEnrichment:
+    """Test that array enrichment is value- and type-identical to the scalar loop."""
+
+    @pytest.mark.parametrize("key_fields, extra", [
+        (["main", "destination"], ()),
+        (["main", "peer", "destination", "time"], ("time",)),
+        (["main"], ()),
+    ])
+    def test_matches_scalar(self, key_fields, extra):
+        today, yesterday = _rows(400, 1, 0.1), _rows(400, 2, 0.4)
+        periods = [("Y", "", yesterday)]
+        expected = _enrich_scalar(today, periods, key_fields, extra)
+        got = _enrich_columnar(today, periods, key_fields, extra)
+        assert got == expected
+        assert [list(r) for r in got] == [list(r) for r in expected]
+        assert [[type(v) for v in r.values()] for r in got] == [[type(v) for v in r.values()] for r in expected]
+
+    def test_no_yesterday(self):
+        today = _rows(50, 3, 0)
+        periods = [("Y", "", [])]
+        assert _enrich_columnar(today, periods, ["main", "peer"]) == _enrich_scalar(today, periods, ["main", "peer"])
+
+    def test_dispatch(self, monkeypatch):
+        today = _rows(40, 4, 0)
+        monkeypatch.setattr(enrich, "HAVE_NUMPY", False)
+        assert enrich.enrich_rows(today, today, ["main"]) == _enrich_scalar(today, [("Y", "", today)], ["main"])
+
+    def test_extra_baselines(self):
+        today = _rows(200, 5, 0.1)
+        week, month = _rows(200, 6, 0.5), _rows(200, 7, 0.2)
+        got = enrich.enrich_rows(today, today, ["main", "peer"], baselines=[("W", week), ("M", month)])
+        periods = [("Y", "", today), ("W", "_W", week), ("M", "_M", month)]
+        assert got == _enrich_scalar(today, periods, ["main", "peer"])
+        assert list(got[0])[2:9] == ["Min", "YMin", "Min_delta", "WMin", "Min_delta_W", "MMin", "Min_delta_M"]
+
+    def test_round1_ties(self):
+        values = [k / 100 for k in range(-3000, 3000)] + [0.25, 0.35, 1.15, 2.675, -0.05, 1e6 + 0.05]
+        assert _round1(np.asarray(values)) == [round(v, 1) for v in values]
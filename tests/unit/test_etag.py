@@ -0,0 +1,126 @@
+# tests/unit/test_etag.py
+# Unit tests for report ETags and the data watermark cache
+
+import asyncio
+from datetime import datetime
+
+from app.db.base import pool_waits
+from app.middleware.circuit_breaker import deadline, time_left
+from app.services.watermark_service import DataWatermark
+from app.utils.etag import build_etag, etag_matches
+
+
+class FakeWatermarkRepository:
+    def __init__(self):
+        self.marks = {"sonus_aggregation_new": (datetime(2024, 1, 2, 10, 5), 7)}
+        self.calls = 0
+
+    async def get_all(self):
+        self.calls += 1
+        return dict(self.marks)
+
+
+class TestBuildEtag:
+    """Test ETag construction and If-None-Match matching."""
+
+    def test_stable_for_same_inputs(self):
+        params = {"customer": "a", "from": "2024-01-01"}
+        assert build_etag(params, "w1") == build_etag(dict(reversed(params.items())), "w1")
+
+    def test_changes_with_params_and_watermark(self):
+        base = build_etag({"customer": "a"}, "w1")
+        assert base != build_etag({"customer": "b"}, "w1")
+        assert base != build_etag({"customer": "a"}, "w2")
+
+    def test_no_watermark_no_etag(self):
+        assert build_etag({"customer": "a"}, None) is None
+
+    def test_matches(self):
+        etag = build_etag({"customer": "a"}, "w1")
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", W/{etag}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"other"', etag)
+        assert not etag_matches(None, etag)
+
+
+class TestDataWatermark:
+    """Test lazy refresh and local bumps."""
+
+    async def test_token_after_refresh(self):
+        repo = FakeWatermarkRepository()
+        wm = DataWatermark(repository=repo, refresh_interval=60)
+        assert wm.token() is None
+        await wm._refresh_task
+        first = wm.token()
+        assert first is not None
+        assert repo.calls == 1
+
+        repo.marks["sonus_aggregation_new"] = (datetime(2024, 1, 2, 10, 10), 8)
+        # Still within the refresh interval: cached token, no DB call
+        assert wm.token() == first
+        await wm.refresh()
+        assert wm.token() != first
+
+    async def test_bump_changes_token(self):
+        wm = DataWatermark(repository=FakeWatermarkRepository(), refresh_interval=60)
+        await wm.refresh()
+        before = wm.token()
+        wm.bump("metrics")
+        assert wm.token() != before
+
+    async def test_bumps_folded_into_newer_count(self):
+        repo = FakeWatermarkRepository()
+        repo.marks["metrics"] = (None, 3)
+        writer = DataWatermark(repository=repo, refresh_interval=60)
+        other = DataWatermark(repository=repo, refresh_interval=60)
+        await writer.refresh()
+        await other.refresh()
+
+        writer.bump("metrics")
+        assert writer.token() != other.token()
+        # Same count: the write is not visible yet, the bump stays
+        await writer.refresh()
+        assert writer.token() != other.token()
+
+        # The trigger counted the write: all processes agree again
+        repo.marks["metrics"] = (None, 4)
+        await writer.refresh()
+        await other.refresh()
+        assert writer.token() == other.token()
+
+    async def test_refresh_failure_keeps_last_token(self):
+        repo = FakeWatermarkRepository()
+        wm = DataWatermark(repository=repo, refresh_interval=0)
+        await wm.refresh()
+        before = wm.token()
+
+        async def boom():
+            raise RuntimeError("db down")
+
+        repo.get_all = boom
+        wm.token()
+        await wm._refresh_task
+        assert wm.token() == before
+
+    async def test_refresh_outlives_request_deadline(self):
+        repo = FakeWatermarkRepository()
+        seen = []
+
+        async def get_all():
+            # What get_session checks before it connects
+            seen.append((time_left(), pool_waits.get()))
+            return dict(repo.marks)
+
+        repo.get_all = get_all
+        wm = DataWatermark(repository=repo, refresh_interval=0)
+        token = pool_waits.set([])
+        try:
+            with deadline(0.001):
+                await asyncio.sleep(0.01)
+                assert wm.token() is None  # schedules the refresh
+        finally:
+            pool_waits.reset(token)
+        await wm._refresh_task
+        assert seen == [(None, None)]
+        assert wm.token() is not None
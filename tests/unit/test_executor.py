@@ -0,0 +1,135 @@
+# tests/unit/test_executor.py
+# Unit tests for the bounded report executor
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.metrics_service import MetricsService
+from app.utils.executor import BoundedExecutor, ExecutorBusy
+
+
+def _spin(seconds: float) -> int:
+    """Pure-Python CPU work holding the GIL."""
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+async def _max_lag(work) -> float:
+    """Largest gap between 1 ms ticks of the event loop while `work` runs."""
+    done = False
+    lag = 0.0
+
+    async def ticker():
+        nonlocal lag
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            lag = max(lag, now - last - 0.001)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.005)
+    try:
+        await work
+    finally:
+        done = True
+        await task
+    return lag
+
+
+class TestBoundedExecutor:
+    """Test pool selection, admission limit and event-loop lag."""
+
+    async def test_runs_off_loop_thread(self):
+        ex = BoundedExecutor("thread", workers=2)
+        assert await ex.run(threading.get_ident) != threading.get_ident()
+        assert await BoundedExecutor("inline").run(threading.get_ident) == threading.get_ident()
+        ex.shutdown()
+
+    async def test_queue_limit(self):
+        ex = BoundedExecutor("thread", workers=1, max_queue=1, retry_after=3)
+        release = threading.Event()
+        running = [asyncio.ensure_future(ex.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorBusy) as busy:
+            await ex.run(int)
+        assert busy.value.retry_after == 3
+        assert ex.stats()["pending"] == 2 and ex.stats()["rejected"] == 1
+
+        release.set()
+        await asyncio.gather(*running)
+        assert await ex.run(int, "7") == 7
+        ex.shutdown()
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError):
+            BoundedExecutor("fibers")
+
+    async def test_loop_lag_bounded(self):
+        inline = await _max_lag(BoundedExecutor("inline").run(_spin, 0.2))
+        ex = BoundedExecutor("thread", workers=1)
+        threaded = await _max_lag(ex.run(_spin, 0.2))
+        ex.shutdown()
+        assert inline > 0.15
+        # Bounded by the interpreter switch interval (5 ms), with slack for slow CI hosts
+        assert threaded < 0.05
+
+    async def test_process_mode(self):
+        ex = BoundedExecutor("process", workers=1)
+        try:
+            assert await ex.run(pow, 2, 10) == 1024
+            # threaded stages stay in this process
+            assert await ex.run(threading.get_ident, threaded=True) != threading.get_ident()
+        finally:
+            ex.shutdown()
+
+
+class FakeRepository:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def get_metrics_parallel(self, *args):
+        return self.rows, self.rows[::2]
+
+
+class FakePartialsCache:
+    async def get(self, key):
+        return None
+
+    async def put(self, key, today, baselines):
+        pass
+
+
+class TestReportOnExecutor:
+    """Test that reports computed on a process pool equal inline ones."""
+
+    async def test_process_matches_inline(self, monkeypatch):
+        base = datetime(2024, 1, 1)
+        rows = [
+            {
+                "time": base + timedelta(minutes=i), "customer": "AB"[i % 2], "supplier": "XYZ"[i % 3],
+                "destination": "US", "start_attempt": 5 + i % 3, "start_uniq_attempt": 4, "start_nuber": i % 4,
+                "seconds": 30 * (i % 5), "pdd": 800 + i, "answer_time": 2 + i % 3,
+            }
+            for i in range(300)
+        ]
+        service = MetricsService(FakeRepository(rows), partials_cache=FakePartialsCache())
+        day = (base, base + timedelta(days=1))
+
+        monkeypatch.setattr("app.services.metrics_service.cpu_executor", BoundedExecutor("inline"))
+        inline = await service.get_full_metrics_report(None, None, None, *day, sort="Min", limit=2)
+
+        ex = BoundedExecutor("process", workers=1)
+        monkeypatch.setattr("app.services.metrics_service.cpu_executor", ex)
+        try:
+            assert await service.get_full_metrics_report(None, None, None, *day, sort="Min", limit=2) == inline
+        finally:
+            ex.shutdown()
@@ -0,0 +1,128 @@
+# tests/unit/test_fetch_slices.py
+# Unit tests for range-split fetching: slices select the same rows in time order
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.repositories import metrics_repository
+from app.repositories.metrics_repository import MetricsRepository, split_period
+
+DAY = (datetime(2024, 3, 1), datetime(2024, 3, 2))
+
+
+@pytest.fixture
+def rows():
+    base = datetime(2024, 2, 28)
+    return [
+        {"time": base + timedelta(minutes=5 * (i // 3)), "customer": "ABC"[i % 3], "start_attempt": i}
+        for i in range(3 * 4 * 288)
+    ]
+
+
+@pytest.fixture
+def slicing(monkeypatch):
+    monkeypatch.setattr(settings, "FETCH_SLICES", 4)
+    monkeypatch.setattr(settings, "FETCH_SLICE_MIN_SECONDS", 3600)
+    monkeypatch.setattr(settings, "FETCH_POOL_RESERVE", 2)
+    monkeypatch.setattr(metrics_repository, "pool_headroom", lambda: 20)
+
+
+class FakeRepository(MetricsRepository):
+    """Answers get_metrics/_query_multi_period from memory and tracks concurrent queries."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.running = 0
+        self.peak = 0
+        self.queries = 0
+
+    def _select(self, t0, t1):
+        return [dict(r) for r in self.rows if t0 <= r["time"] <= t1]
+
+    async def _run(self, result):
+        self.queries += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.001)
+        self.running -= 1
+        return result
+
+    async def get_metrics(self, filters, limit):
+        return await self._run(self._select(filters["time_from"], filters["time_to"]))
+
+    async def _query_multi_period(self, filters, periods):
+        return await self._run({name: self._select(t0, t1) for name, (t0, t1) in periods.items()})
+
+
+class TestSplitPeriod:
+    """Test that slices tile an inclusive range."""
+
+    def test_contiguous(self):
+        slices = split_period(*DAY, 3)
+        assert len(slices) == 3
+        assert slices[0][0] == DAY[0] and slices[-1][1] == DAY[1]
+        for (_, end), (start, _) in zip(slices, slices[1:]):
+            assert start - end == timedelta(microseconds=1)
+        assert slices[1][0] == DAY[0] + timedelta(hours=8)
+
+    def test_single(self):
+        assert split_period(*DAY, 1) == [DAY]
+
+
+class TestSliceCount:
+    """Test that K adapts to range length and pool headroom."""
+
+    def test_disabled_by_default(self):
+        assert settings.FETCH_SLICES == 1
+        assert MetricsRepository._slice_count(*DAY, queries=2) == 1
+
+    def test_bounds(self, slicing, monkeypatch):
+        assert MetricsRepository._slice_count(*DAY, queries=2) == 4
+        # 2 hours: at most two 1-hour slices
+        assert MetricsRepository._slice_count(DAY[0], DAY[0] + timedelta(hours=2), queries=2) == 2
+        # 8 free connections minus reserve 2, shared by 2 periods
+        monkeypatch.setattr(metrics_repository, "pool_headroom", lambda: 8)
+        assert MetricsRepository._slice_count(*DAY, queries=2) == 3
+        # Busy pool: no splitting
+        monkeypatch.setattr(metrics_repository, "pool_headroom", lambda: 1)
+        assert MetricsRepository._slice_count(*DAY, queries=2) == 1
+
+
+class TestSlicedFetch:
+    """Test that sliced fetches equal single queries."""
+
+    async def test_parallel(self, rows, slicing):
+        repo = FakeRepository(rows)
+        y = (DAY[0] - timedelta(days=1), DAY[1] - timedelta(days=1))
+        today, yesterday = await repo.get_metrics_parallel({}, *DAY, *y)
+        assert repo.queries == 8 and repo.peak == 8
+        assert today == repo._select(*DAY)
+        assert yesterday == repo._select(*y)
+
+    async def test_multi_period(self, rows, slicing):
+        repo = FakeRepository(rows)
+        periods = {"today": DAY, "W": (DAY[0] - timedelta(days=1), DAY[1] - timedelta(days=1))}
+        out = await repo.get_metrics_multi_period({}, periods)
+        assert repo.queries == 4
+        assert out == {name: repo._select(*p) for name, p in periods.items()}
+
+    async def test_unsliced(self, rows):
+        repo = FakeRepository(rows)
+        out = await repo.get_metrics_multi_period({}, {"today": DAY})
+        assert repo.queries == 1
+        assert out["today"] == repo._select(*DAY)
+
+    async def test_per_period(self, rows, slicing):
+        repo = FakeRepository(rows)
+        periods = {
+            "today": DAY,
+            "Y": (DAY[0] - timedelta(days=1), DAY[1] - timedelta(days=1)),
+            "W": (DAY[0] - timedelta(days=2), DAY[1] - timedelta(days=2)),
+        }
+        out = await repo.get_metrics_per_period({}, periods)
+        # (20 free - 2 reserved) // 3 periods = 6, capped at 4 slices each
+        assert repo.queries == 12 and repo.peak == 12
+        assert out == {name: repo._select(*p) for name, p in periods.items()}
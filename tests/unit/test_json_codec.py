@@ -0,0 +1,51 @@
+# tests/unit/test_json_codec.py
+# Unit tests for the pluggable JSON encoder
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.utils import json_codec
+
+
+@pytest.fixture
+def payload():
+    return {
+        "time": datetime(2024, 1, 2, 10, 5, tzinfo=timezone.utc),
+        "naive": datetime(2024, 1, 2, 10, 5),
+        "pdd": Decimal("12.50"),
+        "rows": [{"main": "Yemen Republic Mobile Yementel", "Min": 1.5, "TCall": 3}],
+        1: "int key",
+    }
+
+
+class TestJsonCodec:
+    """Test encoder output and stdlib fallback parity."""
+
+    def test_native_types(self, payload):
+        out = json_codec.loads(json_codec.dumps(payload))
+        assert out["time"] == "2024-01-02T10:05:00+00:00"
+        assert out["naive"] == "2024-01-02T10:05:00"
+        assert out["pdd"] == 12.5
+        assert out["1"] == "int key"
+
+    def test_fallback_matches_fast_path(self, payload, monkeypatch):
+        fast = json_codec.dumps(payload)
+        monkeypatch.setattr(json_codec, "HAVE_ORJSON", False)
+        assert json_codec.dumps(payload) == fast
+
+    def test_chunked_matches_dumps(self, payload, monkeypatch):
+        # Int-keyed dicts are encoded whole; str-keyed ones are walked into their lists
+        data = {"mixed": payload, "report": {"rows": payload["rows"] * 25, "empty": []}, "ids": list(range(10))}
+        assert json_codec.dumps_chunked(data, chunk=4) == json_codec.dumps(data)
+        monkeypatch.setattr(json_codec, "HAVE_ORJSON", False)
+        assert json_codec.dumps_chunked(data, chunk=4) == json_codec.dumps(data)
+
+    def test_numpy_scalars(self, monkeypatch):
+        np = pytest.importorskip("numpy")
+        data = {"a": np.int64(3), "b": np.float64(1.5), "c": np.array([1, 2])}
+        fast = json_codec.dumps(data)
+        assert json_codec.loads(fast) == {"a": 3, "b": 1.5, "c": [1, 2]}
+        monkeypatch.setattr(json_codec, "HAVE_ORJSON", False)
+        assert json_codec.dumps(data) == fast
@@ -0,0 +1,158 @@
+# tests/unit/test_partials.py
+# Unit tests for per-bucket partial sums and the lazy drill-down path
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.middleware.circuit_breaker import deadline, time_left
+from app.services.metrics_service import MetricsService
+from app.utils.grouped import (
+    aggregate_grouped, aggregate_hourly, aggregate_5min,
+    finalize_main, finalize_peer, finalize_hourly, finalize_5min,
+)
+from app.utils.partials import (
+    _decode, _encode, build_partials, partials_to_grouped, partials_to_series, to_epoch,
+)
+from app.utils.topn import OTHER_LABEL
+
+
+@pytest.fixture
+def rows():
+    base = datetime(2024, 1, 1, 10, 0)
+    out = []
+    for i in range(120):
+        t = base + timedelta(minutes=i * 3)
+        out.append({
+            # Mix naive, aware and string timestamps like the real drivers return
+            "time": t if i % 3 == 0 else (t.replace(tzinfo=timezone.utc) if i % 3 == 1 else t.isoformat(sep=" ")),
+            "customer": "AB"[i % 2], "supplier": "XYZ"[i % 3], "destination": "US",
+            "start_attempt": 10 + i % 7, "start_uniq_attempt": 8, "start_nuber": i % 5,
+            "seconds": 60 * (i % 9), "pdd": 1000 + i, "answer_time": 3 + i % 4,
+        })
+    out.append({**out[0], "time": None})  # counted in totals/groups, not in series
+    return out
+
+
+class FakePartialsCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def put(self, key, today, baselines):
+        self.data[key] = (_decode(_encode(today)), {p: _decode(_encode(b)) for p, b in baselines.items()})
+
+
+class FakeRepository:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    async def get_metrics_parallel(self, filters, *args):
+        self.calls.append(filters)
+        selected = [
+            r for r in self.rows
+            if all(not filters.get(k) or r[k] == filters[k] for k in ("customer", "supplier", "destination"))
+        ]
+        return selected, []
+
+
+class TestPartials:
+    """Test that partials reproduce the direct aggregations."""
+
+    @pytest.mark.parametrize("reverse", [False, True])
+    def test_matches_direct_aggregation(self, rows, reverse):
+        partials = build_partials(rows, reverse=reverse)
+        main_agg, peer_agg = aggregate_grouped(rows, reverse=reverse)
+        p_main, p_peer = partials_to_grouped(partials)
+        assert finalize_main(p_main) == finalize_main(main_agg)
+        assert finalize_peer(p_peer) == finalize_peer(peer_agg)
+        assert finalize_hourly(partials_to_series(partials, "1h")) == finalize_hourly(aggregate_hourly(rows, reverse))
+        assert finalize_5min(partials_to_series(partials, "5m")) == finalize_5min(aggregate_5min(rows, reverse))
+
+    def test_window(self, rows):
+        partials = build_partials(rows)
+        t0 = to_epoch(datetime(2024, 1, 1, 11, 0))
+        _, peer_agg = partials_to_grouped(partials, t0=t0, t1=t0 + 3600)
+        # Rows are 3 minutes apart from 10:00, so 11:00-12:00 is rows 20..39
+        assert sum(a["attempt"] for a in peer_agg.values()) == sum(r["start_attempt"] for r in rows[20:40])
+
+    def test_encode_roundtrip(self, rows):
+        partials = build_partials(rows)
+        assert _decode(_encode(partials)) == partials
+
+
+class TestLazyDrillDown:
+    """Test lazy reports and per-group series."""
+
+    async def test_series_matches_full_report(self, rows):
+        cache = FakePartialsCache()
+        service = MetricsService(FakeRepository(rows), partials_cache=cache)
+        args = (None, None, None, datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+        full = await service.get_full_metrics_report(*args)
+        lazy = await service.get_full_metrics_report(*args, lazy=True)
+        assert lazy["lazy"] is True
+        assert lazy["hourly_rows"] == [] and lazy["five_min_rows"] == []
+        assert lazy["peer_rows"] == full["peer_rows"]
+        assert lazy["labels"] == full["labels"]
+
+        series = await service.get_series(*args, main="A", peer="X", dest="US")
+        assert series["hourly_rows"] == [r for r in full["hourly_rows"] if (r["main"], r["peer"]) == ("A", "X")]
+        assert series["five_min_rows"] == [r for r in full["five_min_rows"] if (r["main"], r["peer"]) == ("A", "X")]
+
+    async def test_report_does_not_wait_for_partials_write(self, rows):
+        class SlowPartialsCache(FakePartialsCache):
+            def __init__(self):
+                super().__init__()
+                self.release = asyncio.Event()
+
+            async def put(self, key, today, baselines):
+                await self.release.wait()
+                await super().put(key, today, baselines)
+
+        cache = SlowPartialsCache()
+        service = MetricsService(FakeRepository(rows), partials_cache=cache)
+        report = await service.get_full_metrics_report(None, None, None, datetime(2024, 1, 1), datetime(2024, 1, 2))
+        assert report["peer_rows"] and cache.data == {}
+
+        cache.release.set()
+        await asyncio.gather(*service._writes)
+        assert len(cache.data) == 1 and not service._writes
+
+    async def test_partials_write_outlives_request_deadline(self, rows):
+        class DeadlineCheckingCache(FakePartialsCache):
+            async def put(self, key, today, baselines):
+                # Still writing when the request's deadline passes; the Redis
+                # cache checks time_left() before each call
+                await asyncio.sleep(0.3)
+                time_left()
+                await super().put(key, today, baselines)
+
+        cache = DeadlineCheckingCache()
+        service = MetricsService(FakeRepository(rows), partials_cache=cache)
+        with deadline(0.2):
+            await service.get_full_metrics_report(None, None, None, datetime(2024, 1, 1), datetime(2024, 1, 2))
+        await asyncio.gather(*service._writes)
+        assert len(cache.data) == 1
+
+    async def test_cache_miss_narrows_fetch(self, rows):
+        repo = FakeRepository(rows)
+        service = MetricsService(repo, partials_cache=FakePartialsCache())
+        series = await service.get_series(
+            None, None, None, datetime(2024, 1, 1), datetime(2024, 1, 2),
+            main="X", peer="B", dest="US", reverse=True, granularity="1h",
+        )
+        assert repo.calls[-1] == {"customer": "B", "supplier": "X", "destination": "US"}
+        assert series["hourly_rows"] and series["five_min_rows"] == []
+        assert {(r["main"], r["peer"]) for r in series["hourly_rows"]} == {("X", "B")}
+
+    async def test_other_series(self, rows):
+        service = MetricsService(FakeRepository(rows), partials_cache=FakePartialsCache())
+        args = (None, None, None, datetime(2024, 1, 1), datetime(2024, 1, 2))
+        full = await service.get_full_metrics_report(*args, limit=2)
+        series = await service.get_series(*args, main=OTHER_LABEL, peer=OTHER_LABEL, dest=OTHER_LABEL, limit=2)
+        assert series["hourly_rows"] == [r for r in full["hourly_rows"] if r["peer"] == OTHER_LABEL]
@@ -0,0 +1,134 @@
+# tests/unit/test_query_planner.py
+# Unit tests for the fetch strategy planner (EWMA + epsilon-greedy per query shape)
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import query_planner as planner_module
+from app.services.query_planner import QueryPlanner, query_shape
+
+DAY = (datetime(2024, 3, 1), datetime(2024, 3, 2))
+PERIODS = {"today": DAY, "Y": (DAY[0] - timedelta(days=1), DAY[1] - timedelta(days=1))}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRepository:
+    """Both strategies return the same rows; each advances the clock by its cost."""
+
+    def __init__(self, clock, union_cost, parallel_cost):
+        self.clock = clock
+        self.union_cost = union_cost
+        self.parallel_cost = parallel_cost
+        self.calls = []
+
+    async def get_metrics_multi_period(self, filters, periods):
+        self.calls.append("union")
+        self.clock.now += self.union_cost
+        return {name: [{"time": t0}] for name, (t0, _) in periods.items()}
+
+    async def get_metrics_parallel(self, filters, t0, t1, y0, y1):
+        self.calls.append("parallel")
+        self.clock.now += self.parallel_cost
+        return [{"time": t0}], [{"time": y0}]
+
+
+class ParallelOnlyRepository:
+    async def get_metrics_parallel(self, filters, t0, t1, y0, y1):
+        return [], []
+
+
+@pytest.fixture(autouse=True)
+def idle_pool(monkeypatch):
+    monkeypatch.setattr(planner_module, "pool_headroom", lambda: 20)
+
+
+def _planner(clock, epsilon=0.0):
+    planner = QueryPlanner(epsilon=epsilon, alpha=0.5, rng=random.Random(1), clock=clock)
+    planner.register("parallel", planner_module._fetch_parallel, planner_module._supports_parallel)
+    planner.register("union", planner_module._fetch_union, planner_module._supports_union)
+    return planner
+
+
+class TestQueryShape:
+    """Test the planner key of a fetch."""
+
+    def test_shape(self, monkeypatch):
+        assert query_shape({"customer": "A", "supplier": "B%"}, PERIODS) == "32h|ep-|p2|free"
+        week = {"today": (DAY[0], DAY[0] + timedelta(days=7))}
+        assert query_shape({}, week) == "256h|---|p1|free"
+        monkeypatch.setattr(planner_module, "pool_headroom", lambda: 0)
+        assert query_shape({}, PERIODS).endswith("|busy")
+
+
+class TestQueryPlanner:
+    """Test exploration, EWMA updates and convergence to the faster strategy."""
+
+    def test_ewma(self):
+        planner = _planner(FakeClock())
+        planner.record("s", "union", 1.0)
+        planner.record("s", "union", 3.0)
+        stats = planner.snapshot()["shapes"]["s"]["union"]
+        assert stats == {"ewma_ms": 2000.0, "count": 2, "last_ms": 3000.0}
+
+    def test_choose(self):
+        planner = _planner(FakeClock())
+        assert planner.choose("s", ["parallel", "union"]) == ("parallel", True)
+        planner.record("s", "parallel", 2.0)
+        assert planner.choose("s", ["parallel", "union"]) == ("union", True)
+        planner.record("s", "union", 1.0)
+        assert planner.choose("s", ["parallel", "union"]) == ("union", False)
+
+        planner.epsilon = 1.0
+        picks = {planner.choose("s", ["parallel", "union"]) for _ in range(50)}
+        assert picks == {("parallel", True), ("union", True)}
+
+    async def test_converges(self):
+        clock = FakeClock()
+        repo = FakeRepository(clock, union_cost=0.5, parallel_cost=0.2)
+        planner = _planner(clock)
+        for _ in range(5):
+            rows = await planner.fetch(repo, {}, PERIODS)
+            assert rows == {"today": [{"time": DAY[0]}], "Y": [{"time": PERIODS["Y"][0]}]}
+        assert repo.calls == ["parallel", "union", "parallel", "parallel", "parallel"]
+
+        # Parallel gets slower (e.g. pool contention): the planner switches
+        repo.parallel_cost = 2.0
+        for _ in range(3):
+            await planner.fetch(repo, {}, PERIODS)
+        assert repo.calls[-1] == "union"
+
+        snapshot = planner.snapshot()
+        assert snapshot["strategies"] == ["parallel", "union"]
+        assert [d["strategy"] for d in snapshot["decisions"][:2]] == ["parallel", "union"]
+        assert snapshot["decisions"][1]["explored"] and snapshot["decisions"][1]["ms"] == 500.0
+
+    async def test_unsupported_strategies_skipped(self):
+        planner = _planner(FakeClock())
+        await planner.fetch(ParallelOnlyRepository(), {}, PERIODS)
+        await planner.fetch(ParallelOnlyRepository(), {}, PERIODS)
+        assert [d["strategy"] for d in planner.snapshot()["decisions"]] == ["parallel", "parallel"]
+        with pytest.raises(RuntimeError):
+            await planner.fetch(ParallelOnlyRepository(), {}, {**PERIODS, "W": DAY})
+
+    async def test_register(self):
+        clock = FakeClock()
+        planner = _planner(clock)
+
+        async def rollup(repo, filters, periods):
+            clock.now += 0.01
+            return {name: [] for name in periods}
+
+        planner.register("rollup", rollup)
+        repo = FakeRepository(clock, union_cost=0.5, parallel_cost=0.2)
+        for _ in range(4):
+            await planner.fetch(repo, {}, PERIODS)
+        assert planner.snapshot()["decisions"][-1]["strategy"] == "rollup"
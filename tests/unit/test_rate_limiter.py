@@ -0,0 +1,277 @@
+# tests/unit/test_rate_limiter.py
+# Unit tests for the Redis-backed sliding window and the cost-based rate limiter
+
+import asyncio
+import math
+
+from fastapi import FastAPI, Header, Response
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.rate_limiter import (
+    RateLimitMiddleware, RedisSlidingWindow, SlidingWindowCounter, TokenBucket, drilldown_cost, make_limiter,
+    register_cost, report_cost, request_cost,
+)
+
+
+class FakeRedis:
+    """Evaluates the reserve script on a dict, like the Lua script does on Redis."""
+
+    def __init__(self, delay=0.0):
+        self.counters = {}
+        self.calls = 0
+        self.delay = delay
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.calls += 1
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            limit, weight, want, _ttl = args
+            curr, prev = self.counters.get(keys[0], 0), self.counters.get(keys[1], 0)
+            used = prev * weight + curr
+            granted = max(0, min(want, math.floor(limit - used)))
+            self.counters[keys[0]] = curr + granted
+            return [granted, max(0, math.floor(limit - used - granted))]
+        return run
+
+
+class FakeClock:
+    def __init__(self, now=1_000_020.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _limiter(redis, clock, max_requests=10, prefetch=3, **kwargs):
+    return RedisSlidingWindow(
+        window_size=60, max_requests=max_requests, prefetch=prefetch, timeout=0.05,
+        failover_seconds=5, client=redis, clock=clock, **kwargs,
+    )
+
+
+class TestRedisSlidingWindow:
+    """Test the shared limit, local pre-fetching and failover."""
+
+    async def test_limit_shared_by_processes(self):
+        redis, clock = FakeRedis(), FakeClock()
+        workers = [_limiter(redis, clock) for _ in range(3)]
+
+        allowed = [(await workers[i % 3].acquire("1.2.3.4"))[0] for i in range(30)]
+        # Never more than the limit in total, whatever process served the request
+        assert sum(allowed) <= 10
+        assert allowed[:9] == [True] * 9
+
+    async def test_prefetch_saves_round_trips(self):
+        redis, clock = FakeRedis(), FakeClock()
+        limiter = _limiter(redis, clock, max_requests=100, prefetch=5)
+
+        for _ in range(20):
+            assert (await limiter.acquire("c"))[0]
+        assert redis.calls == 4
+        assert limiter.stats == {"local": 16, "redis": 4, "fallback": 0}
+
+    async def test_remaining_counts_local_permits(self):
+        limiter = _limiter(FakeRedis(), FakeClock(), max_requests=10, prefetch=3)
+        assert await limiter.acquire("c") == (True, 9)
+        assert await limiter.acquire("c") == (True, 8)
+
+    async def test_denial_cached(self):
+        redis, clock = FakeRedis(), FakeClock()
+        limiter = _limiter(redis, clock, max_requests=2, prefetch=2)
+        await limiter.acquire("c")
+        await limiter.acquire("c")
+
+        assert await limiter.acquire("c") == (False, 0)
+        calls = redis.calls
+        assert await limiter.acquire("c") == (False, 0)
+        assert redis.calls == calls
+
+    async def test_new_window_new_lease(self):
+        redis, clock = FakeRedis(), FakeClock()
+        limiter = _limiter(redis, clock, max_requests=100, prefetch=5)
+        await limiter.acquire("c")
+        clock.now += 60
+        await limiter.acquire("c")
+        assert redis.calls == 2
+
+    async def test_slow_redis_fails_over(self):
+        redis, clock = FakeRedis(delay=0.2), FakeClock()
+        limiter = _limiter(redis, clock, max_requests=2)
+
+        assert await limiter.acquire("c") == (True, 1)
+        assert await limiter.acquire("c") == (True, 0)
+        assert (await limiter.acquire("c"))[0] is False
+        # Redis is skipped until the failover period ends
+        assert redis.calls == 1
+        assert limiter.stats["fallback"] == 3
+
+        redis.delay = 0
+        clock.now += 5
+        await limiter.acquire("other")
+        assert redis.calls == 2 and limiter.stats["redis"] == 1
+
+    async def test_cleanup(self):
+        clock = FakeClock()
+        limiter = _limiter(FakeRedis(), clock, max_requests=1, prefetch=1)
+        await limiter.acquire("a")
+        await limiter.acquire("a")
+        clock.now += 120
+        limiter.cleanup_old_entries()
+        assert limiter._leases == {} and limiter._denied == {}
+
+
+class TestMakeLimiter:
+    """Test backend selection."""
+
+    async def test_backends(self):
+        memory = make_limiter(5, "api", backend="memory")
+        assert isinstance(memory, SlidingWindowCounter)
+        assert await memory.acquire("c") == (True, 4)
+
+        shared = make_limiter(5, "api", backend="redis")
+        assert isinstance(shared, RedisSlidingWindow)
+        assert shared.prefix == "ratelimit:api"
+
+
+class TestTokenBucket:
+    """Test cost-weighted consumption and refill."""
+
+    def test_consume_and_refill(self):
+        clock = FakeClock(0.0)
+        bucket = TokenBucket(capacity=10, refill_per_second=2, clock=clock)
+        assert bucket.consume("c", 8) == (True, 2, 0.0)
+        allowed, tokens, wait = bucket.consume("c", 5)
+        assert not allowed and tokens == 2 and wait == 1.5
+
+        clock.now += 1.5
+        assert bucket.consume("c", 5) == (True, 0, 0.0)
+        # Other clients are charged separately
+        assert bucket.consume("d", 1)[0]
+
+    def test_cost_capped_at_capacity(self):
+        clock = FakeClock(0.0)
+        bucket = TokenBucket(capacity=10, refill_per_second=1, clock=clock)
+        assert bucket.consume("c", 500)[0]
+        assert bucket.consume("c", 500)[2] == 10
+
+    def test_cleanup_forgets_full_buckets(self):
+        clock = FakeClock(0.0)
+        bucket = TokenBucket(capacity=10, refill_per_second=1, clock=clock)
+        bucket.consume("a", 5)
+        bucket.consume("b", 1)
+        clock.now += 2
+        bucket.cleanup_old_entries()
+        assert list(bucket._buckets) == ["a"]
+
+
+class TestRequestCost:
+    """Test report costs by range, granularity and filter breadth."""
+
+    def test_report_cost(self):
+        day = {"from": "2024-03-01T00:00:00Z", "to": "2024-03-02T00:00:00Z"}
+        assert report_cost({**day, "customer": "Acme", "supplier": "Telco", "destination": "US"}) == 1
+        assert report_cost(day) == 4
+        assert report_cost({**day, "customer": "Ac%", "supplier": "Telco", "destination": "US"}) == 2
+
+        month = {"from": "2024-03-01T00:00:00", "to": "2024-03-31T00:00:00"}
+        assert report_cost(month) == 120
+        assert report_cost({**month, "granularity": "1h"}) == 10
+
+    def test_drilldown_ignores_filter_breadth(self):
+        month = {"from": "2024-03-01T00:00:00", "to": "2024-03-31T00:00:00"}
+        assert drilldown_cost(month) == 30
+        assert drilldown_cost({**month, "customer": "Ac%", "granularity": "1h"}) == 2.5
+
+    def test_invalid_range_costs_one(self):
+        assert report_cost({}) == 1
+        assert report_cost({"from": "x", "to": "2024-03-02T00:00:00"}) == 1
+        assert report_cost({"from": "2024-03-02T00:00:00", "to": "2024-03-01T00:00:00"}) == 1
+
+    def test_exact_path_and_method(self, monkeypatch):
+        from app.middleware import rate_limiter
+
+        monkeypatch.setattr(rate_limiter, "_cost_functions", {})
+        register_cost("/api/metrics", lambda params: 7.0)
+        register_cost("/api/metrics/zoom", lambda params: 0.5)
+        assert request_cost("/api/metrics", {}) == 7
+        assert request_cost("/api/metrics/", {}) == 7
+        assert request_cost("/api/metrics/zoom", {}) == 0.5
+        # Not reports: neighbouring paths and other methods
+        assert request_cost("/api/metrics/page", {}) == 1
+        assert request_cost("/api/metrics/42", {}, "DELETE") == 1
+        assert request_cost("/api/metrics", {}, "POST") == 1
+        assert request_cost("/api/suggest/customer", {}) == 1
+
+
+class TestCostMiddleware:
+    """Test that heavy queries spend the budget and the headers expose it."""
+
+    def _client(self, monkeypatch):
+        from app.middleware import rate_limiter
+
+        # As declared by app.routers.metrics
+        monkeypatch.setattr(rate_limiter, "_cost_functions", {})
+        register_cost("/api/metrics", report_cost)
+        app = FastAPI()
+
+        @app.get("/api/metrics")
+        async def report(cached: bool = False, if_none_match: str | None = Header(None)):
+            if if_none_match:
+                return Response(status_code=304)
+            return JSONResponse({}, headers={"X-Cache": "HIT"} if cached else {})
+
+        @app.get("/api/metrics/page")
+        async def page():
+            return {}
+
+        @app.get("/api/suggest")
+        async def suggest():
+            return {}
+
+        app.add_middleware(
+            RateLimitMiddleware, api_limit=1000, backend="memory", cost_capacity=200, cost_refill=0.001,
+        )
+        return TestClient(app)
+
+    def test_budget_headers_and_429(self, monkeypatch):
+        client = self._client(monkeypatch)
+        month = {"from": "2024-03-01T00:00:00", "to": "2024-03-31T00:00:00"}
+
+        response = client.get("/api/metrics", params=month)
+        assert response.status_code == 200
+        assert response.headers["X-RateLimit-Cost"] == "120.0"
+        assert response.headers["X-RateLimit-Budget"] == "200"
+        assert response.headers["X-RateLimit-Budget-Remaining"] == "80.0"
+
+        response = client.get("/api/metrics", params=month)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 1
+        assert response.headers["X-RateLimit-Budget-Remaining"] == "80.0"
+
+        # Cheap requests still fit in the remaining budget
+        response = client.get("/api/suggest")
+        assert response.status_code == 200
+        assert response.headers["X-RateLimit-Cost"] == "1.0"
+
+    def test_page_is_not_charged_report_cost(self, monkeypatch):
+        client = self._client(monkeypatch)
+        month = {"from": "2024-03-01T00:00:00", "to": "2024-03-31T00:00:00"}
+        response = client.get("/api/metrics/page", params=month)
+        assert response.status_code == 200
+        assert response.headers["X-RateLimit-Cost"] == "1.0"
+
+    def test_cache_hits_and_304_are_refunded(self, monkeypatch):
+        client = self._client(monkeypatch)
+        month = {"from": "2024-03-01T00:00:00", "to": "2024-03-31T00:00:00"}
+
+        for response in (
+            client.get("/api/metrics", params={**month, "cached": "true"}),
+            client.get("/api/metrics", params=month, headers={"If-None-Match": '"v1"'}),
+        ):
+            assert response.headers["X-RateLimit-Cost"] == "0.0"
+            assert float(response.headers["X-RateLimit-Budget-Remaining"]) > 199
+
+        # The budget was still checked up front: a computed report is charged
+        assert client.get("/api/metrics", params=month).headers["X-RateLimit-Cost"] == "120.0"
@@ -0,0 +1,126 @@
+# tests/unit/test_redis_maintenance.py
+# Unit tests for pipelined, paced Redis maintenance (job cleanup, cache invalidation)
+
+from fnmatch import fnmatch
+
+import pytest
+
+from app.jobs import worker
+from app.utils.redis_maintenance import pause_for, unlink_matching
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.queued.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        return [getattr(self.redis, "_" + name)(*args, **kwargs) for name, args, kwargs in self.queued]
+
+
+class FakeRedis:
+    """Keys with optional TTLs; SCAN pages follow the initial key order (a stable cursor)."""
+
+    def __init__(self, keys):
+        self.ttls = dict(keys)
+        self.order = list(self.ttls)
+        self.round_trips = 0
+        self.scripts = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def script_load(self, script):
+        self.scripts["sha1"] = script
+        return "sha1"
+
+    def _scan(self, cursor, match, count):
+        page = [k for k in self.order[cursor:cursor + count] if k in self.ttls and fnmatch(k, match)]
+        end = cursor + count
+        return (end if end < len(self.order) else 0), page
+
+    def _unlink(self, *keys):
+        return sum(self.ttls.pop(k, False) is not False for k in keys)
+
+    def _evalsha(self, sha, numkeys, *keys):
+        assert sha in self.scripts
+        persistent = [k for k in keys if k in self.ttls and self.ttls[k] is None]
+        return self._unlink(*persistent)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        # 10ms pass between consecutive readings, i.e. per Redis round trip
+        self.now += 0.01
+        return self.now
+
+
+class TestUnlinkMatching:
+    """Test scan-and-delete batching and pacing."""
+
+    async def test_unlinks_matching_in_batches(self):
+        keys = {f"api:metrics:{i}": 60 for i in range(25)}
+        keys.update({f"other:{i}": 60 for i in range(5)})
+        redis = FakeRedis(keys)
+
+        run = await unlink_matching(redis, "api:metrics:*", batch=10, budget=1.0)
+        assert set(redis.ttls) == {f"other:{i}" for i in range(5)}
+        assert run["scanned"] == 25 and run["deleted"] == 25
+        # 3 SCAN pages; each page's UNLINK rides with the next SCAN
+        assert run["batches"] == 3
+        assert run["round_trips"] == redis.round_trips == 4
+
+    async def test_persistent_only(self):
+        keys = {f"arq:job:{i}": (None if i % 3 == 0 else 30) for i in range(12)}
+        redis = FakeRedis(keys)
+
+        run = await unlink_matching(redis, "arq:job:*", persistent_only=True, batch=5, budget=1.0)
+        assert run["deleted"] == 4
+        assert all(ttl is not None for ttl in redis.ttls.values())
+
+    async def test_paced_by_budget(self):
+        sleeps = []
+
+        async def sleep(seconds):
+            sleeps.append(seconds)
+
+        redis = FakeRedis({f"k:{i}": None for i in range(20)})
+        run = await unlink_matching(redis, "k:*", batch=10, budget=0.25, sleep=sleep, clock=FakeClock())
+        # 3 round trips, no pause after the last one; 10ms busy -> 30ms idle at a 25% budget
+        assert sleeps == pytest.approx([0.03, 0.03])
+        assert run["paused_ms"] == pytest.approx(60.0)
+
+    async def test_empty_keyspace(self):
+        run = await unlink_matching(FakeRedis({}), "k:*", budget=0.1)
+        assert (run["scanned"], run["deleted"], run["round_trips"]) == (0, 0, 1)
+
+    def test_pause_for(self):
+        assert pause_for(0.01, 1.0) == 0.0
+        assert pause_for(0.01, 0.5) == pytest.approx(0.01)
+
+
+class TestCleanupJobs:
+    """Test that the cron job removes only job keys without expiry."""
+
+    async def test_removes_persistent_job_keys(self, monkeypatch):
+        monkeypatch.setattr(worker.settings, "REDIS_MAINTENANCE_BUDGET", 1.0)
+        redis = FakeRedis({"arq:job:a": None, "arq:job:b": 60, "arq:result:c": None})
+        result = await worker.cleanup_jobs({"redis": redis})
+        assert result["removed"] == 1
+        assert set(redis.ttls) == {"arq:job:b", "arq:result:c"}
@@ -0,0 +1,276 @@
+# tests/unit/test_report_jobs.py
+# Unit tests for background report jobs: chunked aggregation, progress and result pages
+
+import gzip
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from arq.constants import job_key_prefix, result_key_prefix
+from arq.jobs import serialize_result
+from pydantic import ValidationError
+
+from app.jobs import queue, worker
+from app.jobs.queue import report_job_id, report_job_params, report_job_params_from
+from app.jobs.results import load_page, page_key, page_urls, progress_key, store_pages
+from app.models.query_params import ReportJobParams
+from app.services.metrics_service import MetricsService
+from app.services.shard_service import ShardedAggregator
+from app.utils import json_codec
+from app.utils.baselines import parse_baselines
+
+REPORT = (datetime(2024, 2, 1, 0, 0), datetime(2024, 2, 3, 12, 0))
+REPORT_UTC = (datetime(2024, 2, 1, tzinfo=timezone.utc), datetime(2024, 2, 2, tzinfo=timezone.utc))
+
+
+def _aware(dt):
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def rows():
+    base = datetime(2024, 1, 24)
+    return [
+        {
+            "time": base + timedelta(minutes=i * 11),
+            "customer": "ABC"[i % 3], "supplier": "XY"[i % 2], "destination": "US" if i % 5 else "UK",
+            "start_attempt": 10 + i % 7, "start_uniq_attempt": 8, "start_nuber": i % 5,
+            "seconds": 60 * (i % 9), "pdd": None if i % 11 == 0 else 1000 + i, "answer_time": 3 + i % 4,
+        }
+        for i in range(11 * 24 * 60 // 11)
+    ]
+
+
+def _select(rows, t0, t1):
+    return [r for r in rows if _aware(t0) <= _aware(r["time"]) <= _aware(t1)]
+
+
+class FakeRepository:
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetched = []
+
+    async def get_metrics_parallel(self, filters, t0, t1, y0, y1):
+        self.fetched.append((t0, t1))
+        return _select(self.rows, t0, t1), _select(self.rows, y0, y1)
+
+    async def get_metrics_multi_period(self, filters, periods):
+        self.fetched.append(periods["today"])
+        return {name: _select(self.rows, t0, t1) for name, (t0, t1) in periods.items()}
+
+
+class FakePartialsCache:
+    async def get(self, key):
+        return None
+
+    async def put(self, key, today, baselines):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.ttls[key] = ex
+
+    async def get(self, key):
+        return self.values.get(key)
+
+
+class FakeArq(FakeRedis):
+    """Job and result keys like arq's enqueue_job uniqueness check sees them."""
+
+    def __init__(self):
+        super().__init__()
+        self.enqueued = []
+        self.counters = {}
+
+    async def enqueue_job(self, function, *args, _job_id=None):
+        if job_key_prefix + _job_id in self.values or result_key_prefix + _job_id in self.values:
+            return None
+        self.values[job_key_prefix + _job_id] = b"job"
+        self.enqueued.append(_job_id)
+        return object()
+
+    def finish(self, job_id, success=True, age=0.0):
+        """Complete a job like the worker: drop the job key, store the result and first page."""
+        self.values.pop(job_key_prefix + job_id)
+        finished_ms = int((time.time() - age) * 1000)
+        self.values[result_key_prefix + job_id] = serialize_result(
+            "generate_metrics_report", (), {}, 1, finished_ms, success, {"pages": 1}, finished_ms, finished_ms,
+            "ref", "arq:queue", job_id,
+        )
+        self.values[page_key(job_id, 0)] = b"page"
+        self.values[progress_key(job_id)] = b'{"percent": 100}'
+
+    async def exists(self, *keys):
+        return sum(key in self.values for key in keys)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    async def incr(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+
+
+def _service(repo):
+    return MetricsService(repo, partials_cache=FakePartialsCache(), sharder=ShardedAggregator(0))
+
+
+class TestChunkedAggregation:
+    """Test that a report aggregated in time chunks equals the one-pass report."""
+
+    @pytest.mark.parametrize("baselines", [None, "7d"])
+    @pytest.mark.parametrize("reverse", [False, True])
+    async def test_matches_one_pass(self, rows, baselines, reverse):
+        kwargs = {"reverse": reverse, "baselines": parse_baselines(baselines)}
+        calls = []
+
+        async def progress(done, total):
+            calls.append((done, total))
+
+        repo = FakeRepository(rows)
+        chunked = await _service(repo).get_full_metrics_report(
+            None, None, None, *REPORT, chunk_seconds=86400, progress=progress, **kwargs
+        )
+        plain = await _service(FakeRepository(rows)).get_full_metrics_report(None, None, None, *REPORT, **kwargs)
+
+        assert chunked == plain
+        assert calls == [(1, 3), (2, 3), (3, 3)]
+        assert len(repo.fetched) == 3
+
+    async def test_short_range_one_pass(self, rows):
+        calls = []
+
+        async def progress(done, total):
+            calls.append((done, total))
+
+        repo = FakeRepository(rows)
+        await _service(repo).get_full_metrics_report(
+            None, None, None, REPORT[0], REPORT[0] + timedelta(hours=6), chunk_seconds=86400, progress=progress
+        )
+        assert calls == [(1, 1)]
+        assert len(repo.fetched) == 1
+
+
+class TestResultPages:
+    """Test that stored pages reassemble into the report."""
+
+    async def test_round_trip(self, rows):
+        service = _service(FakeRepository(rows))
+        report = await service.get_full_metrics_report(None, None, None, *REPORT, granularity="1h")
+        redis = FakeRedis()
+        manifest = await store_pages(redis, "j1", report, page_rows=10, ttl=60)
+
+        assert manifest["counts"] == {
+            "main": len(report["main_rows"]), "peer": len(report["peer_rows"]),
+            "hourly": len(report["hourly_rows"]), "five_min": 0,
+        }
+        assert manifest["pages"] == len(redis.values)
+        assert set(redis.ttls.values()) == {60}
+
+        hourly = []
+        for n in range(manifest["pages"]):
+            encoded = await load_page(redis, "j1", n)
+            assert gzip.decompress(encoded.variants["gzip"]) == encoded.variants["identity"]
+            line = json_codec.loads(encoded.variants["identity"])
+            if line["type"] == "rows" and line["section"] == "hourly":
+                hourly.extend(line["rows"])
+        assert hourly == json_codec.loads(json_codec.dumps(report["hourly_rows"]))
+        assert line == {"type": "end", "counts": manifest["counts"]}
+
+    async def test_missing_page(self):
+        assert await load_page(FakeRedis(), "j1", 0) is None
+        assert page_key("j1", 3) == "jobs:result:j1:3"
+        assert page_urls("j1", 2) == ["/api/jobs/j1/result/0", "/api/jobs/j1/result/1"]
+
+
+class TestReportJobParams:
+    """Test the job request body."""
+
+    def test_default_range(self):
+        params = ReportJobParams(hours=6)
+        assert params.time_to - params.time_from == timedelta(hours=6)
+        assert params.time_to.minute % 5 == 0 and params.time_to.second == 0
+        assert params.time_to <= datetime.now(timezone.utc)
+
+    def test_explicit_range(self):
+        params = ReportJobParams.model_validate(
+            {"from": "2024-02-01T00:00:00Z", "to": "2024-02-02T00:00:00Z", "granularity": "1h", "baselines": "7d"}
+        )
+        job = report_job_params_from(params)
+        assert job["time_from"] == "2024-02-01T00:00:00+00:00"
+        assert job["granularity"] == "1h"
+        assert job["baselines"] == "1d,7d"
+
+    def test_from_without_to(self):
+        with pytest.raises(ValidationError):
+            ReportJobParams.model_validate({"from": "2024-02-01T00:00:00Z"})
+
+
+class TestWorkerSettings:
+    """Test how the report job is registered with arq."""
+
+    def test_result_ttl_and_timeout(self):
+        functions = {f.name: f for f in worker.WorkerSettings.functions if hasattr(f, "keep_result_s")}
+        report = functions["generate_metrics_report"]
+        assert report.keep_result_s == worker.settings.REPORT_JOB_RESULT_TTL
+        assert report.timeout_s == worker.settings.REPORT_JOB_TIMEOUT_SECONDS
+
+
+class TestIdempotentEnqueue:
+    """Test that identical submissions share one job."""
+
+    @pytest.fixture
+    def arq(self, monkeypatch):
+        arq = FakeArq()
+
+        async def get_arq():
+            return arq
+
+        monkeypatch.setattr(queue, "get_arq", get_arq)
+        monkeypatch.setattr(queue.settings, "REPORT_JOB_REUSE_SECONDS", 600)
+        return arq
+
+    def test_job_id_from_params(self):
+        params = report_job_params_from(ReportJobParams.model_validate(
+            {"from": "2024-02-01T00:00:00Z", "to": "2024-02-02T00:00:00Z", "customer": "A"}
+        ))
+        same = report_job_params("A", None, None, *REPORT_UTC, baselines="1d")
+        assert report_job_id(params) == report_job_id(same)
+        assert report_job_id(params) != report_job_id({**params, "customer": "B"})
+        assert report_job_id(params).startswith("report:")
+
+    async def test_in_flight_and_fresh_reused(self, arq):
+        params = report_job_params("A", None, None, *REPORT_UTC)
+        first = await queue.enqueue_report(params)
+        assert await queue.enqueue_report(params) == first
+
+        arq.finish(first, age=60)
+        assert await queue.enqueue_report(params) == first
+        assert arq.enqueued == [first]
+        assert arq.counters == {queue.DEDUPLICATED_COUNTER: 2}
+
+    @pytest.mark.parametrize("success, age", [(True, 3600), (False, 0)])
+    async def test_stale_or_failed_rerun(self, arq, success, age):
+        params = report_job_params("A", None, None, *REPORT_UTC)
+        job_id = await queue.enqueue_report(params)
+        arq.finish(job_id, success=success, age=age)
+
+        assert await queue.enqueue_report(params) == job_id
+        assert arq.enqueued == [job_id, job_id]
+        assert progress_key(job_id) not in arq.values
+        assert arq.counters == {}
+
+    async def test_expired_pages_rerun(self, arq):
+        params = report_job_params("A", None, None, *REPORT_UTC)
+        job_id = await queue.enqueue_report(params)
+        arq.finish(job_id)
+        del arq.values[page_key(job_id, 0)]
+
+        await queue.enqueue_report(params)
+        assert arq.enqueued == [job_id, job_id]
@@ -0,0 +1,59 @@
+# tests/unit/test_report_stream.py
+# Unit tests for NDJSON report streaming
+
+import json
+from unittest import mock
+
+import tornado.web
+from tornado.httputil import HTTPServerRequest
+
+from app.handlers.metrics_handler import BaseMetricsHandler
+from app.utils.report_stream import iter_report_ndjson
+
+
+def _report():
+    return {
+        "today_metrics": {"Min": 10.0},
+        "yesterday_metrics": {"Min": 8.0},
+        "main_rows": [{"main": "A", "destination": "US"}],
+        "peer_rows": [{"main": "A", "peer": f"P{i}", "destination": "US"} for i in range(5)],
+        "hourly_rows": [],
+        "five_min_rows": [],
+        "labels": {"ASR": {}, "ACD": {}},
+    }
+
+
+class TestIterReportNdjson:
+    """Test chunked NDJSON encoding of reports."""
+
+    def test_totals_first_and_end_marker_last(self):
+        lines = [json.loads(b) for b in iter_report_ndjson(_report())]
+        assert lines[0]["type"] == "totals"
+        assert lines[0]["today_metrics"] == {"Min": 10.0}
+        assert lines[0]["labels"] == {"ASR": {}, "ACD": {}}
+        assert "main_rows" not in lines[0]
+        assert lines[-1] == {"type": "end", "counts": {"main": 1, "peer": 5, "hourly": 0, "five_min": 0}}
+
+    def test_rows_are_chunked_in_section_order(self):
+        lines = [json.loads(b) for b in iter_report_ndjson(_report(), chunk_rows=2)]
+        chunks = [(l["section"], l["offset"], len(l["rows"])) for l in lines if l["type"] == "rows"]
+        assert chunks == [("main", 0, 1), ("peer", 0, 2), ("peer", 2, 2), ("peer", 4, 1)]
+
+    def test_every_line_is_newline_terminated(self):
+        for chunk in iter_report_ndjson(_report()):
+            assert chunk.endswith(b"\n")
+            assert chunk.count(b"\n") == 1
+
+
+class TestTornadoFormat:
+    """Test ?format= validation of the Tornado report handler."""
+
+    async def test_unknown_format_is_400(self):
+        uri = "/api/metrics?from=2024-01-01T00:00:00&to=2024-01-02T00:00:00&format=ndjsn"
+        request = HTTPServerRequest(method="GET", uri=uri, connection=mock.Mock())
+        handler = BaseMetricsHandler(tornado.web.Application(), request, metrics_service=mock.Mock())
+        handler.finish = mock.Mock()
+        await handler.get()
+        assert handler.get_status() == 400
+        assert b"format" in b"".join(handler._write_buffer)
+        handler.metrics_service.get_full_metrics_report.assert_not_called()
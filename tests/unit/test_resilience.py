@@ -0,0 +1,315 @@
+# tests/unit/test_resilience.py
+# Unit tests for latency-triggered circuit breakers, request deadlines and their
+# use by get_session and the Redis cache
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.db import base
+from app.middleware.circuit_breaker import (
+    CircuitBreaker, CircuitBreakerError, CircuitState, DeadlineExceeded, DeadlineMiddleware, deadline,
+    request_deadline, time_left,
+)
+from app.utils import cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLatencyBreaker:
+    """Test that slow calls open the circuit like failures do."""
+
+    async def test_slow_calls_open_circuit(self):
+        clock = FakeClock()
+        cb = CircuitBreaker("slow", failure_threshold=2, recovery_timeout=5, slow_call_threshold=0.1, clock=clock)
+
+        async def slow():
+            clock.now += 0.5
+            return "late"
+
+        assert await cb.call(slow) == "late"
+        assert cb.state == CircuitState.CLOSED
+        await cb.call(slow)
+        assert cb.state == CircuitState.OPEN
+        assert cb.snapshot()["slow_calls"] == 2
+
+        with pytest.raises(CircuitBreakerError):
+            await cb.call(slow)
+        assert cb.snapshot()["rejected"] == 1
+
+        # After the recovery timeout, fast trial calls close it again
+        clock.now += 5
+        fast = lambda: "ok"  # noqa: E731
+        await cb.call(fast)
+        await cb.call(fast)
+        assert cb.state == CircuitState.CLOSED
+
+    async def test_untracked_exceptions_do_not_count(self):
+        cb = CircuitBreaker("db", failure_threshold=1, exceptions=(OSError,))
+        with pytest.raises(ValueError):
+            async with cb.guard():
+                raise ValueError("bad input")
+        assert cb.state == CircuitState.CLOSED
+
+        with pytest.raises(OSError):
+            async with cb.guard():
+                raise OSError("connection refused")
+        assert cb.state == CircuitState.OPEN
+
+    async def test_ignored_exceptions_do_not_count(self):
+        cb = CircuitBreaker("db", failure_threshold=1, exceptions=(asyncio.TimeoutError,), ignored=(DeadlineExceeded,))
+        with pytest.raises(DeadlineExceeded):
+            async with cb.guard():
+                raise DeadlineExceeded("database connection")
+        assert cb.state == CircuitState.CLOSED
+
+        with pytest.raises(asyncio.TimeoutError):
+            async with cb.guard():
+                raise asyncio.TimeoutError()
+        assert cb.state == CircuitState.OPEN
+
+    async def test_restart_leaves_queueing_out(self):
+        clock = FakeClock()
+        cb = CircuitBreaker("db", failure_threshold=1, slow_call_threshold=0.1, clock=clock)
+        async with cb.guard() as call:
+            clock.now += 5  # queued for a connection
+            call.restart()
+            clock.now += 0.05
+        assert cb.state == CircuitState.CLOSED and cb.snapshot()["slow_calls"] == 0
+
+
+class TestDeadline:
+    """Test deadline budgets and their propagation."""
+
+    async def test_time_left(self):
+        assert time_left() is None
+        assert time_left(0.25) == 0.25
+        with deadline(10):
+            assert 9 < time_left() <= 10
+            assert time_left(0.25) == 0.25
+            # A nested, later deadline does not extend the outer one
+            with deadline(60):
+                assert time_left() <= 10
+        assert request_deadline.get() is None
+
+    async def test_expired(self):
+        with deadline(0.01):
+            await asyncio.sleep(0.02)
+            with pytest.raises(DeadlineExceeded):
+                time_left()
+
+    def test_middleware_sets_deadline_for_api_only(self):
+        app = FastAPI()
+
+        @app.get("/api/x")
+        async def api():
+            return {"left": time_left()}
+
+        @app.get("/health")
+        async def health():
+            return {"left": time_left()}
+
+        app.add_middleware(DeadlineMiddleware, seconds=2.0)
+        client = TestClient(app)
+        assert 0 < client.get("/api/x").json()["left"] <= 2.0
+        assert client.get("/health").json()["left"] is None
+
+
+class FakeSession:
+    def __init__(self, log, clock=None, connect_delay=0.0, connect_sleep=0.0, connect_error=None):
+        self.log = log
+        self.clock = clock
+        self.connect_delay = connect_delay
+        self.connect_sleep = connect_sleep
+        self.connect_error = connect_error
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def connection(self):
+        if self.clock:
+            self.clock.now += self.connect_delay
+        await asyncio.sleep(self.connect_sleep)
+        if self.connect_error:
+            raise self.connect_error
+        self.log.append("connect")
+
+    async def execute(self, stmt, params=None):
+        self.log.append((str(stmt), params))
+
+
+class TestGetSession:
+    """Test the Postgres breaker and statement_timeout from the request deadline."""
+
+    @pytest.fixture
+    def sessions(self, monkeypatch):
+        log = []
+        monkeypatch.setattr(base, "AsyncSessionFactory", lambda: FakeSession(log))
+        # Same tracked and ignored errors as the real breaker, opening on the first failure
+        monkeypatch.setattr(base, "db_breaker", CircuitBreaker(
+            "postgres", failure_threshold=1, exceptions=base.db_breaker.exceptions, ignored=base.db_breaker.ignored,
+        ))
+        return log
+
+    async def test_statement_timeout_from_deadline(self, sessions):
+        async with base.get_session():
+            pass
+        assert sessions == ["connect"]
+
+        with deadline(2):
+            async with base.get_session():
+                pass
+        assert sessions[1] == "connect"
+        sql, params = sessions[2]
+        assert "statement_timeout" in sql and 1500 < int(params["ms"]) <= 2000
+
+    async def test_query_times_collected(self, sessions):
+        times = []
+        token = base.query_times.set(times)
+        try:
+            async with base.get_session():
+                pass
+        finally:
+            base.query_times.reset(token)
+        assert len(times) == 1 and times[0] >= 0
+
+    async def test_expired_deadline_never_connects(self, sessions):
+        with deadline(0.001):
+            await asyncio.sleep(0.01)
+            with pytest.raises(DeadlineExceeded):
+                async with base.get_session():
+                    pass
+        assert sessions == []
+
+    async def test_open_circuit_fails_fast(self, sessions):
+        with pytest.raises(OSError):
+            async with base.get_session():
+                raise OSError("server closed the connection")
+        with pytest.raises(CircuitBreakerError):
+            async with base.get_session():
+                pass
+        assert sessions == ["connect"]
+
+    async def test_deadline_does_not_open_circuit(self, sessions, monkeypatch):
+        # The deadline runs out while waiting for the connection
+        monkeypatch.setattr(base, "AsyncSessionFactory", lambda: FakeSession(sessions, connect_sleep=1.0))
+        for _ in range(3):
+            with deadline(0.01):
+                with pytest.raises(DeadlineExceeded):
+                    async with base.get_session():
+                        pass
+        assert base.db_breaker.state == CircuitState.CLOSED
+
+    async def test_connect_timeout_opens_circuit(self, sessions, monkeypatch):
+        # The driver's own connect timeout, no request deadline: a hung server
+        monkeypatch.setattr(
+            base, "AsyncSessionFactory", lambda: FakeSession(sessions, connect_error=asyncio.TimeoutError()),
+        )
+        with pytest.raises(asyncio.TimeoutError) as exc:
+            async with base.get_session():
+                pass
+        assert not isinstance(exc.value, DeadlineExceeded)
+        assert base.db_breaker.state == CircuitState.OPEN
+
+    async def test_slow_call_timed_from_checkout(self, monkeypatch):
+        clock = FakeClock()
+        log = []
+        monkeypatch.setattr(base, "AsyncSessionFactory", lambda: FakeSession(log, clock, connect_delay=5.0))
+        monkeypatch.setattr(base, "db_breaker", CircuitBreaker(
+            "postgres", failure_threshold=1, slow_call_threshold=0.5, exceptions=(OSError,), clock=clock,
+        ))
+        # A long wait for the connection alone is not a slow call
+        async with base.get_session():
+            clock.now += 0.1
+        assert base.db_breaker.state == CircuitState.CLOSED
+
+        async with base.get_session():
+            clock.now += 1.0
+        assert base.db_breaker.state == CircuitState.OPEN
+
+
+class FakeRedis:
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def get(self, key):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        await asyncio.sleep(self.delay)
+        return '{"v": 1}'
+
+    async def setex(self, key, ttl, value):
+        self.calls += 1
+        if self.error:
+            raise self.error
+
+
+class TestCacheBypass:
+    """Test that an unhealthy Redis turns cache calls into immediate misses."""
+
+    @pytest.fixture
+    def redis(self, monkeypatch):
+        def use(client):
+            async def pool():
+                return client
+            monkeypatch.setattr(cache, "_get_pool", pool)
+            monkeypatch.setattr(cache, "_get_bulk_pool", pool)
+            monkeypatch.setattr(
+                cache, "redis_breaker",
+                CircuitBreaker("redis", failure_threshold=2, recovery_timeout=30, slow_call_threshold=0.05,
+                               exceptions=(RedisConnectionError, OSError, asyncio.TimeoutError)),
+            )
+            return client
+        return use
+
+    async def test_hit(self, redis):
+        redis(FakeRedis())
+        c = cache.Cache()
+        assert await c.get_json("k") == {"v": 1}
+        assert c.stats() == (1, 0)
+
+    async def test_errors_open_circuit_then_bypass(self, redis):
+        client = redis(FakeRedis(error=RedisConnectionError("down")))
+        c = cache.Cache()
+        assert await c.get_json("k") is None
+        await c.set_json("k", {"v": 2})
+        assert cache.redis_breaker.is_open
+        assert client.calls == 2
+
+        # Bypassed without touching Redis
+        assert await c.get_json("k") is None
+        assert client.calls == 2 and c.bypassed == 3
+
+    async def test_bulk_calls_are_not_slow_calls(self, redis):
+        redis(FakeRedis(delay=0.1))
+        c = cache.Cache()
+        # Megabyte values take long to transfer: only their errors count
+        for _ in range(3):
+            assert await c.get_encoded("k") == '{"v": 1}'
+        assert not cache.redis_breaker.is_open
+
+        for _ in range(2):
+            await c.get_json("k")
+        assert cache.redis_breaker.is_open
+
+    async def test_deadline_bounds_slow_redis(self, redis):
+        redis(FakeRedis(delay=1.0))
+        c = cache.Cache()
+        with deadline(0.02):
+            assert await c.get_json("k") is None
+        assert c.bypassed == 1
@@ -0,0 +1,91 @@
+# tests/unit/test_response_cache.py
+# Unit tests for the pre-encoded, pre-compressed response cache
+
+import gzip
+
+import pytest
+
+from app.utils import response_cache
+from app.utils.response_cache import EncodedBody, ResponseCache, parse_accept_encoding
+
+
+BODY = b'{"main_rows":[' + b",".join(b'{"main":"HGC_STD","Min":%d}' % i for i in range(200)) + b"]}"
+
+
+class FakeByteStore:
+    def __init__(self):
+        self.data = {}
+
+    async def get_bytes_map(self, key):
+        return dict(self.data[key]) if key in self.data else None
+
+    async def set_bytes_map(self, key, mapping):
+        self.data[key] = dict(mapping)
+
+
+class BrokenStore:
+    async def get_bytes_map(self, key):
+        raise ConnectionError("redis down")
+
+    async def set_bytes_map(self, key, mapping):
+        raise ConnectionError("redis down")
+
+
+class TestAcceptEncoding:
+    """Test Accept-Encoding parsing and variant selection."""
+
+    def test_parse(self):
+        assert parse_accept_encoding("gzip, br;q=0.5, *;q=0") == {"gzip": 1.0, "br": 0.5, "*": 0.0}
+        assert parse_accept_encoding(None) == {}
+
+    def test_select(self):
+        encoded = EncodedBody("application/json", {"identity": b"x", "gzip": b"g", "br": b"b"})
+        assert encoded.select("gzip, deflate, br") == ("br", b"b")
+        assert encoded.select("gzip;q=1, br;q=0.5") == ("gzip", b"g")
+        assert encoded.select("*") == ("br", b"b")
+        assert encoded.select("gzip;q=0") == (None, b"x")
+        assert encoded.select(None) == (None, b"x")
+
+    def test_small_body_identity_only(self):
+        encoded = EncodedBody("application/json", response_cache._compress_variants(b"{}"))
+        assert encoded.select("gzip, br") == (None, b"{}")
+
+
+class TestResponseCache:
+    """Test storing and serving cached variants."""
+
+    async def test_put_then_get(self):
+        cache = ResponseCache()
+        cache._cache = FakeByteStore()
+        stored = await cache.put("k", BODY, "application/json")
+        assert gzip.decompress(stored.variants["gzip"]) == BODY
+
+        hit = await cache.get("k")
+        assert hit.content_type == "application/json"
+        assert hit.variants == stored.variants
+        assert hit.headers == {}
+
+    async def test_headers_stored_with_body(self):
+        cache = ResponseCache()
+        cache._cache = FakeByteStore()
+        await cache.put("k", BODY, "application/json", {"X-Report-Granularity": "1h"})
+
+        hit = await cache.get("k")
+        assert hit.headers == {"X-Report-Granularity": "1h"}
+        assert set(hit.variants) >= {"identity", "gzip"} and "header:X-Report-Granularity" not in hit.variants
+
+    async def test_brotli_variant(self):
+        brotli = pytest.importorskip("brotli")
+        cache = ResponseCache()
+        cache._cache = FakeByteStore()
+        await cache.put("k", BODY, "application/json")
+        coding, body = (await cache.get("k")).select("br")
+        assert coding == "br"
+        assert brotli.decompress(body) == BODY
+
+    async def test_fails_open(self):
+        cache = ResponseCache()
+        cache._cache = BrokenStore()
+        assert await cache.get("k") is None
+        stored = await cache.put("k", BODY, "application/json")
+        assert stored.select(None) == (None, BODY)
@@ -0,0 +1,133 @@
+# tests/unit/test_sharding.py
+# Unit tests for sharded aggregation: shards merge into the in-process report
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.metrics_service import MetricsService
+from app.services.shard_service import ShardedAggregator, reduce_rows, split_range
+from app.utils.baselines import parse_baselines
+from app.utils.metrics import calculate_metrics, merge_totals, metrics_from_totals, sum_totals
+from app.utils.partials import build_partials, merge_partials
+
+REPORT = (datetime(2024, 2, 1, 0, 0), datetime(2024, 2, 4, 0, 0))
+
+
+def _aware(dt):
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def rows():
+    base = datetime(2024, 1, 24)
+    return [
+        {
+            "time": base + timedelta(minutes=i * 7),
+            "customer": "ABC"[i % 3], "supplier": "XY"[i % 2], "destination": "US" if i % 5 else "UK",
+            "start_attempt": 10 + i % 7, "start_uniq_attempt": 8, "start_nuber": i % 5,
+            "seconds": 60 * (i % 9), "pdd": None if i % 11 == 0 else 1000 + i, "answer_time": 3 + i % 4,
+        }
+        for i in range(11 * 24 * 60 // 7)
+    ]
+
+
+def _select(rows, t0, t1):
+    """Rows of an inclusive range, like the repository's BETWEEN."""
+    return [r for r in rows if _aware(t0) <= _aware(r["time"]) <= _aware(t1)]
+
+
+class FakeRepository:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def get_metrics_parallel(self, filters, t0, t1, y0, y1):
+        return _select(self.rows, t0, t1), _select(self.rows, y0, y1)
+
+    async def get_metrics_multi_period(self, filters, periods):
+        return {name: _select(self.rows, t0, t1) for name, (t0, t1) in periods.items()}
+
+
+class FakePartialsCache:
+    async def get(self, key):
+        return None
+
+    async def put(self, key, today, baselines):
+        pass
+
+
+def _sharder(rows, shard_seconds=6 * 3600):
+    calls = []
+
+    def shard_fn(filters, periods, shifts, reverse):
+        calls.append(periods)
+        return reduce_rows({n: _select(rows, t0, t1) for n, (t0, t1) in periods.items()}, shifts, reverse)
+
+    sharder = ShardedAggregator(
+        2, shard_seconds, min_range_seconds=86400, executor=ThreadPoolExecutor(2), shard_fn=shard_fn,
+    )
+    return sharder, calls
+
+
+class TestSplitRange:
+    """Test that shards cover the range like one inclusive BETWEEN."""
+
+    def test_aligned_and_contiguous(self):
+        t0, t1 = datetime(2024, 2, 1, 1, 7, 30), datetime(2024, 2, 2, 3, 0)
+        shards = split_range(t0, t1, 6 * 3600)
+        assert shards[0][0] == t0 and shards[-1][1] == t1
+        assert [s[0].hour for s in shards[1:]] == [6, 12, 18, 0]
+        for (_, end), (start, _) in zip(shards, shards[1:]):
+            assert start - end == timedelta(microseconds=1)
+
+    def test_every_instant_in_one_shard(self):
+        t0, t1 = datetime(2024, 2, 1, tzinfo=timezone.utc), datetime(2024, 2, 1, 2, tzinfo=timezone.utc)
+        shards = split_range(t0, t1, 1000)  # rounded down to 900s
+        assert len(shards) == 8
+        for minute in range(0, 121, 5):
+            t = t0 + timedelta(minutes=minute)
+            assert sum(a <= t <= b for a, b in shards) == 1
+
+    def test_short_range(self):
+        t0, t1 = datetime(2024, 2, 1, 1), datetime(2024, 2, 1, 2)
+        assert split_range(t0, t1, 6 * 3600) == [(t0, t1)]
+
+
+class TestMergeableSums:
+    """Test that per-shard sums merge into the sums over all rows."""
+
+    def test_partials_and_totals(self, rows):
+        half = len(rows) // 3
+        merged = merge_partials(build_partials(rows[:half]), build_partials(rows[half:]))
+        assert merged == build_partials(rows)
+
+        totals = merge_totals(sum_totals(rows[:half]), sum_totals(rows[half:]))
+        assert metrics_from_totals(totals) == calculate_metrics(rows)
+        assert metrics_from_totals(sum_totals([])) == calculate_metrics([])
+
+
+class TestShardedReport:
+    """Test that a sharded report equals the in-process one."""
+
+    @pytest.mark.parametrize("baselines", [None, "7d"])
+    @pytest.mark.parametrize("reverse", [False, True])
+    async def test_matches_in_process(self, rows, baselines, reverse):
+        kwargs = {"reverse": reverse, "baselines": parse_baselines(baselines)}
+        sharder, calls = _sharder(rows)
+        sharded = await MetricsService(
+            FakeRepository(rows), partials_cache=FakePartialsCache(), sharder=sharder,
+        ).get_full_metrics_report(None, None, None, *REPORT, **kwargs)
+        plain = await MetricsService(
+            FakeRepository(rows), partials_cache=FakePartialsCache(),
+            sharder=ShardedAggregator(0),
+        ).get_full_metrics_report(None, None, None, *REPORT, **kwargs)
+
+        assert len(calls) == 12
+        assert sharded == plain
+
+    async def test_short_range_in_process(self, rows):
+        sharder, calls = _sharder(rows)
+        service = MetricsService(FakeRepository(rows), partials_cache=FakePartialsCache(), sharder=sharder)
+        await service.get_full_metrics_report(None, None, None, REPORT[0], REPORT[0] + timedelta(hours=12))
+        assert calls == []
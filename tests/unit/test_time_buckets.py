@@ -0,0 +1,49 @@
+# tests/unit/test_time_buckets.py
+# Unit tests for integer epoch time bucketing
+
+from datetime import datetime, timedelta, timezone
+
+from app.utils.grouped import aggregate_5min, aggregate_hourly
+from app.utils.time_buckets import FIVE_MIN_SECONDS, HOUR_SECONDS, BucketLabels, EpochCache, epoch_seconds
+
+T = datetime(2024, 1, 1, 10, 7, 30)
+T_EPOCH = 1704103650
+
+
+class TestEpochSeconds:
+    """Test conversion of row times to UTC epoch seconds."""
+
+    def test_inputs(self):
+        assert epoch_seconds(T) == T_EPOCH  # naive is UTC
+        assert epoch_seconds(T.replace(tzinfo=timezone.utc)) == T_EPOCH
+        assert epoch_seconds(T.replace(tzinfo=timezone(timedelta(hours=2)))) == T_EPOCH - 7200
+        assert epoch_seconds("2024-01-01 10:07:30") == T_EPOCH
+        assert epoch_seconds("2024-01-01T10:07:30Z") == T_EPOCH
+        assert epoch_seconds(None) is None
+        assert epoch_seconds("not a time") is None
+
+    def test_cache(self):
+        cache = EpochCache()
+        assert cache["2024-01-01 10:07:30"] == T_EPOCH
+        assert cache["bad"] is None
+        assert len(cache) == 2
+
+
+class TestBucketing:
+    """Test bucket labels and grouping keys."""
+
+    def test_labels(self):
+        assert BucketLabels(HOUR_SECONDS)[T_EPOCH - T_EPOCH % HOUR_SECONDS] == ("2024-01-01 10:00", "10:00")
+        assert BucketLabels(FIVE_MIN_SECONDS)[T_EPOCH - T_EPOCH % FIVE_MIN_SECONDS] == ("2024-01-01 10:05", "10:05")
+
+    def test_aggregate_keys(self):
+        rows = [
+            {"time": T, "customer": "A", "supplier": "X", "destination": "US", "start_attempt": 1},
+            {"time": "2024-01-01 12:09:00+02:00", "customer": "A", "supplier": "X", "destination": "US", "start_attempt": 2},
+            {"time": None, "customer": "A", "supplier": "X", "destination": "US", "start_attempt": 4},
+        ]
+        hourly = aggregate_hourly(rows)
+        assert list(hourly) == [("A", "X", "US", "2024-01-01 10:00")]
+        assert hourly[("A", "X", "US", "2024-01-01 10:00")]["attempt"] == 3
+        five = aggregate_5min(rows)
+        assert [(k[3], a["slot"], a["attempt"]) for k, a in five.items()] == [("2024-01-01 10:05", "10:05", 3)]
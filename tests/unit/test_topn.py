@@ -0,0 +1,113 @@
+# tests/unit/test_topn.py
+# Unit tests for top-N ranking and "Other" folding
+
+from datetime import datetime
+
+import pytest
+
+from app.services.metrics_service import MetricsService
+from app.utils.grouped import aggregate_grouped, aggregate_5min, finalize_peer, calculate_grouped_metrics
+from app.utils.topn import OTHER_LABEL, TopN, fold_groups, fold_series
+
+
+def _row(customer, supplier, seconds, attempts=10, success=5, time="2024-01-01 10:00:00"):
+    return {
+        "customer": customer, "supplier": supplier, "destination": "US", "time": time,
+        "start_attempt": attempts, "start_uniq_attempt": attempts, "start_nuber": success,
+        "seconds": seconds, "pdd": 1000, "answer_time": 5,
+    }
+
+
+@pytest.fixture
+def rows():
+    return [
+        _row("A", "X", 6000),
+        _row("A", "Y", 3000),
+        _row("B", "X", 600, success=2),
+        _row("B", "Y", 60, success=1),
+        _row("C", "Z", 30, attempts=4, success=1, time="2024-01-01 10:05:00"),
+    ]
+
+
+class FakeRepository:
+    def __init__(self, today, yesterday):
+        self.today, self.yesterday = today, yesterday
+
+    async def get_metrics_parallel(self, *args):
+        return self.today, self.yesterday
+
+
+class TestRanking:
+    """Test heap-based selection and min_share filtering."""
+
+    def test_limit(self, rows):
+        _, peer_agg = aggregate_grouped(rows)
+        assert TopN(limit=2).rank(peer_agg) == [("A", "X", "US"), ("A", "Y", "US")]
+
+    def test_sort_metric(self, rows):
+        _, peer_agg = aggregate_grouped(rows)
+        # Ties keep input order
+        assert TopN(sort="TCall", limit=1).rank(peer_agg) == [("A", "X", "US")]
+        assert TopN(sort="ASR", limit=1).rank(peer_agg) == [("A", "X", "US")]
+
+    def test_min_share(self, rows):
+        _, peer_agg = aggregate_grouped(rows)
+        # 600 / 9690 seconds is ~6%; 60 and 30 are below 1%
+        assert len(TopN(min_share=0.01).rank(peer_agg)) == 3
+
+    def test_unknown_sort(self):
+        with pytest.raises(ValueError):
+            TopN(sort="Nope")
+
+
+class TestFolding:
+    """Test that folded rows are exact aggregates of the tail."""
+
+    def test_fold_groups_matches_regrouping(self, rows):
+        _, peer_agg = aggregate_grouped(rows)
+        folded = finalize_peer(fold_groups(peer_agg, TopN(limit=2).rank(peer_agg)))
+        assert len(folded) == 3
+        other = folded[-1]
+        assert (other["main"], other["peer"], other["destination"]) == (OTHER_LABEL,) * 3
+
+        # Same numbers as grouping the tail rows under one key
+        tail = [dict(r, customer="T", supplier="T") for r in rows[2:]]
+        expected = calculate_grouped_metrics(tail)["peer_rows"][0]
+        for metric in ("Min", "TCall", "SCall", "ASR", "ACD", "PDD", "ATime"):
+            assert other[metric] == expected[metric]
+
+    def test_no_other_when_nothing_folded(self, rows):
+        _, peer_agg = aggregate_grouped(rows)
+        folded = fold_groups(peer_agg, TopN().rank(peer_agg))
+        assert list(folded)[0] == ("A", "X", "US")
+        assert len(folded) == len(peer_agg)
+
+    def test_fold_series_per_slot(self, rows):
+        _, peer_agg = aggregate_grouped(rows)
+        five = fold_series(aggregate_5min(rows), TopN(limit=1).rank(peer_agg))
+        keys = list(five)
+        assert keys[0] == ("A", "X", "US", "2024-01-01 10:00")
+        assert (OTHER_LABEL, OTHER_LABEL, OTHER_LABEL, "2024-01-01 10:00") in five
+        assert five[(OTHER_LABEL, OTHER_LABEL, OTHER_LABEL, "2024-01-01 10:05")]["slot"] == "10:05"
+
+
+class TestServiceTopN:
+    """Test top-N through the full report."""
+
+    async def test_report(self, rows):
+        service = MetricsService(FakeRepository(rows, rows[:2]))
+        report = await service.get_full_metrics_report(
+            None, None, None, datetime(2024, 1, 1), datetime(2024, 1, 2), limit=1,
+        )
+        assert [r["peer"] for r in report["peer_rows"]] == ["X", OTHER_LABEL]
+        other = report["peer_rows"][-1]
+        assert other["TCall"] == 34
+        assert other["YTCall"] == 10  # yesterday's A/Y folded with the same ranking
+        assert report["topn"]["peer_groups"] == 5
+        assert sum(r["TCall"] for r in report["peer_rows"]) == report["today_metrics"]["TCall"]
+
+    async def test_default_unchanged(self, rows):
+        service = MetricsService(FakeRepository(rows, []))
+        report = await service.get_full_metrics_report(None, None, None, datetime(2024, 1, 1), datetime(2024, 1, 2))
+        assert "topn" not in report
+        assert len(report["peer_rows"]) == 5
@@ -0,0 +1,110 @@
+# tests/unit/test_zoom.py
+# Unit tests for server-side zoom re-aggregation from cached partials
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.query_params import MetricsZoomParams
+from app.services.metrics_service import MetricsService
+from app.utils.partials import _decode, _encode
+from app.utils.topn import OTHER_LABEL
+
+DAY = (datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+
+def _rows(base):
+    return [
+        {
+            "time": base + timedelta(minutes=i * 3),
+            "customer": "AB"[i % 2], "supplier": "XYZ"[i % 3], "destination": "US",
+            "start_attempt": 10 + i % 7, "start_uniq_attempt": 8, "start_nuber": i % 5,
+            "seconds": 60 * (i % 9), "pdd": 1000 + i, "answer_time": 3 + i % 4,
+        }
+        for i in range(120)
+    ]
+
+
+@pytest.fixture
+def today():
+    return _rows(datetime(2024, 1, 1, 10, 0))
+
+
+@pytest.fixture
+def yesterday():
+    return _rows(datetime(2023, 12, 31, 10, 30))
+
+
+class FakePartialsCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def put(self, key, today, baselines):
+        self.data[key] = (_decode(_encode(today)), {p: _decode(_encode(b)) for p, b in baselines.items()})
+
+
+class FakeRepository:
+    def __init__(self, today, yesterday):
+        self.today, self.yesterday = today, yesterday
+        self.calls = 0
+
+    async def get_metrics_parallel(self, *args):
+        self.calls += 1
+        return self.today, self.yesterday
+
+
+def _between(rows, t0, t1):
+    return [r for r in rows if t0 <= r["time"] < t1]
+
+
+class TestZoom:
+    """Test that zoomed rows equal reports over the zoom window."""
+
+    async def test_full_window_matches_report(self, today, yesterday):
+        service = MetricsService(FakeRepository(today, yesterday), partials_cache=FakePartialsCache())
+        report = await service.get_full_metrics_report(None, None, None, *DAY)
+        zoom = await service.get_zoom(None, None, None, *DAY, *DAY)
+        assert zoom["main_rows"] == report["main_rows"]
+        assert zoom["peer_rows"] == report["peer_rows"]
+        assert zoom["aggregates"]["curr"]["totalCalls"] == report["today_metrics"]["TCall"]
+
+    async def test_sub_window(self, today, yesterday):
+        repo = FakeRepository(today, yesterday)
+        service = MetricsService(repo, partials_cache=FakePartialsCache())
+        t0, t1 = datetime(2024, 1, 1, 11, 0), datetime(2024, 1, 1, 12, 0)
+        zoom = await service.get_zoom(None, None, None, *DAY, t0, t1)
+        zoom_aware = await service.get_zoom(
+            None, None, None, *DAY, t0.replace(tzinfo=timezone.utc), t1.replace(tzinfo=timezone.utc),
+        )
+        assert repo.calls == 1  # second zoom served from cached partials
+
+        day = timedelta(days=1)
+        expected = await MetricsService(
+            FakeRepository(_between(today, t0, t1), _between(yesterday, t0 - day, t1 - day)),
+            partials_cache=FakePartialsCache(),
+        ).get_full_metrics_report(None, None, None, *DAY)
+        assert zoom["peer_rows"] == expected["peer_rows"]
+        assert zoom["main_rows"] == expected["main_rows"]
+        assert zoom_aware["peer_rows"] == zoom["peer_rows"]
+        assert zoom["aggregates"]["y"]["totalCalls"] == expected["yesterday_metrics"]["TCall"]
+
+    async def test_topn_ranked_within_window(self, today, yesterday):
+        service = MetricsService(FakeRepository(today, yesterday), partials_cache=FakePartialsCache())
+        zoom = await service.get_zoom(
+            None, None, None, *DAY, datetime(2024, 1, 1, 11), datetime(2024, 1, 1, 12), limit=2,
+        )
+        assert len(zoom["peer_rows"]) == 3
+        assert zoom["peer_rows"][-1]["peer"] == OTHER_LABEL
+        assert sum(r["TCall"] for r in zoom["peer_rows"]) == zoom["aggregates"]["curr"]["totalCalls"]
+        assert zoom["topn"]["peer_groups"] == 6
+
+    def test_params_reject_empty_window(self):
+        base = {"from": "2024-01-01T00:00:00", "to": "2024-01-02T00:00:00"}
+        params = MetricsZoomParams.model_validate({**base, "zoom_from": "1704106800000", "zoom_to": "1704110400000"})
+        assert params.zoom_from == datetime(2024, 1, 1, 11, tzinfo=timezone.utc)
+        with pytest.raises(ValidationError):
+            MetricsZoomParams.model_validate({**base, "zoom_from": "2024-01-01T12:00", "zoom_to": "2024-01-01T11:00"})